@@ -2,7 +2,7 @@ import os
 import time
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import requests
 
 # Imports pour le mode LOCAL
@@ -15,6 +15,7 @@ from insightface.app import FaceAnalysis
 import replicate
 
 from core.utils import print_success, print_error, Colors
+from core.file_index import get_file_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -78,9 +79,7 @@ class BatchFaceSwap:
         return sorted(faces, key=lambda x: x.bbox[2] * x.bbox[3])[-1]
 
     def process_batch(self, target_directory: Path, output_directory: Path, naming_pattern: str = None) -> List[Path]:
-        image_files = []
-        for ext in ['.jpg', '.jpeg', '.png', '.webp']:
-            image_files.extend(target_directory.glob(f"*{ext}"))
+        image_files = get_file_index().files(target_directory)
         
         self.stats['total'] = len(image_files)
         results = []
@@ -117,6 +116,15 @@ class BatchFaceSwap:
         self._print_stats()
         return results
 
+    def process_single(self, image_path: Path, output_dir: Path, naming_pattern: str = None, idx: int = 1) -> Optional[Path]:
+        """Swap the source face onto one image (job queue unit). Returns the output path or None."""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if self.engine == 'local':
+            success, output_path = self._process_single_local(image_path, output_dir, naming_pattern, idx)
+        else:
+            success, output_path = self._process_single_replicate(image_path, output_dir, naming_pattern, idx)
+        return output_path if success else None
+
     def _process_single_local(self, image_path, output_dir, naming_pattern, idx):
         try:
             target_img = cv2.imread(str(image_path))
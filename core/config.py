@@ -33,6 +33,68 @@ class Config:
         "image_size": "2K"
     }
     
+    # --- IMAGES DE RÉFÉRENCE (réduites avant envoi à l'API) ---
+    REFERENCE_IMAGE = {
+        "max_size": 768,
+        "format": "JPEG",
+        "quality": 90
+    }
+    
+    # --- QUOTA GEMINI (surchargeable dans le .env, 0 = pas de limite) ---
+    GEMINI_LIMITS = {
+        "rpm": int(os.getenv('GEMINI_RPM', '15')),
+        "rpd": int(os.getenv('GEMINI_RPD', '250')),
+        "tpm": int(os.getenv('GEMINI_TPM', '0'))
+    }
+    
+    # --- RETRY (backoff exponentiel + jitter sur les erreurs transitoires / 429) ---
+    GEMINI_RETRY = {
+        "max_attempts": int(os.getenv('GEMINI_MAX_ATTEMPTS', '4')),
+        "base_delay": 2.0,
+        "max_delay": 60.0
+    }
+    
+    # --- WORKER DE JOBS (file persistante data/jobs.sqlite3) ---
+    JOB_WORKER = {
+        "concurrency": int(os.getenv('JOB_WORKER_CONCURRENCY', '3')),
+        "idle_exit": 300,     # Un worker lancé par l'UI s'arrête après 5 min sans job
+        "stall_timeout": 30   # L'UI abandonne l'attente si aucun worker ne tourne depuis 30 s
+    }
+    
+    # --- CACHE DE GÉNÉRATION (GENERATION_CACHE=0 pour le désactiver) ---
+    GENERATION_CACHE_ENABLED = os.getenv('GENERATION_CACHE', '1') != '0'
+    GENERATION_CACHE_MAX_MB = int(os.getenv('GENERATION_CACHE_MAX_MB', '2048'))
+    GENERATION_CACHE_DIR = BASE_DIR / "data" / "cache" / "generations"
+    
+    # --- MINIATURES / APERÇUS SERVIS PAR STREAMLIT (static/, enableStaticServing) ---
+    STATIC_DIR = BASE_DIR / "static"
+    PREVIEW_DIR = STATIC_DIR / "previews"
+    THUMBNAILS = {
+        "sizes": (256, 1024),  # Pyramide : grilles, vue swipe
+        "quality": 85,
+        "max_mb": int(os.getenv('THUMBNAIL_CACHE_MAX_MB', '512'))
+    }
+    
+    # --- EXPORT DES DATASETS (auto = reflink -> hardlink -> copie) ---
+    EXPORT = {
+        "mode": os.getenv('EXPORT_MODE', 'auto'),
+        "workers": 4
+    }
+    
+    # --- PRÉCHARGEMENT DES APERÇUS (vue swipe) ---
+    PREFETCH = {
+        "ahead": int(os.getenv('PREFETCH_AHEAD', '5')),  # Images suivantes préparées
+        "workers": 2,
+        "capacity": 64,          # Rendus gardés en mémoire (LRU)
+        "browser_hints": True    # <link rel=prefetch> vers les aperçus prêts
+    }
+    
+    # --- MONITEUR MATÉRIEL (échantillonné en arrière-plan) ---
+    HARDWARE_MONITOR = {
+        "interval": float(os.getenv('HARDWARE_MONITOR_INTERVAL', '2')),  # Secondes entre deux mesures
+        "history": 60            # Échantillons gardés (sparklines)
+    }
+    
     # --- RÉPERTOIRES DE DONNÉES (100% minuscules) ---
     DATA_DIR = BASE_DIR / "data" / "dataset"
     RAW_DIR = DATA_DIR / "raw"
@@ -62,5 +124,4 @@ class Config:
         """Crée l'arborescence si elle n'existe pas"""
         cls.check_directories()
 
-# Auto-exécution pour garantir que les dossiers sont là au démarrage
-Config.ensure_directories()
\ No newline at end of file
+# Pas de création de dossiers à l'import : les points d'entrée appellent Config.ensure_directories()
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Curation Journal - Append-only log of curation decisions
+One line per decision in a sidecar file of the dataset folder, compacted
+periodically into a snapshot. Replay restores decisions, queue and cursor
+after a browser reload or a server restart.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+JOURNAL_FILENAME = ".curation_journal.jsonl"
+SNAPSHOT_FILENAME = ".curation_snapshot.json"
+
+
+class CurationJournal:
+    """Decision journal of one dataset folder (decision codes: 0 = pending, 1 = approved, 2 = rejected)"""
+
+    COMPACT_EVERY = 500  # Journal lines before compaction into the snapshot
+
+    def __init__(self, dataset_path: Path, journal_dir: Path = None):
+        self.dataset_path = dataset_path
+        journal_dir = journal_dir or dataset_path
+        self.journal_file = journal_dir / JOURNAL_FILENAME
+        self.snapshot_file = journal_dir / SNAPSHOT_FILENAME
+
+        self._lock = threading.RLock()
+        self._file = None
+        self._journal_lines = 0
+        self.state = self._load()
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _empty_state() -> Dict:
+        return {"seq": 0, "decisions": {}, "queue": None, "cursor": 0}
+
+    def _load(self) -> Dict:
+        """Load snapshot then replay the journal lines written after it"""
+        state = self._empty_state()
+
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    state.update(json.load(f))
+            except Exception as e:
+                print(f"❌ Error loading curation snapshot: {e}")
+
+        if self.journal_file.exists():
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._journal_lines += 1
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Ligne tronquée (crash pendant un append) : ignorée
+                        continue
+                    if event.get("seq", 0) > state["seq"]:
+                        self._apply(state, event)
+
+        return state
+
+    @staticmethod
+    def _apply(state: Dict, event: Dict):
+        """Fold one event into the state"""
+        op = event.get("op")
+
+        if op == "decide":
+            # Retiré puis réinséré : l'ordre du dict reste l'ordre des décisions
+            state["decisions"].pop(event["name"], None)
+            if event["decision"]:
+                state["decisions"][event["name"]] = event["decision"]
+        elif op == "cursor":
+            state["cursor"] = event["index"]
+        elif op == "queue":
+            state["queue"] = event["names"]
+            state["cursor"] = event.get("cursor", 0)
+        elif op == "clear":
+            state["decisions"] = {}
+            state["cursor"] = 0
+
+        state["seq"] = max(state["seq"], event.get("seq", 0))
+
+    def is_empty(self) -> bool:
+        return self.state["seq"] == 0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def _record(self, event: Dict):
+        """Apply an event in memory and append it to the journal (one line, O(1))"""
+        with self._lock:
+            event["seq"] = self.state["seq"] + 1
+            self._apply(self.state, event)
+            try:
+                if self._file is None:
+                    self._file = open(self.journal_file, 'a', encoding='utf-8')
+                self._file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n")
+                self._file.flush()
+                self._journal_lines += 1
+            except Exception as e:
+                print(f"❌ Error appending curation journal: {e}")
+                return
+
+            if self._journal_lines >= self.COMPACT_EVERY:
+                self.compact()
+
+    def record_decision(self, name: str, decision: int):
+        """Record the new decision of an image (0 = back to pending)"""
+        self._record({"op": "decide", "name": name, "decision": decision})
+
+    def record_cursor(self, index: int):
+        """Record the position in the curation queue"""
+        if index != self.state["cursor"]:
+            self._record({"op": "cursor", "index": index})
+
+    def record_queue(self, names: List[str], cursor: int = 0):
+        """Record a new curation queue (dataset load, quality filter, dedup)"""
+        self._record({"op": "queue", "names": list(names), "cursor": cursor})
+
+    def record_clear(self):
+        """Forget every decision"""
+        self._record({"op": "clear"})
+
+    def replace(self, decisions: Dict[str, int], cursor: int = 0):
+        """Overwrite the whole state (session import) and compact"""
+        with self._lock:
+            self.state["decisions"] = {name: d for name, d in decisions.items() if d}
+            self.state["cursor"] = cursor
+            self.state["seq"] += 1
+            self.compact()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def compact(self):
+        """Write the state to the snapshot and truncate the journal"""
+        with self._lock:
+            tmp_file = self.snapshot_file.with_suffix(".tmp")
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.state, f, ensure_ascii=False, separators=(',', ':'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, self.snapshot_file)
+                # Le snapshot porte le dernier seq : un crash avant la troncature
+                # ne rejoue pas les anciennes lignes au rechargement.
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                open(self.journal_file, 'w', encoding='utf-8').close()
+                self._journal_lines = 0
+            except Exception as e:
+                print(f"❌ Error compacting curation journal: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def open_curation_journal(dataset_path: Path) -> Optional[CurationJournal]:
+    """Curation journal of a dataset folder (None if the folder is missing or unreadable)"""
+    try:
+        if not dataset_path.is_dir():
+            return None
+        return CurationJournal(dataset_path)
+    except OSError as e:
+        print(f"⚠️ Curation journal unavailable for {dataset_path.name}: {e}")
+        return None
@@ -3,15 +3,18 @@ from pathlib import Path
 from typing import Optional, List
 import time
 
-try:
-    import instaloader
-except ImportError:
-    os.system("python -m pip install instaloader")
-    import instaloader
-
 from core.config import Config
 from core.utils import print_info, print_success, print_error, print_warning, Colors
 
+def _instaloader():
+    """Import instaloader on first use (optional dependency, never installed implicitly)"""
+    try:
+        import instaloader
+    except ImportError as e:
+        raise ImportError("instaloader is required for scraping: pip install instaloader") from e
+    return instaloader
+
+
 class DatasetScraper:
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
@@ -26,7 +29,7 @@ class DatasetScraper:
         }
     
     def _initialize_loader(self):
-        loader = instaloader.Instaloader(
+        loader = _instaloader().Instaloader(
             download_pictures=True,
             download_videos=False,
             download_video_thumbnails=False,
@@ -56,7 +59,7 @@ class DatasetScraper:
         os.chdir(self.output_dir)
         
         try:
-            profile = instaloader.Profile.from_username(self.loader.context, username)
+            profile = _instaloader().Profile.from_username(self.loader.context, username)
             
             posts = profile.get_posts()
             seen_shortcodes = set()
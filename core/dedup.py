@@ -0,0 +1,130 @@
+"""
+Near-Duplicate Detection - Perceptual hashes + BK-tree
+aHash / dHash / pHash computed with NumPy on the analysis buffer, and
+Hamming-radius lookup through a BK-tree instead of O(n²) comparisons.
+"""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    """64 booleans -> unsigned 64-bit int"""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def perceptual_hashes(gray: np.ndarray) -> Dict[str, int]:
+    """
+    Compute the three 64-bit perceptual hashes of a grayscale image
+
+    Returns:
+        Dict {"ahash", "dhash", "phash"}
+    """
+    # aHash : 8x8, pixel > moyenne
+    small = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+    ahash = _pack_bits(small > small.mean())
+
+    # dHash : 9x8, gradient horizontal
+    wide = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    dhash = _pack_bits(wide[:, 1:] > wide[:, :-1])
+
+    # pHash : DCT 32x32, bloc basse fréquence 8x8 comparé à sa médiane (hors DC)
+    dct = cv2.dct(np.float32(cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)))
+    low = dct[:8, :8]
+    phash = _pack_bits(low > np.median(low.ravel()[1:]))
+
+    return {"ahash": ahash, "dhash": dhash, "phash": phash}
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit hashes (Hamming metric)"""
+
+    def __init__(self):
+        self.root: Optional[Tuple[int, list, dict]] = None  # (hash, items, {distance: child})
+        self.size = 0
+
+    def add(self, value: int, item):
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, object]]:
+        """All (distance, item) within `radius` of value"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend((distance, item) for item in items)
+            # Inégalité triangulaire : seuls les enfants dans [d - r, d + r] peuvent matcher
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+def find_duplicate_groups(entries: Iterable[Tuple[Path, Dict]],
+                          max_distance: int = 6) -> List[List[Path]]:
+    """
+    Group near-identical images
+
+    Args:
+        entries: (path, quality) with "phash" / "dhash" keys
+        max_distance: Max pHash Hamming distance (dHash must agree within 2x)
+
+    Returns:
+        Groups of 2+ paths, best overall_score first
+    """
+    entries = [(path, q) for path, q in entries if q.get("phash") is not None]
+    tree = BKTree()
+    for i, (_, quality) in enumerate(entries):
+        tree.add(quality["phash"], i)
+
+    # Union-find sur les paires proches
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (_, quality) in enumerate(entries):
+        for _, j in tree.search(quality["phash"], max_distance):
+            if j <= i:
+                continue
+            dhash_i, dhash_j = quality.get("dhash"), entries[j][1].get("dhash")
+            if dhash_i is not None and dhash_j is not None and hamming(dhash_i, dhash_j) > 2 * max_distance:
+                continue
+            parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(entries)):
+        groups.setdefault(find(i), []).append(i)
+
+    return [
+        [entries[i][0] for i in sorted(members, key=lambda i: -entries[i][1]["overall_score"])]
+        for members in groups.values()
+        if len(members) > 1
+    ]
@@ -0,0 +1,215 @@
+"""
+Export Engine - Parallel dataset export with hardlink / reflink / copy
+Files are linked or cloned when the filesystem allows it (falling back to
+a plain copy), exported on a thread pool, and skipped when the destination
+file already holds identical content (re-saving a dataset is idempotent).
+"""
+import errno
+import hashlib
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.config import Config
+
+MODE_AUTO = "auto"          # reflink -> hardlink -> copy
+MODE_HARDLINK = "hardlink"  # Même inode (aucune donnée copiée)
+MODE_REFLINK = "reflink"    # Clone copy-on-write (btrfs, XFS...)
+MODE_COPY = "copy"          # copy_file_range, sinon copie classique
+MODE_MOVE = "move"
+
+FICLONE = 0x40049409  # ioctl Linux (linux/fs.h)
+
+# Erreurs signifiant "méthode non supportée ici" : on passe à la suivante
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EINVAL,
+                      errno.ENOTTY, errno.ENOSYS, errno.EMLINK}
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExportEngine:
+    """Export files to a dataset folder with the cheapest method the filesystem supports"""
+
+    def __init__(self, mode: str = None, max_workers: int = None):
+        settings = Config.EXPORT
+        self.mode = mode or settings["mode"]
+        self.max_workers = max_workers or settings["workers"]
+        self._lock = threading.Lock()
+        self._unsupported = set()  # (méthode, device source, device destination)
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+
+    # ------------------------------------------------------------------
+    # Methods
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _hardlink(src: Path, tmp: Path):
+        os.link(src, tmp)
+
+    @staticmethod
+    def _reflink(src: Path, tmp: Path):
+        """Copy-on-write clone (FICLONE): ENOTSUP where the filesystem can't share extents"""
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOTSUP, "reflink unsupported on this platform")
+        import fcntl
+
+        with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError as e:
+                # ext4, NTFS... : on passe au hardlink plutôt qu'à une copie complète
+                if e.errno in UNSUPPORTED_ERRNOS:
+                    raise OSError(errno.ENOTSUP, f"reflink unsupported: {e.strerror}") from e
+                raise
+        shutil.copystat(src, tmp)
+
+    @staticmethod
+    def _copy(src: Path, tmp: Path):
+        """Full copy: in-kernel copy_file_range when available (NFS/SMB server-side), else copy2"""
+        if hasattr(os, "copy_file_range"):
+            try:
+                with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+                    remaining = os.fstat(fsrc.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                        if copied == 0:
+                            # Source tronquée pendant la copie : jamais de fichier incomplet à destination
+                            raise OSError(errno.EIO, f"Short copy of {src.name} ({remaining} bytes missing)")
+                        remaining -= copied
+                shutil.copystat(src, tmp)
+                return
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+        shutil.copy2(src, tmp)
+
+    def _chain(self) -> List[str]:
+        if self.mode == MODE_AUTO:
+            return [MODE_REFLINK, MODE_HARDLINK, MODE_COPY]
+        if self.mode in (MODE_REFLINK, MODE_HARDLINK):
+            return [self.mode, MODE_COPY]
+        return [self.mode]
+
+    # ------------------------------------------------------------------
+    # Single file
+    # ------------------------------------------------------------------
+
+    def _hash(self, path: Path) -> str:
+        """Content hash memoized by (path, size, mtime)"""
+        stat = path.stat()
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(key)
+        if digest is None:
+            digest = _file_hash(path)
+            with self._lock:
+                self._hashes[key] = digest
+        return digest
+
+    def _already_exported(self, src: Path, dst: Path) -> bool:
+        """The destination itself already holds the source content (same file, or same size and hash)"""
+        try:
+            dst_size = dst.stat().st_size
+        except OSError:
+            return False
+        if os.path.samefile(src, dst):
+            return True
+        # Noms indexés (img_001...) : seul le contenu de CE fichier compte, pas celui de ses voisins
+        return src.stat().st_size == dst_size and self._hash(src) == self._hash(dst)
+
+    def export_file(self, src: Path, dst: Path) -> str:
+        """
+        Export one file (atomic: written under a temporary name, then renamed)
+
+        Returns:
+            str: Method actually used
+        """
+        if self.mode == MODE_MOVE:
+            shutil.move(str(src), dst)
+            return MODE_MOVE
+
+        devices = (src.stat().st_dev, dst.parent.stat().st_dev)
+        tmp = dst.with_name(f".{dst.name}.{threading.get_ident()}.tmp")
+        methods = {MODE_HARDLINK: self._hardlink, MODE_REFLINK: self._reflink, MODE_COPY: self._copy}
+
+        for method in self._chain():
+            if method != MODE_COPY and (method, *devices) in self._unsupported:
+                continue
+            try:
+                methods[method](src, tmp)
+                os.replace(tmp, dst)
+                return method
+            except OSError as e:
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+                if method == MODE_COPY or e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                # Méthode refusée par ce couple de filesystems : plus tentée pour eux
+                with self._lock:
+                    self._unsupported.add((method, *devices))
+        raise OSError(errno.ENOTSUP, f"No export method available for {src.name}")
+
+    # ------------------------------------------------------------------
+    # Batch
+    # ------------------------------------------------------------------
+
+    def export(self,
+               pairs: Sequence[Tuple[Path, Path]],
+               progress_callback: Optional[ProgressCallback] = None) -> Dict:
+        """
+        Export (source, destination) pairs on a thread pool
+
+        Args:
+            pairs: Files to export
+            progress_callback: Called with (done, total) from the calling thread
+
+        Returns:
+            Dict with per-method counts, "skipped", "failed" and "errors"
+        """
+        result = {"exported": 0, "skipped": 0, "failed": 0, "errors": [],
+                  MODE_HARDLINK: 0, MODE_REFLINK: 0, MODE_COPY: 0, MODE_MOVE: 0}
+        total = len(pairs)
+        if not total:
+            return result
+
+        for folder in {Path(dst).parent for _, dst in pairs}:
+            folder.mkdir(parents=True, exist_ok=True)
+
+        def run(src: Path, dst: Path) -> str:
+            if self.mode != MODE_MOVE and self._already_exported(src, dst):
+                return "skipped"
+            return self.export_file(src, dst)
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export") as pool:
+            futures = {pool.submit(run, Path(src), Path(dst)): src for src, dst in pairs}
+            for future in as_completed(futures):
+                try:
+                    method = future.result()
+                    if method == "skipped":
+                        result["skipped"] += 1
+                    else:
+                        result[method] += 1
+                        result["exported"] += 1
+                except Exception as e:
+                    result["failed"] += 1
+                    result["errors"].append(f"{Path(futures[future]).name}: {e}")
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+
+        return result
@@ -0,0 +1,200 @@
+"""
+File Index - Cached directory listings shared by all pages
+Each directory is scanned once (name, extension, size, mtime) and rescanned
+only when its own mtime changes, or when watchdog (inotify / FSEvents /
+ReadDirectoryChangesW) reports an event in it. Pages get sorted, filtered
+views instead of re-globbing on every Streamlit rerun.
+"""
+import fnmatch
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+# Sous ce délai après une modification, le mtime du dossier peut ne pas
+# encore refléter une création dans le même tick : le listing n'est pas réutilisé
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class FileEntry(NamedTuple):
+    path: Path
+    name: str
+    ext: str        # Extension en minuscules (".jpg")
+    size: int
+    mtime: float
+
+
+class _Listing(NamedTuple):
+    dir_mtime_ns: int
+    trusted: bool
+    files: List[FileEntry]
+    subdirs: List[str]
+
+
+class FileIndex:
+    """Process-wide cache of directory listings"""
+
+    def __init__(self, watch: bool = True):
+        self._lock = threading.Lock()
+        self._listings: Dict[str, _Listing] = {}
+        self._dirty = set()
+        self._observer = None
+        self._watched = set()
+
+        if watch and WATCHDOG_AVAILABLE:
+            try:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception as e:
+                print(f"⚠️ File watcher unavailable, using mtime checks only: {e}")
+                self._observer = None
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scan(directory: str, dir_mtime_ns: int) -> _Listing:
+        files = []
+        subdirs = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files.append(FileEntry(
+                            Path(entry.path), entry.name, os.path.splitext(entry.name)[1].lower(),
+                            stat.st_size, stat.st_mtime
+                        ))
+                except OSError:
+                    continue  # Supprimé pendant le scan
+        files.sort(key=lambda e: e.name)
+        subdirs.sort()
+        trusted = time.time_ns() - dir_mtime_ns > RACY_WINDOW_NS
+        return _Listing(dir_mtime_ns, trusted, files, subdirs)
+
+    def _watch(self, directory: str):
+        """Mark the directory dirty on any filesystem event (lock held)"""
+        if self._observer is None or directory in self._watched:
+            return
+        index = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                with index._lock:
+                    index._dirty.add(directory)
+
+        try:
+            self._observer.schedule(_Handler(), directory, recursive=False)
+            self._watched.add(directory)
+        except Exception:
+            pass  # Limite inotify atteinte, etc. : le mtime suffit
+
+    def _listing(self, directory: Union[str, Path]) -> Optional[_Listing]:
+        """Cached listing, rescanned if the directory changed. None if missing."""
+        directory = os.path.abspath(directory)
+        try:
+            dir_mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._listings.pop(directory, None)
+            return None
+
+        with self._lock:
+            cached = self._listings.get(directory)
+            dirty = directory in self._dirty
+            self._dirty.discard(directory)
+        if cached is not None and cached.trusted and not dirty and cached.dir_mtime_ns == dir_mtime_ns:
+            return cached
+
+        try:
+            listing = self._scan(directory, dir_mtime_ns)
+        except OSError:
+            return None
+        with self._lock:
+            self._listings[directory] = listing
+            self._watch(directory)
+        return listing
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def entries(self,
+                directory: Union[str, Path],
+                extensions: Optional[Iterable[str]] = IMAGE_EXTENSIONS,
+                pattern: Optional[str] = None,
+                sort: str = "name",
+                reverse: bool = False,
+                limit: Optional[int] = None) -> List[FileEntry]:
+        """
+        Files of a directory (not recursive)
+
+        Args:
+            extensions: Allowed extensions, case-insensitive (None = all files)
+            pattern: fnmatch pattern on the file name ("dataset_*")
+            sort: "name", "mtime" or "size"
+            limit: Max entries returned (after sorting)
+        """
+        listing = self._listing(directory)
+        if listing is None:
+            return []
+
+        allowed = {e.lower() for e in extensions} if extensions is not None else None
+        selected = [
+            e for e in listing.files
+            if (allowed is None or e.ext in allowed)
+            and (pattern is None or fnmatch.fnmatch(e.name, pattern))
+        ]
+        if sort != "name" or reverse:
+            selected.sort(key=lambda e: getattr(e, sort), reverse=reverse)
+        return selected[:limit] if limit is not None else selected
+
+    def files(self, directory: Union[str, Path], **filters) -> List[Path]:
+        """Paths of the files of a directory (same filters as entries())"""
+        return [e.path for e in self.entries(directory, **filters)]
+
+    def count(self, directory: Union[str, Path], **filters) -> int:
+        return len(self.entries(directory, **filters))
+
+    def total_size(self, directory: Union[str, Path], **filters) -> int:
+        return sum(e.size for e in self.entries(directory, **filters))
+
+    def subdirs(self, directory: Union[str, Path]) -> List[str]:
+        """Sorted names of the subdirectories"""
+        listing = self._listing(directory)
+        return list(listing.subdirs) if listing is not None else []
+
+    def invalidate(self, directory: Union[str, Path] = None):
+        """Force a rescan (after writing into a directory from this process)"""
+        with self._lock:
+            if directory is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(os.path.abspath(directory), None)
+
+
+_file_index: Optional[FileIndex] = None
+_file_index_lock = threading.Lock()
+
+
+def get_file_index() -> FileIndex:
+    """Get the process-wide file index"""
+    global _file_index
+    with _file_index_lock:
+        if _file_index is None:
+            _file_index = FileIndex()
+        return _file_index
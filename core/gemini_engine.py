@@ -1,93 +1,262 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 import time
 import logging
-from PIL import Image
-import io
+import threading
 from google import genai
 from google.genai import types
-import streamlit as st
 
 from core.config import Config
 from core.utils import print_info, print_success, print_error, save_binary_file, open_file, get_image_bytes
 from core.request_tracker import RequestTracker
+from core.persistent_monitor import PersistentMonitor
+from core.generation_cache import GenerationCache, get_generation_cache
+from core.image_preprocess import get_reference_preprocessor
+from core.gemini_errors import (
+    GeminiError,
+    QuotaError,
+    InvalidInputError,
+    RetryPolicy,
+    classify_error,
+    check_response
+)
 
 # Configure logging for API debugging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Étapes de progression réelles d'une génération
+STAGE_QUEUED = "queued"
+STAGE_RATE_LIMITED = "rate_limited"
+STAGE_IN_FLIGHT = "in_flight"
+STAGE_DECODING = "decoding"
+STAGE_SAVED = "saved"
+
+ProgressCallback = Callable[[str], None]
+
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_genai_client() -> genai.Client:
+    """Process-wide GenAI client (one HTTP connection pool, TLS sessions reused across engines)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = genai.Client(api_key=Config.GOOGLE_API_KEY)
+            logger.info("✅ Gemini API client initialized successfully")
+        return _client
+
+
 class GeminiEngine:
-    def __init__(self):
-        self.client = None
+    """
+    Gemini image generation, usable from Streamlit, the CLI or worker processes
+    
+    Args:
+        usage_sink: Receives add_tokens(tokens) / add_image() / record_latency(seconds)
+            (default: PersistentMonitor on the shared ledger)
+        tracker: Quota tracker (default: RequestTracker on the shared quota store)
+        client: GenAI client (default: the process-wide client)
+        progress_callback: Default stage callback for generate_image()
+        open_results: Open generated images with the OS viewer (False for headless workers)
+    """
+    MAX_QUOTA_WAIT = 90  # Max seconds to queue for quota before giving up
+    
+    def __init__(self,
+                 usage_sink=None,
+                 tracker: Optional[RequestTracker] = None,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 open_results: bool = True,
+                 client: Optional[genai.Client] = None):
+        self.client = client
         self.config = Config.GEMINI_CONFIG.copy()
-        self.last_request_time = 0
-        self.tracker = RequestTracker()
+        self.usage_sink = usage_sink or PersistentMonitor()
+        self.tracker = tracker or RequestTracker()
+        self.progress_callback = progress_callback
+        self.open_results = open_results
+        self.cache = get_generation_cache() if Config.GENERATION_CACHE_ENABLED else None
+        self.last_cache_hit = False
+        self.last_error: Optional[GeminiError] = None
+        self.retry_policy = RetryPolicy()
+        self.preprocessor = get_reference_preprocessor()
         self._initialize_client()
     
     def _initialize_client(self):
+        if self.client is not None:
+            return
         try:
-            self.client = genai.Client(api_key=Config.GOOGLE_API_KEY)
-            logger.info("✅ Gemini API client initialized successfully")
+            self.client = get_genai_client()
             print_success("Gemini API initialized")
         except Exception as e:
             logger.error(f"❌ Failed to initialize Gemini API: {e}")
             print_error(f"Failed to initialize Gemini API: {e}")
             raise
     
-    def _resize_image_to_768px(self, image_path: str) -> bytes:
-        """Resize image to max 768px on longest side to prevent API timeouts"""
-        try:
-            logger.info(f"📐 Resizing image: {image_path}")
-            with Image.open(image_path) as img:
-                # Get original dimensions
-                width, height = img.size
-                logger.info(f"   Original size: {width}x{height}")
-                
-                # Calculate new dimensions (max 768px on longest side)
-                max_size = 768
-                if width > height:
-                    if width > max_size:
-                        new_width = max_size
-                        new_height = int((max_size / width) * height)
-                    else:
-                        new_width, new_height = width, height
-                else:
-                    if height > max_size:
-                        new_height = max_size
-                        new_width = int((max_size / height) * width)
-                    else:
-                        new_width, new_height = width, height
-                
-                # Resize if needed
-                if (new_width, new_height) != (width, height):
-                    img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                    logger.info(f"   Resized to: {new_width}x{new_height}")
-                else:
-                    logger.info(f"   No resize needed (already <= 768px)")
-                
-                # Convert to bytes
-                buffer = io.BytesIO()
-                img.save(buffer, format='PNG')
-                return buffer.getvalue()
-        except Exception as e:
-            logger.error(f"❌ Image resize failed: {e}")
-            raise
+    def update_config(self, **kwargs):
+        self.config.update(kwargs)
     
-    def _enforce_rate_limit(self):
-        """Enforce 2-second delay between API requests"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
+    def _build_contents(self, prompt: str, reference_image_path: Optional[str] = None) -> list:
+        """Build request contents (prompt + optional resized reference image)"""
+        contents = [prompt]
         
-        if time_since_last_request < 2.0:
-            sleep_time = 2.0 - time_since_last_request
-            logger.info(f"⏳ Rate limiting: sleeping {sleep_time:.2f}s")
-            time.sleep(sleep_time)
+        if reference_image_path:
+            logger.info(f"📸 Loading reference image: {reference_image_path}")
+            # Réduite à 768px et encodée en JPEG une seule fois (mémoïsée hash + mtime)
+            img_bytes, mime_type = self.preprocessor.prepare(reference_image_path)
+            contents.append(types.Part.from_bytes(data=img_bytes, mime_type=mime_type))
+            logger.info(f"✅ Reference image ready ({len(img_bytes) // 1024} KB)")
         
-        self.last_request_time = time.time()
+        return contents
     
-    def update_config(self, **kwargs):
-        self.config.update(kwargs)
+    def _build_request_config(self, config: Optional[Dict[str, Any]] = None) -> types.GenerateContentConfig:
+        """Build the generation config (defaults to self.config)"""
+        config = config or self.config
+        
+        # Safety settings: BLOCK_NONE for all categories (required for face processing)
+        safety_settings = [
+            types.SafetySetting(
+                category="HARM_CATEGORY_HATE_SPEECH",
+                threshold="BLOCK_NONE"
+            ),
+            types.SafetySetting(
+                category="HARM_CATEGORY_HARASSMENT",
+                threshold="BLOCK_NONE"
+            ),
+            types.SafetySetting(
+                category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                threshold="BLOCK_NONE"
+            ),
+            types.SafetySetting(
+                category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                threshold="BLOCK_NONE"
+            )
+        ]
+        
+        return types.GenerateContentConfig(
+            temperature=config['temperature'],
+            top_p=config['top_p'],
+            response_modalities=["IMAGE"],
+            safety_settings=safety_settings,
+            image_config=types.ImageConfig(
+                image_size=config['image_size'],
+                aspect_ratio=config['aspect_ratio']
+            )
+        )
+    
+    @staticmethod
+    def _response_tokens(response) -> Optional[int]:
+        """Exact token count reported by the API (None if missing)"""
+        if hasattr(response, 'usage_metadata') and response.usage_metadata:
+            return response.usage_metadata.total_token_count
+        return None
+    
+    def _record_usage(self, response):
+        """
+        Count the tokens billed for a response (called before check_response:
+        a request blocked by the safety filters is billed all the same)
+        """
+        tokens = self._response_tokens(response)
+        if tokens is not None:
+            logger.info(f"📊 Exact tokens used: {tokens}")
+            self.usage_sink.add_tokens(tokens)
+        else:
+            logger.warning("⚠️ No usage metadata in response")
+    
+    @staticmethod
+    def _extract_image_bytes(response) -> Optional[bytes]:
+        """Generated image bytes from the response (None if the API returned no image)"""
+        if response.candidates and response.candidates[0].content.parts[0].inline_data:
+            return response.candidates[0].content.parts[0].inline_data.data
+        logger.error("❌ No image data received from API")
+        print_error("No image data received from API")
+        return None
+    
+    def _save_image_bytes(self, data: bytes, phase: str, character_name: str, image_size: Optional[str] = None) -> Optional[Path]:
+        """Save generated image bytes to OUTPUT_DIR"""
+        image_size = image_size or self.config['image_size']
+        logger.info("💾 Saving generated image...")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stem = f"Phase{phase}_{character_name}_{image_size}_{timestamp}"
+        file_path = Config.OUTPUT_DIR / f"{stem}.png"
+        
+        # Gestion doublons (plusieurs générations parallèles dans la même seconde)
+        counter = 2
+        while file_path.exists():
+            file_path = Config.OUTPUT_DIR / f"{stem}_{counter}.png"
+            counter += 1
+        
+        if save_binary_file(file_path, data):
+            logger.info(f"✅ Image saved: {file_path.name}")
+            return file_path
+        
+        logger.error("❌ Failed to save image file")
+        return None
+    
+    def _cache_key(self, contents: list, config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Cache key of a request: prompt + reference bytes + generation config
+        
+        The whole config dict is hashed, so a "variant" index (ignored by the API
+        request) gives each variant of a batch its own cache entry.
+        """
+        reference_bytes = contents[1].inline_data.data if len(contents) > 1 else None
+        return GenerationCache.make_key(Config.MODEL_IMAGE, contents[0], reference_bytes, config or self.config)
+    
+    def _send_request(
+        self,
+        contents: list,
+        config: Dict[str, Any],
+        estimated_tokens: int,
+        report: ProgressCallback
+    ):
+        """
+        Send one generation request: quota acquisition, retries with backoff,
+        refund of requests that never reached the server
+        
+        Raises:
+            GeminiError: Classified failure once retries are exhausted
+        """
+        for attempt in range(self.retry_policy.max_attempts):
+            if not self.tracker.check_limits():
+                raise QuotaError(f"Daily API limit reached ({self.tracker.daily_limit})", reached_server=False)
+            
+            # Token bucket global (RPM/TPM) : on attend seulement le temps nécessaire
+            wait = self.tracker.estimate_wait(estimated_tokens)
+            if wait > 0:
+                logger.info(f"⏳ Rate limiting: waiting {wait:.1f}s for quota")
+                report(STAGE_RATE_LIMITED)
+            if not self.tracker.acquire(tokens=estimated_tokens, timeout=self.MAX_QUOTA_WAIT):
+                raise QuotaError("Request blocked by rate limiter", reached_server=False)
+            
+            report(STAGE_IN_FLIGHT)
+            logger.info(f"📡 Sending request to Gemini API (attempt {attempt + 1}/{self.retry_policy.max_attempts})...")
+            started = time.monotonic()
+            try:
+                response = self.client.models.generate_content(
+                    model=Config.MODEL_IMAGE,
+                    contents=contents,
+                    config=self._build_request_config(config)
+                )
+                self.usage_sink.record_latency(time.monotonic() - started)
+                self._record_usage(response)
+                check_response(response)
+                return response
+            except Exception as e:
+                error = classify_error(e)
+                if not error.reached_server:
+                    self.tracker.refund(estimated_tokens)
+                    logger.info("↩️ Request never reached the server, quota refunded")
+                
+                delay = self.retry_policy.delay_for(error, attempt)
+                if delay is None:
+                    if error is e:
+                        raise
+                    raise error from e
+                
+                logger.warning(f"⚠️ {type(error).__name__}: {error} - retrying in {delay:.1f}s")
+                report(STAGE_RATE_LIMITED if isinstance(error, QuotaError) else STAGE_QUEUED)
+                time.sleep(delay)
     
     def generate_image(
         self,
@@ -95,151 +264,100 @@ class GeminiEngine:
         reference_image_path: Optional[str] = None,
         phase: str = "1",
         character_name: str = "Model",
-        usage_tracker = None
+        usage_tracker = None,
+        force_regenerate: bool = False,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Optional[Path]:
+        """
+        Generate an image (served from the generation cache when possible)
         
-        if not self.client:
-            print_error("Client not initialized")
-            return None
+        Args:
+            force_regenerate: Bypass the cache and always call the API
+            progress_callback: Called with each stage (queued, rate_limited, in_flight, decoding, saved),
+                overrides the engine's default callback
         
-        # Check session state availability
-        if not hasattr(st, 'session_state'):
-            logger.error("❌ Streamlit session_state not available")
-            print_error("Streamlit session not available")
-            return None
+        Returns:
+            Path of the saved image, or None (see last_error)
+        """
+        callback = progress_callback or self.progress_callback
         
-        # Check persistent_monitor availability
-        if 'persistent_monitor' not in st.session_state:
-            logger.error("❌ Persistent monitor not found in session state")
-            print_error("Persistent monitor not initialized")
-            return None
+        def report(stage: str):
+            if callback:
+                callback(stage)
         
-        logger.info("✅ Session state and persistent monitor available")
+        report(STAGE_QUEUED)
         
-        contents = [prompt]
+        self.last_error = None
+        if not self.client:
+            print_error("Client not initialized")
+            return None
         
         # Track input tokens (estimate: ~4 chars per token)
         if usage_tracker:
             estimated_input_tokens = len(prompt) // 4
             usage_tracker.add_tokens(input_tokens=estimated_input_tokens)
         
-        if reference_image_path:
-            try:
-                logger.info(f"📸 Loading reference image: {reference_image_path}")
-                # Resize image to 768px max before sending to API
-                img_bytes = self._resize_image_to_768px(reference_image_path)
-                contents.append(types.Part.from_bytes(data=img_bytes, mime_type="image/png"))
-                logger.info("✅ Reference image loaded and resized")
+        try:
+            contents = self._build_contents(prompt, reference_image_path)
+            if reference_image_path:
                 print_success("Reference image loaded")
-            except Exception as e:
-                logger.error(f"❌ Could not load reference image: {e}")
-                print_error("Could not load reference image")
-                return None
+        except Exception as e:
+            self.last_error = InvalidInputError(f"Could not load reference image: {e}", reached_server=False)
+            logger.error(f"❌ {self.last_error}")
+            print_error("Could not load reference image")
+            return None
+        
+        # Cache : même prompt + même référence + même config = même résultat, sans quota
+        self.last_cache_hit = False
+        cache_key = self._cache_key(contents) if self.cache else None
+        if cache_key and not force_regenerate:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("♻️ Generation cache hit, no API call")
+                self.last_cache_hit = True
+                file_path = self._save_image_bytes(cached, phase, character_name)
+                if file_path:
+                    report(STAGE_SAVED)
+                    if self.open_results:
+                        open_file(file_path)
+                return file_path
         
         logger.info(f"🎨 Generating image (Resolution: {self.config['image_size']}, Ratio: {self.config['aspect_ratio']})")
         print_info(f"Generating image (Resolution: {self.config['image_size']}, Ratio: {self.config['aspect_ratio']})...")
         
-        # Enforce rate limiting (2s between requests)
-        self._enforce_rate_limit()
+        try:
+            response = self._send_request(contents, self.config, len(prompt) // 4, report)
+        except Exception as e:
+            self.last_error = classify_error(e)
+            logger.error(f"❌ Generation failed ({type(self.last_error).__name__}): {self.last_error}")
+            print_error(f"Generation failed: {self.last_error}")
+            return None
         
         try:
-            logger.info("📡 Sending request to Gemini API...")
-            
-            # Safety settings: BLOCK_NONE for all categories (required for face processing)
-            safety_settings = [
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HATE_SPEECH",
-                    threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_HARASSMENT",
-                    threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    threshold="BLOCK_NONE"
-                ),
-                types.SafetySetting(
-                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                    threshold="BLOCK_NONE"
-                )
-            ]
-            
-            # Check API limits before making request
-            if not self.tracker.check_limits():
-                logger.error("❌ Daily API limit reached")
-                st.error("🚫 Limite API journalière atteinte (250/250)")
-                return None
-            
-            # Track this request
-            if not self.tracker.track_request():
-                logger.error("❌ Request blocked by rate limiter")
-                st.error("⏱️ Trop de requêtes, veuillez attendre")
-                return None
-            
-            response = self.client.models.generate_content(
-                model=Config.MODEL_IMAGE,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    temperature=self.config['temperature'],
-                    top_p=self.config['top_p'],
-                    response_modalities=["IMAGE"],
-                    safety_settings=safety_settings,
-                    image_config=types.ImageConfig(
-                        image_size=self.config['image_size'],
-                        aspect_ratio=self.config['aspect_ratio']
-                    )
-                )
-            )
-            
             logger.info("✅ API response received")
+            report(STAGE_DECODING)
 
-            # Tracking Automatique: Récupère le chiffre exact
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                # Après l'appel API, récupère le chiffre exact : tokens = response.usage_metadata.total_token_count
-                tokens = response.usage_metadata.total_token_count
-                logger.info(f"📊 Exact tokens used: {tokens}")
-                
-                # Ajoute-le immédiatement au persistent_monitor pour qu'il soit sauvegardé
-                if 'persistent_monitor' in st.session_state:
-                    st.session_state.persistent_monitor.add_tokens(tokens)
-                    logger.info(f"✅ Persistent monitor updated with exact {tokens} tokens")
-                    logger.info("🎯 Quota 100K updated instantly in sidebar")
-                else:
-                    logger.error("❌ Persistent monitor not found in session state")
-                    
-            else:
-                logger.warning("⚠️ No usage metadata in response")
+            # Tokens déjà comptés dans _send_request (chiffre exact de l'API)
+            image_bytes = self._extract_image_bytes(response)
+            if image_bytes is None:
+                self.last_error = GeminiError("No image data received from API")
+                return None
+            if cache_key:
+                self.cache.put(cache_key, image_bytes)
             
-            # Track requests for daily limit
-            if 'request_tracker' in st.session_state:
-                st.session_state.request_tracker.track_request()
-                logger.info("✅ Request tracker updated")
-
-            if response.candidates and response.candidates[0].content.parts[0].inline_data:
-                logger.info("💾 Saving generated image...")
-                part = response.candidates[0].content.parts[0]
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"Phase{phase}_{character_name}_{self.config['image_size']}_{timestamp}.png"
-                file_path = Config.OUTPUT_DIR / filename
-                
+            file_path = self._save_image_bytes(image_bytes, phase, character_name)
+            if file_path:
+                report(STAGE_SAVED)
                 # Track image generation
+                self.usage_sink.add_image()
                 if usage_tracker:
                     usage_tracker.add_image()
-                
-                if save_binary_file(file_path, part.inline_data.data):
-                    logger.info(f"✅ Image saved: {filename}")
+                if self.open_results:
                     open_file(file_path)
-                    return file_path
-                else:
-                    logger.error("❌ Failed to save image file")
-                    return None
-            else:
-                logger.error("❌ No image data received from API")
-                print_error("No image data received from API")
-                return None
+            return file_path
 
         except Exception as e:
+            self.last_error = classify_error(e)
             logger.error(f"❌ Generation failed: {e}")
             logger.error(f"   Exception type: {type(e).__name__}")
             logger.error(f"   Exception details: {str(e)}")
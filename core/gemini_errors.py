@@ -0,0 +1,134 @@
+"""
+Gemini Errors - Structured API failures and retry policy
+Classifies google-genai / network exceptions into quota, transient,
+safety-block and invalid-input errors, and computes backoff delays.
+"""
+import random
+import re
+from typing import Optional
+
+import httpx
+from google.genai import errors as genai_errors
+
+from core.config import Config
+
+
+class GeminiError(Exception):
+    """Base class of classified generation errors"""
+
+    retryable = False
+
+    def __init__(self, message: str, reached_server: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.reached_server = reached_server  # False = le quota consommé peut être remboursé
+        self.retry_after = retry_after        # Délai imposé par le serveur (secondes)
+
+
+class QuotaError(GeminiError):
+    """Rate or daily limit hit (HTTP 429 / RESOURCE_EXHAUSTED, or local limiter)"""
+    retryable = True
+
+
+class TransientError(GeminiError):
+    """Network failure, timeout or 5xx: worth retrying"""
+    retryable = True
+
+
+class SafetyBlockError(GeminiError):
+    """Prompt or output blocked by the safety filters"""
+
+
+class InvalidInputError(GeminiError):
+    """Bad request (400, unreadable reference image...): retrying won't help"""
+
+
+SAFETY_REASONS = ("SAFETY", "PROHIBITED_CONTENT", "IMAGE_SAFETY", "BLOCKLIST", "SPII", "RECITATION")
+
+
+def _parse_duration(value) -> Optional[float]:
+    """'17s' / '1.5s' / '30' -> seconds"""
+    if value is None:
+        return None
+    match = re.match(r"^\s*([\d.]+)\s*s?\s*$", str(value))
+    return float(match.group(1)) if match else None
+
+
+def _retry_after(exc: genai_errors.APIError) -> Optional[float]:
+    """Server-provided delay: Retry-After header, then google.rpc.RetryInfo"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        delay = _parse_duration(headers.get("retry-after"))
+        if delay is not None:
+            return delay
+
+    details = exc.details if isinstance(exc.details, dict) else {}
+    for detail in details.get("error", details).get("details", []) or []:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("RetryInfo"):
+            return _parse_duration(detail.get("retryDelay"))
+    return None
+
+
+def classify_error(exc: Exception) -> GeminiError:
+    """Map any exception raised by a generation call to a GeminiError"""
+    if isinstance(exc, GeminiError):
+        return exc
+
+    if isinstance(exc, genai_errors.APIError):
+        message = f"{exc.code} {exc.status}: {exc.message}"
+        if exc.code == 429 or exc.status == "RESOURCE_EXHAUSTED":
+            return QuotaError(message, retry_after=_retry_after(exc))
+        if exc.code in (408, 500, 502, 503, 504) or isinstance(exc, genai_errors.ServerError):
+            return TransientError(message, retry_after=_retry_after(exc))
+        return InvalidInputError(message)
+
+    # Erreurs transport : la requête n'a jamais été traitée par le serveur
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return TransientError(f"Connection failed: {exc}", reached_server=False)
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return TransientError(f"Network error: {exc}")
+
+    return GeminiError(f"{type(exc).__name__}: {exc}")
+
+
+def check_response(response) -> None:
+    """Raise SafetyBlockError if the response was blocked instead of returning an image"""
+    feedback = getattr(response, "prompt_feedback", None)
+    block_reason = getattr(feedback, "block_reason", None) if feedback else None
+    if block_reason:
+        raise SafetyBlockError(f"Prompt blocked: {block_reason}")
+
+    for candidate in getattr(response, "candidates", None) or []:
+        reason = str(getattr(candidate, "finish_reason", "") or "")
+        if any(r in reason for r in SAFETY_REASONS):
+            raise SafetyBlockError(f"Output blocked: {reason}")
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring server retry-after"""
+
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None):
+        settings = Config.GEMINI_RETRY
+        self.max_attempts = max_attempts or settings["max_attempts"]
+        self.base_delay = base_delay or settings["base_delay"]
+        self.max_delay = max_delay or settings["max_delay"]
+
+    def delay_for(self, error: GeminiError, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt
+
+        Args:
+            error: Classified error of the failed attempt
+            attempt: Index of the failed attempt (0 = first)
+
+        Returns:
+            Delay in seconds, or None to give up
+        """
+        if not error.retryable or attempt + 1 >= self.max_attempts:
+            return None
+        if error.retry_after is not None:
+            if error.retry_after > self.max_delay:
+                return None
+            # Petit jitter pour que les sessions ne repartent pas toutes ensemble
+            return error.retry_after + random.uniform(0, 1.0)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
@@ -0,0 +1,146 @@
+"""
+Generation Cache - Content-addressed store of generated images
+Key = hash(model, prompt, reference bytes, generation config).
+Size-bounded with LRU eviction (file mtime is refreshed on every hit).
+Hits and misses are recorded in the usage ledger, so the stats include the
+lookups of the job worker process.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.config import Config
+from core.usage_ledger import UsageLedger, get_usage_ledger
+
+
+class GenerationCache:
+    """On-disk LRU cache of Gemini results"""
+
+    SIZE_REFRESH = 60.0  # Secondes avant de recompter le disque (écritures des autres processus)
+
+    def __init__(self, cache_dir: Path = None, max_bytes: int = None, ledger: UsageLedger = None):
+        self.cache_dir = cache_dir or Config.GENERATION_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.GENERATION_CACHE_MAX_MB * 1024 * 1024
+        self.ledger = ledger or get_usage_ledger()
+        self._lock = threading.Lock()
+        self._size_bytes: Optional[int] = None  # Calculé au premier besoin
+        self._size_checked = 0.0
+
+    @staticmethod
+    def make_key(model: str, prompt: str, reference_bytes: Optional[bytes], config: Dict[str, Any]) -> str:
+        """Content hash identifying one generation request"""
+        h = hashlib.sha256()
+        h.update(model.encode('utf-8'))
+        h.update(b"\0")
+        h.update(prompt.encode('utf-8'))
+        h.update(b"\0")
+        h.update(hashlib.sha256(reference_bytes).digest() if reference_bytes else b"-")
+        h.update(b"\0")
+        h.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _entries(self):
+        return [p for p in self.cache_dir.glob("*/*.png") if p.is_file()]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached image bytes for a key (None on miss)"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Entrée la plus récemment utilisée
+        except OSError:
+            self.ledger.record_cache(hit=False)
+            return None
+
+        self.ledger.record_cache(hit=True)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store image bytes, then evict least recently used entries if over budget"""
+        path = self._path(key)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Fichier temporaire unique : l'UI et le worker peuvent écrire la même clé en même temps
+            with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{key}.", suffix=".tmp", delete=False) as f:
+                tmp_path = f.name
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Generation cache write failed: {e}")
+            if tmp_path:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._size_bytes += len(data)
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove oldest entries until the cache fits in max_bytes (lock held)"""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+                entries.append((stat.st_mtime, stat.st_size, p))
+            except OSError:
+                continue
+        entries.sort()
+
+        self._size_bytes = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if self._size_bytes <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                self._size_bytes -= size
+            except OSError:
+                pass
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters (all processes) and disk usage"""
+        with self._lock:
+            stale = time.monotonic() - self._size_checked >= self.SIZE_REFRESH
+            if (self._size_bytes is None or stale) and self.cache_dir.exists():
+                self._size_bytes = sum(p.stat().st_size for p in self._entries())
+                self._size_checked = time.monotonic()
+            size_bytes = self._size_bytes or 0
+
+        totals = self.ledger.get_totals()
+        hits, misses = totals["cache_hits"], totals["cache_misses"]
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / lookups) * 100 if lookups else 0.0,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+_cache: Optional[GenerationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> GenerationCache:
+    """Get the process-wide generation cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache()
+        return _cache
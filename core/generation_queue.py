@@ -0,0 +1,247 @@
+"""
+Generation Queue - Concurrent Gemini generation
+Runs GeminiEngine requests on the google-genai async client in a background
+event loop, with bounded concurrency tied to the quota limiter.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, as_completed, CancelledError
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from core.config import Config
+from core.gemini_engine import (
+    GeminiEngine,
+    STAGE_QUEUED,
+    STAGE_RATE_LIMITED,
+    STAGE_IN_FLIGHT,
+    STAGE_DECODING,
+    STAGE_SAVED
+)
+from core.gemini_errors import GeminiError, QuotaError, classify_error, check_response
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJob:
+    """One queued generation, backed by a thread-safe future"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self,
+                 prompt: str,
+                 reference_image_path: Optional[str],
+                 phase: str,
+                 character_name: str,
+                 config: Dict[str, Any],
+                 force_regenerate: bool = False,
+                 on_status: Optional[Callable[[str], None]] = None):
+        self.job_id = next(self._ids)
+        self.prompt = prompt
+        self.reference_image_path = reference_image_path
+        self.phase = phase
+        self.character_name = character_name
+        self.config = config
+        self.force_regenerate = force_regenerate
+        self.on_status = on_status
+        self.status = STAGE_QUEUED
+        self.cache_hit = False
+        self.error: Optional[GeminiError] = None
+        self.attempts = 0
+        self.future: Optional[Future] = None
+        
+        # Horodatages (time.monotonic) pour le temps écoulé et l'ETA
+        self.submitted_at = time.monotonic()
+        self.sent_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def set_status(self, status: str):
+        self.status = status
+        if status == STAGE_IN_FLIGHT:
+            self.sent_at = time.monotonic()
+        elif status in (STAGE_SAVED, "failed", "cancelled"):
+            self.finished_at = time.monotonic()
+        if self.on_status:
+            # Appelé de façon synchrone : in_flight est persisté AVANT l'envoi de la requête
+            self.on_status(status)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since submission (frozen once finished)"""
+        return (self.finished_at or time.monotonic()) - self.submitted_at
+
+    @property
+    def in_flight_elapsed(self) -> float:
+        """Seconds since the request was sent to the API (0 if not sent)"""
+        if self.sent_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.sent_at
+
+    def cancel(self) -> bool:
+        """Cancel the job (queued or in flight). Returns True if cancelled."""
+        cancelled = self.future.cancel() if self.future else False
+        if cancelled:
+            self.set_status("cancelled")
+        return cancelled
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Optional[Path]:
+        """Generated image path (None if the generation failed)"""
+        return self.future.result(timeout=timeout)
+
+
+class GenerationQueue:
+    """Async generation queue with bounded parallelism"""
+
+    def __init__(self, engine: GeminiEngine = None, max_concurrency: int = 3):
+        self.engine = engine or GeminiEngine(open_results=False)
+        self.max_concurrency = max_concurrency
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="gemini-queue", daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(), self._loop).result()
+
+    async def _make_semaphore(self) -> asyncio.Semaphore:
+        # Le sémaphore doit être créé dans la boucle qui l'utilise
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def submit(self,
+               prompt: str,
+               reference_image_path: Optional[str] = None,
+               phase: str = "1",
+               character_name: str = "Model",
+               force_regenerate: bool = False,
+               on_status: Optional[Callable[[str], None]] = None,
+               **config) -> GenerationJob:
+        """
+        Queue one generation and return its job immediately
+        
+        Args:
+            force_regenerate: Bypass the generation cache
+            on_status: Called with each stage change (from the queue thread)
+            config: Overrides of the engine config for this job (image_size, aspect_ratio...)
+        """
+        job = GenerationJob(
+            prompt, reference_image_path, phase, character_name,
+            {**self.engine.config, **config}, force_regenerate, on_status
+        )
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+        return job
+
+    def submit_many(self, prompts: Iterable[str], **kwargs) -> List[GenerationJob]:
+        """Queue several prompts sharing the same reference/phase/name"""
+        return [self.submit(prompt, **kwargs) for prompt in prompts]
+
+    @staticmethod
+    def as_completed(jobs: List[GenerationJob], timeout: Optional[float] = None) -> Iterator[GenerationJob]:
+        """Yield jobs as they finish (fastest first)"""
+        by_future = {job.future: job for job in jobs}
+        for future in as_completed(by_future, timeout=timeout):
+            yield by_future[future]
+
+    async def _run(self, job: GenerationJob) -> Optional[Path]:
+        engine = self.engine
+        try:
+            async with self._semaphore:
+                contents = await asyncio.to_thread(engine._build_contents, job.prompt, job.reference_image_path)
+                
+                cache_key = engine._cache_key(contents, job.config) if engine.cache else None
+                if cache_key and not job.force_regenerate:
+                    cached = await asyncio.to_thread(engine.cache.get, cache_key)
+                    if cached is not None:
+                        job.cache_hit = True
+                        file_path = await asyncio.to_thread(
+                            engine._save_image_bytes, cached, job.phase, job.character_name, job.config['image_size']
+                        )
+                        job.set_status(STAGE_SAVED if file_path else "failed")
+                        return file_path
+
+                response = await self._send_request(job, contents, len(job.prompt) // 4)
+                job.set_status(STAGE_DECODING)
+
+                image_bytes = engine._extract_image_bytes(response)
+                if image_bytes is None:
+                    job.error = GeminiError("No image data received from API")
+                    job.set_status("failed")
+                    return None
+                if cache_key:
+                    await asyncio.to_thread(engine.cache.put, cache_key, image_bytes)
+                
+                file_path = await asyncio.to_thread(
+                    engine._save_image_bytes, image_bytes, job.phase, job.character_name, job.config['image_size']
+                )
+                if file_path:
+                    await asyncio.to_thread(engine.usage_sink.add_image)
+                job.set_status(STAGE_SAVED if file_path else "failed")
+                return file_path
+
+        except (asyncio.CancelledError, CancelledError):
+            job.set_status("cancelled")
+            raise
+        except Exception as e:
+            job.error = classify_error(e)
+            logger.error(f"❌ Job {job.job_id} failed ({type(job.error).__name__}): {job.error}")
+            job.set_status("failed")
+            return None
+
+    async def _send_request(self, job: GenerationJob, contents: list, estimated_tokens: int):
+        """
+        Async counterpart of GeminiEngine._send_request (quota, retries, refunds)
+        
+        The tracker talks to SQLite (up to the busy timeout): every call runs in a
+        worker thread so a locked database never stalls the other in-flight jobs.
+        """
+        engine = self.engine
+        policy = engine.retry_policy
+        for attempt in range(policy.max_attempts):
+            job.attempts = attempt + 1
+            if not await asyncio.to_thread(engine.tracker.check_limits):
+                raise QuotaError(f"Daily API limit reached ({engine.tracker.daily_limit})", reached_server=False)
+            
+            if await asyncio.to_thread(engine.tracker.estimate_wait, estimated_tokens) > 0:
+                job.set_status(STAGE_RATE_LIMITED)
+            if not await engine.tracker.acquire_async(tokens=estimated_tokens, timeout=engine.MAX_QUOTA_WAIT):
+                raise QuotaError("Request blocked by rate limiter", reached_server=False)
+            
+            job.set_status(STAGE_IN_FLIGHT)
+            logger.info(f"📡 Job {job.job_id}: sending request to Gemini API (attempt {job.attempts})...")
+            try:
+                response = await engine.client.aio.models.generate_content(
+                    model=Config.MODEL_IMAGE,
+                    contents=contents,
+                    config=engine._build_request_config(job.config)
+                )
+                await asyncio.to_thread(engine.usage_sink.record_latency, job.in_flight_elapsed)
+                # Facturé même si la réponse est bloquée : compté avant check_response
+                await asyncio.to_thread(engine._record_usage, response)
+                check_response(response)
+                return response
+            except Exception as e:
+                error = classify_error(e)
+                if not error.reached_server:
+                    await asyncio.to_thread(engine.tracker.refund, estimated_tokens)
+                
+                delay = policy.delay_for(error, attempt)
+                if delay is None:
+                    if error is e:
+                        raise
+                    raise error from e
+                
+                logger.warning(f"⚠️ Job {job.job_id}: {type(error).__name__}: {error} - retrying in {delay:.1f}s")
+                job.set_status(STAGE_RATE_LIMITED if isinstance(error, QuotaError) else STAGE_QUEUED)
+                await asyncio.sleep(delay)
+    
+    def expected_latency(self) -> float:
+        """ETA of one API request, from historical latencies"""
+        return self.engine.usage_sink.get_expected_latency()
+
+    def shutdown(self):
+        """Stop the background event loop"""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
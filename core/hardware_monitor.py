@@ -0,0 +1,176 @@
+"""
+Hardware Monitor - RAM / CPU / VRAM sampled in the background
+A daemon thread polls psutil and NVML at a fixed rate into a ring buffer.
+NVML is initialised once for the life of the process (never per rerun), and
+the UI only reads the latest sample or the recent history (sparklines).
+Without an NVIDIA GPU or nvidia-ml-py, GPU fields stay None.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+import psutil
+
+from core.config import Config
+
+try:
+    import pynvml
+    NVML_AVAILABLE = True
+except ImportError:
+    NVML_AVAILABLE = False
+
+GB = 1024 ** 3
+
+
+class HardwareSample(NamedTuple):
+    timestamp: float
+    cpu_percent: float
+    ram_used: int               # Octets
+    ram_total: int
+    ram_percent: float
+    vram_used: Optional[int]    # None sans GPU NVIDIA
+    vram_total: Optional[int]
+    gpu_util: Optional[float]
+
+    @property
+    def vram_percent(self) -> Optional[float]:
+        if not self.vram_total:
+            return None
+        return self.vram_used / self.vram_total * 100
+
+
+class HardwareMonitor:
+    """Background sampler with a bounded history of HardwareSample"""
+
+    def __init__(self, interval: float = None, history: int = None):
+        """
+        Args:
+            interval: Seconds between two samples
+            history: Samples kept in the ring buffer
+        """
+        settings = Config.HARDWARE_MONITOR
+        self.interval = interval or settings["interval"]
+        self._samples: deque = deque(maxlen=history or settings["history"])
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.gpu_name: Optional[str] = None
+        self.gpu_error: Optional[str] = None
+        self._handle = None
+
+    # ------------------------------------------------------------------
+    # NVML (initialisé une seule fois)
+    # ------------------------------------------------------------------
+
+    def _init_gpu(self):
+        if not NVML_AVAILABLE:
+            self.gpu_error = "nvidia-ml-py not installed"
+            return
+        try:
+            pynvml.nvmlInit()
+            self._handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            name = pynvml.nvmlDeviceGetName(self._handle)
+            # Selon la version de pynvml : bytes ou str
+            self.gpu_name = name.decode('utf-8') if isinstance(name, bytes) else name
+        except Exception as e:
+            self._handle = None
+            self.gpu_error = str(e)
+
+    def _shutdown_gpu(self):
+        if self._handle is None:
+            return
+        self._handle = None
+        try:
+            pynvml.nvmlShutdown()
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _sample(self) -> HardwareSample:
+        ram = psutil.virtual_memory()
+        vram_used = vram_total = gpu_util = None
+        if self._handle is not None:
+            try:
+                info = pynvml.nvmlDeviceGetMemoryInfo(self._handle)
+                vram_used, vram_total = info.used, info.total
+                gpu_util = float(pynvml.nvmlDeviceGetUtilizationRates(self._handle).gpu)
+            except Exception as e:
+                self.gpu_error = str(e)
+        # interval=None : CPU moyen depuis l'appel précédent (non bloquant)
+        return HardwareSample(time.time(), psutil.cpu_percent(interval=None),
+                              ram.used, ram.total, ram.percent,
+                              vram_used, vram_total, gpu_util)
+
+    def _run(self):
+        self._init_gpu()
+        psutil.cpu_percent(interval=None)  # Amorce la mesure CPU
+        try:
+            while True:
+                try:
+                    sample = self._sample()
+                    with self._lock:
+                        self._samples.append(sample)
+                except Exception as e:
+                    print(f"⚠️ Hardware sample failed: {e}")
+                if self._stop.wait(self.interval):
+                    break
+        finally:
+            self._shutdown_gpu()
+
+    def start(self) -> "HardwareMonitor":
+        """Start the sampler thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="hardware-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # ------------------------------------------------------------------
+    # Reads (jamais bloquantes)
+    # ------------------------------------------------------------------
+
+    @property
+    def gpu_available(self) -> bool:
+        return self._handle is not None
+
+    def latest(self) -> Optional[HardwareSample]:
+        """Most recent sample, None until the first one is taken"""
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def history(self) -> List[HardwareSample]:
+        """Samples of the ring buffer, oldest first"""
+        with self._lock:
+            return list(self._samples)
+
+    def series(self) -> Dict[str, List[float]]:
+        """Per-metric percentages for sparklines (GPU series empty without NVML)"""
+        samples = self.history()
+        return {
+            "cpu": [s.cpu_percent for s in samples],
+            "ram": [s.ram_percent for s in samples],
+            "vram": [s.vram_percent for s in samples if s.vram_total],
+            "gpu": [s.gpu_util for s in samples if s.gpu_util is not None],
+        }
+
+
+_monitor: Optional[HardwareMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_hardware_monitor() -> HardwareMonitor:
+    """Get the process-wide hardware monitor (sampler started on first use)"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HardwareMonitor().start()
+        return _monitor
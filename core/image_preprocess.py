@@ -0,0 +1,121 @@
+"""
+Reference Image Preprocessing
+Fast downscaling (JPEG draft mode + reduce()) and compact JPEG/WebP encoding
+of reference images, memoized by file hash + mtime.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from core.config import Config
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+
+class ReferencePreprocessor:
+    """Encode reference images once, reuse them across phases and retries"""
+
+    def __init__(self,
+                 max_size: int = None,
+                 image_format: str = None,
+                 quality: int = None,
+                 cache_size: int = 32):
+        settings = Config.REFERENCE_IMAGE
+        self.max_size = max_size or settings["max_size"]
+        self.image_format = (image_format or settings["format"]).upper()
+        self.quality = quality or settings["quality"]
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._hashes: "OrderedDict[tuple, str]" = OrderedDict()
+        self._encoded: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def _file_hash(self, path: Path) -> Tuple[str, Optional[bytes]]:
+        """Content hash of a file, memoized by (path, size, mtime). Returns the bytes if read."""
+        stat = path.stat()
+        stat_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(stat_key)
+        if digest is not None:
+            return digest, None
+
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            self._hashes[stat_key] = digest
+            while len(self._hashes) > self.cache_size * 4:
+                self._hashes.popitem(last=False)
+        return digest, raw
+
+    def _encode(self, raw: bytes) -> bytes:
+        """Downscale to max_size on the longest side and re-encode"""
+        with Image.open(io.BytesIO(raw)) as img:
+            if img.format == "JPEG":
+                # Décodage réduit dans le domaine DCT (1/2, 1/4, 1/8) : bien plus rapide
+                img.draft("RGB", (self.max_size, self.max_size))
+
+            # reduce() refuse les modes palette / 1 bit : conversion avant toute mise à l'échelle
+            if self.image_format == "PNG":
+                mode = img.mode if img.mode in ("RGB", "RGBA", "L") else "RGBA"
+            else:
+                mode = img.mode if img.mode in ("RGB", "L") else "RGB"
+            if img.mode != mode:
+                img = img.convert(mode)
+
+            factor = max(img.size) // self.max_size
+            if factor >= 2:
+                # Réduction entière rapide (box filter) avant le redimensionnement fin
+                img = img.reduce(factor)
+
+            if max(img.size) > self.max_size:
+                img = img.copy()
+                img.thumbnail((self.max_size, self.max_size), Image.Resampling.LANCZOS)
+
+            buffer = io.BytesIO()
+            if self.image_format == "PNG":
+                img.save(buffer, format="PNG", optimize=True)
+            else:
+                img.save(buffer, format=self.image_format, quality=self.quality)
+            return buffer.getvalue()
+
+    def prepare(self, image_path) -> Tuple[bytes, str]:
+        """
+        Get the encoded reference image
+
+        Returns:
+            Tuple (image bytes, mime type)
+        """
+        path = Path(image_path)
+        digest, raw = self._file_hash(path)
+        mime_type = MIME_TYPES[self.image_format]
+
+        with self._lock:
+            encoded = self._encoded.get(digest)
+            if encoded is not None:
+                self._encoded.move_to_end(digest)
+                return encoded, mime_type
+
+        encoded = self._encode(raw if raw is not None else path.read_bytes())
+        with self._lock:
+            self._encoded[digest] = encoded
+            while len(self._encoded) > self.cache_size:
+                self._encoded.popitem(last=False)
+        return encoded, mime_type
+
+
+_preprocessor: Optional[ReferencePreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_reference_preprocessor() -> ReferencePreprocessor:
+    """Get the process-wide reference preprocessor"""
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = ReferencePreprocessor()
+        return _preprocessor
@@ -0,0 +1,349 @@
+"""
+Job Store - Durable job queue
+SQLite (WAL mode) queue of generation / face swap jobs executed by the
+background worker (tools/job_worker.py). Jobs survive Streamlit reruns,
+closed tabs and worker crashes.
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_JOB_DB = Path(__file__).parent.parent / "data" / "jobs.sqlite3"
+
+KIND_GENERATE = "generate"
+KIND_FACE_SWAP = "face_swap"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobStore:
+    """Process-safe job queue with leases and idempotent job IDs"""
+
+    LEASE_SECONDS = 60.0   # Un job dont le bail expire est récupéré par un autre worker
+    WORKER_TIMEOUT = 15.0  # Worker considéré mort sans heartbeat depuis ce délai
+
+    def __init__(self, db_file: Path = None):
+        self.db_file = db_file or DEFAULT_JOB_DB
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                batch_id TEXT,
+                position INTEGER NOT NULL DEFAULT 0,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                submitted INTEGER NOT NULL DEFAULT 0,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                error_type TEXT,
+                worker_id TEXT,
+                lease_until REAL,
+                created REAL NOT NULL,
+                started REAL,
+                sent REAL,
+                finished REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, position)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                host TEXT NOT NULL,
+                started REAL NOT NULL,
+                heartbeat REAL NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # ------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_job_id(kind: str, payload: Dict[str, Any], nonce: str = "") -> str:
+        """Deterministic job ID: same kind + payload + nonce = same job"""
+        h = hashlib.sha256()
+        h.update(kind.encode('utf-8'))
+        h.update(json.dumps(payload, sort_keys=True, default=str).encode('utf-8'))
+        h.update(nonce.encode('utf-8'))
+        return h.hexdigest()[:32]
+
+    @staticmethod
+    def new_batch_id() -> str:
+        return uuid.uuid4().hex[:16]
+
+    def enqueue(self,
+                kind: str,
+                payload: Dict[str, Any],
+                job_id: Optional[str] = None,
+                batch_id: Optional[str] = None,
+                position: int = 0) -> str:
+        """
+        Add a job (idempotent: enqueuing an existing job_id is a no-op)
+
+        Args:
+            job_id: Idempotency key chosen by the caller (random if omitted)
+
+        Returns:
+            str: The job ID
+        """
+        job_id = job_id or self.make_job_id(kind, payload, batch_id or uuid.uuid4().hex)
+        self._connect().execute(
+            """INSERT OR IGNORE INTO jobs (job_id, batch_id, position, kind, payload, status, created)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (job_id, batch_id, position, kind, json.dumps(payload, default=str), JOB_QUEUED, time.time())
+        )
+        return job_id
+
+    def enqueue_batch(self, kind: str, payloads: Iterable[Dict[str, Any]], batch_id: Optional[str] = None) -> str:
+        """
+        Add a batch of jobs in one transaction
+
+        Returns:
+            str: The batch ID (re-enqueuing the same batch ID adds nothing twice)
+        """
+        batch_id = batch_id or self.new_batch_id()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for position, payload in enumerate(payloads):
+                self.enqueue(kind, payload, job_id=f"{batch_id}:{position}", batch_id=batch_id, position=position)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return batch_id
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+
+    def _recover_expired(self, conn: sqlite3.Connection, now: float):
+        """Requeue jobs of dead workers, except those already sent to a paid API"""
+        conn.execute(
+            """UPDATE jobs SET status = ?, error = 'Worker stopped after the request was sent (not retried to avoid double billing)',
+                              error_type = 'WorkerLost', finished = ?, worker_id = NULL, lease_until = NULL
+               WHERE status = ? AND lease_until < ? AND submitted = 1""",
+            (JOB_FAILED, now, JOB_RUNNING, now)
+        )
+        conn.execute(
+            """UPDATE jobs SET status = ?, stage = NULL, worker_id = NULL, lease_until = NULL, started = NULL
+               WHERE status = ? AND lease_until < ? AND submitted = 0""",
+            (JOB_QUEUED, JOB_RUNNING, now)
+        )
+
+    def claim(self, worker_id: str, kinds: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job (None if the queue is empty)"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover_expired(conn, now)
+
+            query = "SELECT * FROM jobs WHERE status = ?"
+            params: list = [JOB_QUEUED]
+            if kinds:
+                kinds = list(kinds)
+                query += f" AND kind IN ({','.join('?' * len(kinds))})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY created, position LIMIT 1", params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_until = ?, started = ? WHERE job_id = ?",
+                (JOB_RUNNING, worker_id, now + self.LEASE_SECONDS, now, row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        job = self._row(row)
+        job.update(status=JOB_RUNNING, worker_id=worker_id, started=now)
+        return job
+
+    def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease of a running job. Returns False if cancellation was requested."""
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+            (time.time() + self.LEASE_SECONDS, job_id, worker_id, JOB_RUNNING)
+        )
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None and not row["cancel_requested"]
+
+    def set_stage(self, job_id: str, stage: str, submitted: bool = False):
+        """Record the progress stage; submitted=True once the request is sent to a paid API"""
+        if submitted:
+            self._connect().execute(
+                "UPDATE jobs SET stage = ?, submitted = 1, sent = ? WHERE job_id = ?",
+                (stage, time.time(), job_id)
+            )
+        else:
+            self._connect().execute("UPDATE jobs SET stage = ? WHERE job_id = ?", (stage, job_id))
+
+    def complete(self, job_id: str, result: Dict[str, Any], worker_id: Optional[str] = None) -> bool:
+        return self._finish(job_id, JOB_DONE, worker_id, result=result)
+
+    def fail(self, job_id: str, error: str, error_type: str = "Error", worker_id: Optional[str] = None) -> bool:
+        return self._finish(job_id, JOB_FAILED, worker_id, error=error, error_type=error_type)
+
+    def _finish(self, job_id: str, status: str, worker_id: Optional[str] = None, result: Optional[Dict] = None,
+                error: Optional[str] = None, error_type: Optional[str] = None) -> bool:
+        """
+        Record the terminal state of a job
+
+        Args:
+            worker_id: Worker holding the job; if given, the update only applies while it
+                still owns the running job (a worker whose lease expired can't overwrite
+                a job already requeued or failed by _recover_expired)
+
+        Returns:
+            bool: False if the result was dropped (job no longer held by this worker)
+        """
+        query = """UPDATE jobs SET status = ?, result = ?, error = ?, error_type = ?, finished = ?, lease_until = NULL
+                   WHERE job_id = ?"""
+        params = [status, json.dumps(result, default=str) if result is not None else None,
+                  error, error_type, time.time(), job_id]
+        if worker_id is not None:
+            query += " AND worker_id = ? AND status = ?"
+            params += [worker_id, JOB_RUNNING]
+        return self._connect().execute(query, params).rowcount > 0
+
+    def mark_cancelled(self, job_id: str, worker_id: Optional[str] = None) -> bool:
+        return self._finish(job_id, JOB_CANCELLED, worker_id)
+
+    # ------------------------------------------------------------------
+    # Client side
+    # ------------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._row(self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def get_batch(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Jobs of a batch, in submission order"""
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE batch_id = ? ORDER BY position", (batch_id,)
+        ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def batch_summary(self, batch_id: str) -> Dict[str, int]:
+        """Job count per status for a batch"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) AS n FROM jobs WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ).fetchall()
+        summary = {row["status"]: row["n"] for row in rows}
+        summary["total"] = sum(summary.values())
+        return summary
+
+    def cancel_batch(self, batch_id: str):
+        """Cancel queued jobs and ask workers to stop running ones"""
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished = ? WHERE batch_id = ? AND status = ?",
+            (JOB_CANCELLED, time.time(), batch_id, JOB_QUEUED)
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE batch_id = ? AND status = ?",
+            (batch_id, JOB_RUNNING)
+        )
+
+    def resume_batch(self, batch_id: str) -> int:
+        """Requeue the failed / cancelled jobs of a batch (explicit user action)"""
+        cursor = self._connect().execute(
+            """UPDATE jobs SET status = ?, stage = NULL, submitted = 0, cancel_requested = 0, error = NULL,
+                              error_type = NULL, worker_id = NULL, started = NULL, sent = NULL, finished = NULL
+               WHERE batch_id = ? AND status IN (?, ?)""",
+            (JOB_QUEUED, batch_id, JOB_FAILED, JOB_CANCELLED)
+        )
+        return cursor.rowcount
+
+    def pending_count(self) -> int:
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (JOB_QUEUED, JOB_RUNNING)
+        ).fetchone()
+        return row[0]
+
+    # ------------------------------------------------------------------
+    # Worker registry
+    # ------------------------------------------------------------------
+
+    def register_worker(self, worker_id: str):
+        now = time.time()
+        self._connect().execute(
+            """INSERT OR REPLACE INTO workers (worker_id, pid, host, started, heartbeat)
+               VALUES (?, ?, ?, ?, ?)""",
+            (worker_id, os.getpid(), socket.gethostname(), now, now)
+        )
+
+    def worker_heartbeat(self, worker_id: str):
+        self._connect().execute(
+            "UPDATE workers SET heartbeat = ? WHERE worker_id = ?", (time.time(), worker_id)
+        )
+
+    def unregister_worker(self, worker_id: str):
+        self._connect().execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def alive_workers(self) -> List[Dict[str, Any]]:
+        """Workers that sent a heartbeat recently"""
+        rows = self._connect().execute(
+            "SELECT * FROM workers WHERE heartbeat >= ?", (time.time() - self.WORKER_TIMEOUT,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """Get the process-wide job store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
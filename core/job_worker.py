@@ -0,0 +1,303 @@
+"""
+Job Worker - Executes jobs from the durable JobStore
+Generation jobs run on the async GenerationQueue, face swaps on a single
+GPU thread. Started by tools/job_worker.py (or spawned by the UI).
+"""
+import logging
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from core.config import Config
+from core.job_store import JobStore, get_job_store, KIND_GENERATE, KIND_FACE_SWAP
+
+logger = logging.getLogger(__name__)
+
+WORKER_LOG = Config.BASE_DIR / "data" / "job_worker.log"
+
+
+class JobWorker:
+    """Claims jobs, runs them and records their results"""
+
+    POLL_INTERVAL = 0.5   # Secondes entre deux passages de la boucle
+    RENEW_INTERVAL = 5.0  # Secondes entre deux renouvellements de bail
+
+    def __init__(self,
+                 store: JobStore = None,
+                 concurrency: int = None,
+                 kinds: Optional[Iterable[str]] = None,
+                 idle_exit: Optional[float] = None):
+        """
+        Args:
+            concurrency: Max generation jobs in flight
+            kinds: Job kinds handled by this worker (default: all)
+            idle_exit: Stop after this many idle seconds (None = run forever)
+        """
+        self.store = store or get_job_store()
+        self.concurrency = concurrency or Config.JOB_WORKER["concurrency"]
+        self.kinds = list(kinds or (KIND_GENERATE, KIND_FACE_SWAP))
+        self.idle_exit = idle_exit
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+        self.active: Dict[str, Tuple[str, object]] = {}  # job_id -> (kind, handle)
+        self._queue = None
+        self._swap_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-swap")
+        self._swappers = {}
+        self._stop = threading.Event()
+        self._last_renew = 0.0
+
+    @property
+    def queue(self):
+        """Generation queue, created on the first generation job (imports google-genai)"""
+        if self._queue is None:
+            from core.gemini_engine import GeminiEngine
+            from core.generation_queue import GenerationQueue
+            self._queue = GenerationQueue(GeminiEngine(open_results=False), max_concurrency=self.concurrency)
+        return self._queue
+
+    # ------------------------------------------------------------------
+    # Job execution
+    # ------------------------------------------------------------------
+
+    def _free_kinds(self):
+        """Kinds for which this worker has spare capacity"""
+        running = [kind for kind, _ in self.active.values()]
+        free = []
+        if KIND_GENERATE in self.kinds and running.count(KIND_GENERATE) < self.concurrency:
+            free.append(KIND_GENERATE)
+        if KIND_FACE_SWAP in self.kinds and running.count(KIND_FACE_SWAP) < 1:
+            free.append(KIND_FACE_SWAP)
+        return free
+
+    def _start(self, job: Dict):
+        job_id = job["job_id"]
+        payload = job["payload"]
+
+        if job["kind"] == KIND_GENERATE:
+            from core.gemini_engine import STAGE_IN_FLIGHT
+
+            def on_status(stage: str):
+                self.store.set_stage(job_id, stage, submitted=stage == STAGE_IN_FLIGHT)
+
+            return self.queue.submit(
+                payload["prompt"],
+                reference_image_path=payload.get("reference_image_path"),
+                phase=payload.get("phase", "1"),
+                character_name=payload.get("character_name", "Model"),
+                force_regenerate=payload.get("force_regenerate", False),
+                on_status=on_status,
+                **payload.get("config", {})
+            )
+
+        if job["kind"] == KIND_FACE_SWAP:
+            return self._swap_pool.submit(self._run_face_swap, job)
+
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+    def _run_face_swap(self, job: Dict) -> Optional[Path]:
+        from core.batch_face_swap import BatchFaceSwap
+
+        payload = job["payload"]
+        engine = payload.get("engine", "local")
+        output_dir = Path(payload["output_dir"])
+
+        # Modèles chargés une fois par source (InsightFace est long à initialiser)
+        key = (payload["source"], engine)
+        if key not in self._swappers:
+            self._swappers[key] = BatchFaceSwap(Path(payload["source"]), output_dir, engine=engine)
+
+        # Replicate est facturé : on ne relance pas automatiquement après envoi
+        self.store.set_stage(job["job_id"], "in_flight", submitted=engine == "replicate")
+        return self._swappers[key].process_single(
+            Path(payload["target"]), output_dir, payload.get("naming_pattern"), payload.get("index", 1)
+        )
+
+    def _finish(self, job_id: str, kind: str, handle):
+        store, worker_id = self.store, self.worker_id
+        if kind == KIND_GENERATE:
+            from core.gemini_engine import STAGE_SAVED
+
+            if handle.status == "cancelled":
+                recorded = store.mark_cancelled(job_id, worker_id)
+            elif handle.status == STAGE_SAVED:
+                recorded = store.complete(job_id, {
+                    "path": str(handle.result()),
+                    "cache_hit": handle.cache_hit,
+                    "attempts": handle.attempts
+                }, worker_id)
+            else:
+                error = handle.error
+                recorded = store.fail(
+                    job_id,
+                    str(error) if error else "Generation failed",
+                    type(error).__name__ if error else "GeminiError",
+                    worker_id
+                )
+        else:
+            future: Future = handle
+            if future.cancelled():
+                recorded = store.mark_cancelled(job_id, worker_id)
+            elif future.exception() is not None:
+                exc = future.exception()
+                recorded = store.fail(job_id, str(exc), type(exc).__name__, worker_id)
+            elif future.result() is None:
+                recorded = store.fail(job_id, "Face swap failed (no face detected?)", "FaceSwapError", worker_id)
+            else:
+                recorded = store.complete(job_id, {"path": str(future.result())}, worker_id)
+
+        if not recorded:
+            # Bail expiré : le job a déjà été remis en file ou marqué en échec ailleurs
+            logger.warning(f"⚠️ Lease of job {job_id} lost, result dropped")
+
+    def step(self):
+        """One loop pass: claim, reap finished jobs, renew leases"""
+        kinds = self._free_kinds()
+        while kinds:
+            job = self.store.claim(self.worker_id, kinds)
+            if job is None:
+                break
+            try:
+                self.active[job["job_id"]] = (job["kind"], self._start(job))
+                logger.info(f"▶️ Job {job['job_id']} ({job['kind']}) started")
+            except Exception as e:
+                logger.error(f"❌ Job {job['job_id']} could not start: {e}")
+                self.store.fail(job["job_id"], str(e), type(e).__name__, self.worker_id)
+            kinds = self._free_kinds()
+
+        for job_id, (kind, handle) in list(self.active.items()):
+            if handle.done():
+                self._finish(job_id, kind, handle)
+                del self.active[job_id]
+                logger.info(f"⏹️ Job {job_id} finished")
+
+        now = time.monotonic()
+        if now - self._last_renew >= self.RENEW_INTERVAL:
+            self._last_renew = now
+            self.store.worker_heartbeat(self.worker_id)
+            for job_id, (kind, handle) in self.active.items():
+                if not self.store.renew_lease(job_id, self.worker_id):
+                    logger.info(f"🛑 Cancellation requested for job {job_id}")
+                    handle.cancel()
+
+    def run(self):
+        """Process jobs until stopped (or idle for idle_exit seconds)"""
+        self.store.register_worker(self.worker_id)
+        logger.info(f"🚀 Worker {self.worker_id} started")
+        idle_since = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                self.step()
+                if self.active:
+                    idle_since = time.monotonic()
+                elif self.idle_exit is not None and time.monotonic() - idle_since > self.idle_exit:
+                    logger.info("💤 Idle, worker exiting")
+                    break
+                self._stop.wait(self.POLL_INTERVAL)
+        finally:
+            # Les jobs encore actifs sont récupérés via l'expiration de leur bail
+            self._swap_pool.shutdown(wait=False, cancel_futures=True)
+            if self._queue is not None:
+                self._queue.shutdown()
+            self.store.unregister_worker(self.worker_id)
+            logger.info(f"👋 Worker {self.worker_id} stopped")
+
+    def stop(self):
+        self._stop.set()
+
+
+_spawned: Optional[subprocess.Popen] = None
+_spawn_lock = threading.Lock()
+
+
+def ensure_worker(store: JobStore = None) -> bool:
+    """
+    Start a background worker process if none is alive
+
+    Returns:
+        bool: True if a new worker was spawned
+    """
+    global _spawned
+    store = store or get_job_store()
+    with _spawn_lock:
+        if store.alive_workers():
+            return False
+        if _spawned is not None and _spawned.poll() is None:
+            return False  # Démarré mais pas encore enregistré
+
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
+        else:
+            kwargs["start_new_session"] = True
+
+        WORKER_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(WORKER_LOG, 'a', encoding='utf-8') as log:
+            _spawned = subprocess.Popen(
+                [sys.executable, "-m", "tools.job_worker", "--idle-exit", str(Config.JOB_WORKER["idle_exit"])],
+                cwd=str(Config.BASE_DIR),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                **kwargs
+            )
+        logger.info(f"🚀 Spawned job worker (pid {_spawned.pid})")
+        return True
+
+
+def worker_log_tail(lines: int = 20) -> str:
+    """Last lines of the spawned workers' log (startup tracebacks end up here)"""
+    try:
+        with open(WORKER_LOG, 'r', encoding='utf-8', errors='replace') as f:
+            return "".join(f.readlines()[-lines:])
+    except OSError:
+        return ""
+
+
+class WorkerWatchdog:
+    """
+    Keeps a batch's worker running from a UI polling loop, and notices when
+    none is (worker crashing at startup: import error, bad environment,
+    missing GPU libraries...) so the page can stop waiting.
+    """
+
+    CHECK_INTERVAL = 5.0  # Secondes entre deux ensure_worker()
+
+    def __init__(self, store: JobStore = None, timeout: float = None):
+        """
+        Args:
+            timeout: Seconds without any worker alive nor any job progress before giving up
+        """
+        self.store = store or get_job_store()
+        self.timeout = timeout or Config.JOB_WORKER["stall_timeout"]
+        self._state = None
+        self._changed = time.monotonic()
+        self._last_check = 0.0
+
+    def poll(self, state) -> Optional[str]:
+        """
+        Call on every refresh with a snapshot of the batch (any comparable value)
+
+        Returns:
+            None while the batch can progress, else an error message
+        """
+        now = time.monotonic()
+        if state != self._state:
+            self._state = state
+            self._changed = now
+        if now - self._last_check >= self.CHECK_INTERVAL:
+            ensure_worker(self.store)
+            self._last_check = now
+
+        # Un worker vivant (heartbeat) peut être long : attente de quota, requête lente
+        if now - self._changed < self.timeout or self.store.alive_workers():
+            return None
+
+        exit_code = _spawned.poll() if _spawned is not None else None
+        detail = f" (last worker exited with code {exit_code})" if exit_code is not None else ""
+        return f"No job worker alive and no progress for {self.timeout:.0f}s{detail}. See {WORKER_LOG}"
@@ -3,19 +3,42 @@ Photo Curator - Backend Logic for Image Curation
 Handles quality analysis, filtering, and export
 """
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import json
+import os
 from datetime import datetime
-import shutil
+import hashlib
+import io
+import threading
 from PIL import Image
 import cv2
 import numpy as np
 
+from core.quality_index import QualityIndex, open_quality_index
+from core.score_table import ScoreTable
+from core.dedup import perceptual_hashes, find_duplicate_groups
+from core.curation_journal import CurationJournal, open_curation_journal
+from core.export_engine import ExportEngine, MODE_MOVE, ProgressCallback
+from core.file_index import get_file_index
+
 
 class QualityAnalyzer:
     """Analyze image quality (blur, resolution, faces)"""
     
+    ANALYSIS_MAX_SIDE = 1024   # Blur measured on a buffer downscaled to this size
+    DETECTION_MAX_SIDE = 640   # Face detection runs on a smaller copy
+    
+    # Décodage réduit (DCT pour les JPEG) : facteur -> flag OpenCV
+    REDUCED_GRAYSCALE = {
+        8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+        4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        2: cv2.IMREAD_REDUCED_GRAYSCALE_2
+    }
+    
     def __init__(self):
+        # Un analyseur peut être partagé entre sessions : le détecteur Haar n'est pas thread-safe
+        self._detect_lock = threading.Lock()
         self.face_cascade = None
         try:
             # Try to load OpenCV face detector
@@ -24,38 +47,67 @@ class QualityAnalyzer:
         except:
             pass
     
+    @staticmethod
+    def _header_size(data: bytes) -> Tuple[int, int]:
+        """Image size read from the header only (no pixel decoding)"""
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                return img.size
+        except Exception:
+            return (0, 0)
+    
+    def _decode_gray(self, data: bytes, size: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Decode once, in grayscale, at the smallest reduction that keeps ANALYSIS_MAX_SIDE"""
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        longest = max(size)
+        
+        flag = cv2.IMREAD_GRAYSCALE
+        for factor, reduced_flag in self.REDUCED_GRAYSCALE.items():
+            if longest // factor >= self.ANALYSIS_MAX_SIDE:
+                flag = reduced_flag
+                break
+        
+        gray = cv2.imdecode(buffer, flag)
+        if gray is None:
+            return None
+        return self._downscale(gray, self.ANALYSIS_MAX_SIDE)
+    
+    @staticmethod
+    def _downscale(img: np.ndarray, max_side: int) -> np.ndarray:
+        scale = max_side / max(img.shape[:2])
+        if scale >= 1:
+            return img
+        return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    @staticmethod
+    def _blur_from_gray(gray: np.ndarray) -> float:
+        """Laplacian variance normalized to 0-100 (higher = sharper)"""
+        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        # Typical sharp images: 500-2000, blurry: 0-100
+        return round(min(100, (laplacian_var / 20)), 2)
+    
+    def _faces_from_gray(self, gray: np.ndarray) -> int:
+        if self.face_cascade is None:
+            return -1  # Face detection not available
+        small = self._downscale(gray, self.DETECTION_MAX_SIDE)
+        with self._detect_lock:
+            return len(self.face_cascade.detectMultiScale(small, 1.1, 4))
+    
     def detect_blur(self, image_path: Path) -> float:
         """Calculate blur score using Laplacian variance (0-100, lower = more blur)"""
         try:
-            img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                return 0.0
-            
-            # Calculate Laplacian variance
-            laplacian_var = cv2.Laplacian(img, cv2.CV_64F).var()
-            
-            # Normalize to 0-100 scale (higher = sharper)
-            # Typical sharp images: 500-2000, blurry: 0-100
-            normalized = min(100, (laplacian_var / 20))
-            return round(normalized, 2)
-        
+            data = Path(image_path).read_bytes()
+            gray = self._decode_gray(data, self._header_size(data))
+            return self._blur_from_gray(gray) if gray is not None else 0.0
         except Exception as e:
             return 0.0
     
     def detect_faces(self, image_path: Path) -> int:
         """Count number of faces detected"""
         try:
-            if self.face_cascade is None:
-                return -1  # Face detection not available
-            
-            img = cv2.imread(str(image_path))
-            if img is None:
-                return 0
-            
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-            return len(faces)
-        
+            data = Path(image_path).read_bytes()
+            gray = self._decode_gray(data, self._header_size(data))
+            return self._faces_from_gray(gray) if gray is not None else 0
         except Exception as e:
             return -1
     
@@ -67,12 +119,37 @@ class QualityAnalyzer:
         except Exception as e:
             return (0, 0)
     
+    def analyze_bytes(self, data: bytes) -> Dict:
+        """Blur, face count, resolution and perceptual hashes from a single decode of the file bytes"""
+        width, height = self._header_size(data)
+        blur_score, face_count, hashes = 0.0, 0, {}
+        try:
+            gray = self._decode_gray(data, (width, height))
+            if gray is not None:
+                blur_score = self._blur_from_gray(gray)
+                hashes = perceptual_hashes(gray)  # Même buffer : pas de décodage en plus
+                try:
+                    face_count = self._faces_from_gray(gray)
+                except Exception:
+                    face_count = -1
+        except Exception:
+            pass
+        quality = self._score(blur_score, face_count, width, height)
+        quality.update(hashes)
+        return quality
+    
     def calculate_quality_score(self, image_path: Path) -> Dict:
-        """Calculate overall quality score"""
-        blur_score = self.detect_blur(image_path)
-        face_count = self.detect_faces(image_path)
-        width, height = self.check_resolution(image_path)
-        
+        """Calculate overall quality score (file read and decoded once)"""
+        try:
+            data = Path(image_path).read_bytes()
+        except OSError:
+            return self._score(0.0, 0, 0, 0)
+        quality = self.analyze_bytes(data)
+        quality["content_hash"] = hashlib.sha256(data).hexdigest()  # Clé de l'index qualité
+        return quality
+    
+    @staticmethod
+    def _score(blur_score: float, face_count: int, width: int, height: int) -> Dict:
         # Calculate overall score (0-100)
         # Weights: blur 40%, resolution 30%, face detection 30%
         blur_weight = blur_score * 0.4
@@ -95,134 +172,414 @@ class QualityAnalyzer:
         }
 
 
+# --- Scoring parallèle (un QualityAnalyzer par processus worker) ---
+
+_worker_analyzer: Optional[QualityAnalyzer] = None
+
+
+def _init_scoring_worker():
+    """Process pool initializer: load the Haar cascade once per worker"""
+    global _worker_analyzer
+    cv2.setNumThreads(1)  # Un cœur par worker, pas de sur-souscription
+    _worker_analyzer = QualityAnalyzer()
+
+
+def _score_chunk(paths: List[str]) -> List[Tuple[str, Dict]]:
+    """Score a chunk of images inside a worker process"""
+    return [(path, _worker_analyzer.calculate_quality_score(Path(path))) for path in paths]
+
+
+def score_images(image_paths: Iterable[Path],
+                 max_workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None,
+                 analyzer: Optional[QualityAnalyzer] = None) -> Iterator[Tuple[Path, Dict]]:
+    """
+    Score images on a process pool, yielding (path, quality) as chunks complete
+    
+    Args:
+        max_workers: Worker processes (default: CPU count)
+        chunk_size: Images per task (default: balanced for ~4 tasks per worker)
+        analyzer: Analyzer used in-process for small batches
+    """
+    paths = [str(p) for p in image_paths]
+    if not paths:
+        return
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(paths) < 2 * max_workers:
+        # Petit lot : démarrer des processus coûterait plus que le calcul
+        analyzer = analyzer or QualityAnalyzer()
+        for path in paths:
+            yield Path(path), analyzer.calculate_quality_score(Path(path))
+        return
+    
+    chunk_size = chunk_size or max(1, min(64, len(paths) // (max_workers * 4)))
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_scoring_worker) as pool:
+        futures = [pool.submit(_score_chunk, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                for path, quality in future.result():
+                    yield Path(path), quality
+        finally:
+            # Consommateur arrêté en cours de route : on n'attend pas les chunks restants
+            for future in futures:
+                future.cancel()
+
+
+# Décision par image (un octet par id dans PhotoCurator.decisions)
+PENDING, APPROVED, REJECTED = 0, 1, 2
+
+SESSION_VERSION = 2
+
+
 class PhotoCurator:
     """Main photo curation backend"""
     
-    def __init__(self, dataset_path: Path):
+    def __init__(self, dataset_path: Path, quality_analyzer: Optional[QualityAnalyzer] = None):
         self.dataset_path = dataset_path
-        self.images: List[Path] = []
-        self.approved: List[Path] = []
-        self.rejected: List[Path] = []
-        self.history: List[Tuple[str, Path]] = []
+        self._images: List[Path] = []
+        self._images_version = 0  # Incrémenté à chaque nouvelle liste (clé de la table des scores)
         self.current_index = 0
-        self.quality_analyzer = QualityAnalyzer()
+        
+        # Décisions indexées par id d'image : mise à jour et undo en O(1)
+        self._ids: Dict[Path, int] = {}
+        self._paths: List[Path] = []
+        self.decisions = bytearray()
+        self._approved: Dict[int, None] = {}  # Ensembles ordonnés (ordre d'insertion = ordre d'export)
+        self._rejected: Dict[int, None] = {}
+        self.history: List[Tuple[int, int]] = []  # (image id, décision précédente)
+        self.quality_analyzer = quality_analyzer or QualityAnalyzer()
         self.quality_cache: Dict[str, Dict] = {}
+        self._quality_index: Optional[QualityIndex] = None
+        self._journal: Optional[CurationJournal] = None
+        self.score_table: Optional[ScoreTable] = None
+        self._score_table_version = -1
+    
+    @property
+    def images(self) -> List[Path]:
+        return self._images
+    
+    @images.setter
+    def images(self, images: List[Path]):
+        self._images = images
+        self._images_version += 1
+    
+    @property
+    def quality_index(self) -> Optional[QualityIndex]:
+        """Persistent score index of the dataset folder (opened on first use)"""
+        if self._quality_index is None:
+            self._quality_index = open_quality_index(self.dataset_path)
+        return self._quality_index
+    
+    @property
+    def journal(self) -> Optional[CurationJournal]:
+        """Append-only decision journal of the dataset folder (opened on first use)"""
+        if self._journal is None:
+            self._journal = open_curation_journal(self.dataset_path)
+        return self._journal
     
     def load_dataset(self) -> List[Path]:
         """Load all images from dataset directory"""
         if not self.dataset_path.exists():
             return []
         
-        extensions = ['.jpg', '.jpeg', '.png', '.webp']
-        self.images = []
-        
-        for ext in extensions:
-            self.images.extend(self.dataset_path.glob(f"*{ext}"))
-            self.images.extend(self.dataset_path.glob(f"*{ext.upper()}"))
+        # Listing partagé (rescanné seulement si le dossier a changé), trié par nom
+        self.images = get_file_index().files(self.dataset_path)
+        for img_path in self.images:
+            self._image_id(img_path)
         
-        # Sort by name
-        self.images = sorted(self.images, key=lambda p: p.name)
+        # Les scores des fichiers supprimés sont retirés de l'index
+        if self.quality_index is not None:
+            self.quality_index.prune(p.name for p in self.images)
         return self.images
     
+    @staticmethod
+    def passes_filters(quality: Dict,
+                       min_resolution: Tuple[int, int] = (512, 512),
+                       max_blur_threshold: float = 30.0,
+                       require_face: bool = False) -> bool:
+        """Check one quality record against the thresholds"""
+        # Check resolution
+        width, height = quality['resolution']
+        if width < min_resolution[0] or height < min_resolution[1]:
+            return False
+        
+        # Check blur
+        if quality['blur_score'] < max_blur_threshold:
+            return False
+        
+        # Check face
+        if require_face and quality['face_count'] != 1:
+            return False
+        
+        return True
+    
+    def score_images(self,
+                     image_paths: Optional[List[Path]] = None,
+                     max_workers: Optional[int] = None) -> Iterator[Tuple[Path, Dict]]:
+        """Yield (path, quality) for every image, cached ones first, then as workers finish"""
+        image_paths = self.images if image_paths is None else image_paths
+        missing = []
+        for img_path in image_paths:
+            quality = self.quality_cache.get(str(img_path))
+            if quality is None:
+                missing.append(img_path)
+            else:
+                yield img_path, quality
+        
+        # Index persistant : seuls les fichiers nouveaux ou modifiés sont analysés
+        index = self.quality_index
+        if index is not None and missing:
+            hits, missing = index.lookup_many(missing)
+            for img_path_str, quality in hits.items():
+                self.quality_cache[img_path_str] = quality
+                yield Path(img_path_str), quality
+        
+        pending = []
+        try:
+            for img_path, quality in score_images(missing, max_workers=max_workers, analyzer=self.quality_analyzer):
+                self.quality_cache[str(img_path)] = quality
+                pending.append((img_path, quality))
+                if index is not None and len(pending) >= 64:
+                    index.store_many(pending)
+                    pending = []
+                yield img_path, quality
+        finally:
+            # Même si le consommateur s'arrête en route, les scores calculés sont gardés
+            if index is not None and pending:
+                index.store_many(pending)
+    
+    def iter_quality_filtered(self,
+                              min_resolution: Tuple[int, int] = (512, 512),
+                              max_blur_threshold: float = 30.0,
+                              require_face: bool = False,
+                              max_workers: Optional[int] = None) -> Iterator[Tuple[Path, Dict, bool]]:
+        """Stream (path, quality, passed) as images are scored (completion order)"""
+        for img_path, quality in self.score_images(max_workers=max_workers):
+            yield img_path, quality, self.passes_filters(quality, min_resolution, max_blur_threshold, require_face)
+    
+    def find_near_duplicates(self, max_distance: int = 6) -> List[List[Path]]:
+        """Groups of near-identical images (scores must be computed), best score first"""
+        entries = [(p, self.quality_cache[str(p)]) for p in self.images if str(p) in self.quality_cache]
+        return find_duplicate_groups(entries, max_distance)
+    
+    def collapse_duplicates(self, max_distance: int = 6) -> Tuple[List[Path], Dict[Path, List[Path]]]:
+        """
+        Keep one representative per near-duplicate group
+        
+        Returns:
+            Tuple (images in dataset order with duplicates removed, {representative: hidden duplicates})
+        """
+        groups = self.find_near_duplicates(max_distance)
+        hidden = {path for group in groups for path in group[1:]}
+        collapsed = [p for p in self.images if p not in hidden]
+        return collapsed, {group[0]: group[1:] for group in groups}
+    
+    def build_score_table(self, max_workers: Optional[int] = None) -> ScoreTable:
+        """Score every image (cache / index / process pool) and build the columnar table"""
+        for _ in self.score_images(max_workers=max_workers):
+            pass
+        self.score_table = ScoreTable.from_qualities(self.images, self.quality_cache)
+        self._score_table_version = self._images_version
+        return self.score_table
+    
     def apply_quality_filters(self, 
                              min_resolution: Tuple[int, int] = (512, 512),
                              max_blur_threshold: float = 30.0,
-                             require_face: bool = False) -> List[Path]:
-        """Filter images by quality criteria"""
-        filtered = []
-        
-        for img_path in self.images:
-            # Get or calculate quality
-            if str(img_path) not in self.quality_cache:
-                self.quality_cache[str(img_path)] = self.quality_analyzer.calculate_quality_score(img_path)
-            
-            quality = self.quality_cache[str(img_path)]
-            
-            # Check resolution
-            width, height = quality['resolution']
-            if width < min_resolution[0] or height < min_resolution[1]:
-                continue
-            
-            # Check blur
-            if quality['blur_score'] < max_blur_threshold:
-                continue
-            
-            # Check face
-            if require_face and quality['face_count'] != 1:
-                continue
-            
-            filtered.append(img_path)
+                             require_face: bool = False,
+                             max_workers: Optional[int] = None) -> List[Path]:
+        """Filter images by quality criteria (vectorized over the score table)"""
+        # Table réutilisée tant que la liste d'images est la même (images non scorées = lignes masquées)
+        table = self.score_table
+        if table is None or self._score_table_version != self._images_version:
+            table = self.build_score_table(max_workers=max_workers)
+        return table.filter(min_resolution, max_blur_threshold, require_face)
+    
+    # ------------------------------------------------------------------
+    # Decisions
+    # ------------------------------------------------------------------
+    
+    def _image_id(self, image_path: Path) -> int:
+        """Stable integer id of an image (registered on first use)"""
+        image_id = self._ids.get(image_path)
+        if image_id is None:
+            image_id = len(self._paths)
+            self._ids[image_path] = image_id
+            self._paths.append(image_path)
+            self.decisions.append(PENDING)
+        return image_id
+    
+    def _set_decision(self, image_id: int, decision: int):
+        previous = self.decisions[image_id]
+        if previous == APPROVED:
+            del self._approved[image_id]
+        elif previous == REJECTED:
+            del self._rejected[image_id]
         
-        return filtered
+        if decision == APPROVED:
+            self._approved[image_id] = None
+        elif decision == REJECTED:
+            self._rejected[image_id] = None
+        self.decisions[image_id] = decision
+    
+    def _decide(self, image_path: Path, decision: int) -> bool:
+        image_id = self._image_id(image_path)
+        previous = self.decisions[image_id]
+        if previous == decision:
+            return False
+        self._set_decision(image_id, decision)
+        self.history.append((image_id, previous))
+        self._journal_decision(image_id)
+        return True
+    
+    def _journal_decision(self, image_id: int):
+        if self.journal is not None:
+            self.journal.record_decision(self._session_name(self._paths[image_id]), self.decisions[image_id])
+    
+    @property
+    def approved_count(self) -> int:
+        return len(self._approved)
+    
+    @property
+    def rejected_count(self) -> int:
+        return len(self._rejected)
+    
+    @property
+    def approved(self) -> List[Path]:
+        """Approved images, in decision order"""
+        return [self._paths[i] for i in self._approved]
+    
+    @property
+    def rejected(self) -> List[Path]:
+        """Rejected images, in decision order"""
+        return [self._paths[i] for i in self._rejected]
+    
+    def decision_of(self, image_path: Path) -> int:
+        """PENDING, APPROVED or REJECTED"""
+        image_id = self._ids.get(image_path)
+        return PENDING if image_id is None else self.decisions[image_id]
+    
+    def is_approved(self, image_path: Path) -> bool:
+        return self.decision_of(image_path) == APPROVED
+    
+    def is_rejected(self, image_path: Path) -> bool:
+        return self.decision_of(image_path) == REJECTED
     
     def manual_approve(self, image_path: Path):
         """Manually approve an image"""
-        if image_path not in self.approved:
-            self.approved.append(image_path)
-            self.history.append(("approve", image_path))
-            
-            # Remove from rejected if present
-            if image_path in self.rejected:
-                self.rejected.remove(image_path)
+        self._decide(image_path, APPROVED)
     
     def manual_reject(self, image_path: Path):
         """Manually reject an image"""
-        if image_path not in self.rejected:
-            self.rejected.append(image_path)
-            self.history.append(("reject", image_path))
-            
-            # Remove from approved if present
-            if image_path in self.approved:
-                self.approved.remove(image_path)
+        self._decide(image_path, REJECTED)
+    
+    def reset_decision(self, image_path: Path):
+        """Put an image back in the pending state"""
+        self._decide(image_path, PENDING)
     
     def batch_approve(self, image_paths: List[Path]):
         """Approve multiple images at once"""
         for path in image_paths:
-            self.manual_approve(path)
+            self._decide(path, APPROVED)
     
     def batch_reject(self, image_paths: List[Path]):
         """Reject multiple images at once"""
         for path in image_paths:
-            self.manual_reject(path)
+            self._decide(path, REJECTED)
+    
+    def _reset_decisions(self):
+        self.decisions = bytearray(len(self._paths))
+        self._approved.clear()
+        self._rejected.clear()
+        self.history.clear()
+    
+    def clear_decisions(self):
+        """Forget every decision (image ids are kept)"""
+        self._reset_decisions()
+        self.current_index = 0
+        if self.journal is not None:
+            self.journal.record_clear()
     
     def undo(self) -> bool:
         """Undo last action. Returns True if successful."""
         if not self.history:
             return False
         
-        action, image_path = self.history.pop()
+        image_id, previous = self.history.pop()
+        self._set_decision(image_id, previous)
+        self._journal_decision(image_id)
+        return True
+    
+    def record_cursor(self, index: int):
+        """Move the curation cursor (journaled so a reload resumes here)"""
+        self.current_index = index
+        if self.journal is not None:
+            self.journal.record_cursor(index)
+    
+    def record_queue(self, queue: List[Path], cursor: int = 0):
+        """Journal a new curation queue (load, quality filter, dedup)"""
+        self.current_index = cursor
+        if self.journal is not None:
+            self.journal.record_queue([self._session_name(p) for p in queue], cursor)
+    
+    def restore_session(self) -> Optional[Dict]:
+        """
+        Replay the curation journal of the dataset
         
-        if action == "approve" and image_path in self.approved:
-            self.approved.remove(image_path)
-            return True
-        elif action == "reject" and image_path in self.rejected:
-            self.rejected.remove(image_path)
-            return True
+        Returns:
+            Dict {"queue": journaled queue still on disk (or None), "cursor", "decisions"},
+            None if nothing was journaled
+        """
+        journal = self.journal
+        if journal is None or journal.is_empty():
+            return None
+        
+        state = journal.state
+        self._reset_decisions()
+        for name, decision in state["decisions"].items():
+            self._set_decision(self._image_id(self._session_path(name)), decision)
         
-        return False
+        queue = None
+        cursor = state["cursor"]
+        if state["queue"] is not None:
+            # Fichiers supprimés depuis (poubelle) : retirés, le curseur recule d'autant
+            paths = [self._session_path(name) for name in state["queue"]]
+            alive = [p.exists() for p in paths]
+            cursor = sum(alive[:cursor])
+            queue = [p for p, ok in zip(paths, alive) if ok]
+        self.current_index = cursor
+        
+        return {"queue": queue, "cursor": cursor, "decisions": len(state["decisions"])}
     
     def export_approved(self, 
                        output_dir: Path,
                        format_template: str = "dataset_{idx:03d}",
-                       copy_mode: bool = True) -> int:
-        """Export approved images to output directory. Returns count of exported files."""
+                       copy_mode: bool = True,
+                       mode: Optional[str] = None,
+                       progress_callback: Optional[ProgressCallback] = None) -> int:
+        """
+        Export approved images to output directory. Returns count of files present at the destination.
+        
+        Args:
+            copy_mode: False moves the files instead
+            mode: Export method when copying (auto / reflink / hardlink / copy, default from Config.EXPORT)
+            progress_callback: Called with (done, total)
+        """
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        exported_count = 0
+        pairs = [
+            (img_path, output_dir / (format_template.format(idx=idx) + img_path.suffix))
+            for idx, img_path in enumerate(self.approved, 1)
+        ]
+        engine = ExportEngine(mode=mode if copy_mode else MODE_MOVE)
+        result = engine.export(pairs, progress_callback)
+        for error in result["errors"]:
+            print(f"❌ Export failed: {error}")
         
-        for idx, img_path in enumerate(self.approved, 1):
-            # Generate output filename
-            ext = img_path.suffix
-            output_name = format_template.format(idx=idx) + ext
-            output_path = output_dir / output_name
-            
-            # Copy or move
-            if copy_mode:
-                shutil.copy2(img_path, output_path)
-            else:
-                shutil.move(str(img_path), output_path)
-            
-            exported_count += 1
+        # Les fichiers déjà identiques à destination comptent comme exportés (ré-export idempotent)
+        exported_count = result["exported"] + result["skipped"]
         
         # Create metadata JSON
         metadata = {
@@ -242,8 +599,8 @@ class PhotoCurator:
     def get_stats(self) -> Dict:
         """Get curation statistics"""
         total = len(self.images)
-        approved = len(self.approved)
-        rejected = len(self.rejected)
+        approved = len(self._approved)
+        rejected = len(self._rejected)
         pending = total - approved - rejected
         
         return {
@@ -254,19 +611,34 @@ class PhotoCurator:
             "progress_pct": (approved + rejected) / total * 100 if total > 0 else 0
         }
     
+    def _session_name(self, image_path: Path) -> str:
+        """Path relative to the dataset when possible (shorter, survives a moved dataset)"""
+        try:
+            return image_path.relative_to(self.dataset_path).as_posix()
+        except ValueError:
+            return str(image_path)
+    
+    def _session_path(self, name: str) -> Path:
+        path = Path(name)
+        return path if path.is_absolute() else self.dataset_path / path
+    
     def save_session(self, session_file: Path):
-        """Save current curation session to JSON"""
+        """Save current curation session to JSON (decided images only, as id lists)"""
+        decided = list(self._approved) + list(self._rejected)
+        local_ids = {image_id: i for i, image_id in enumerate(decided)}
         session_data = {
+            "version": SESSION_VERSION,
             "dataset_path": str(self.dataset_path),
             "timestamp": datetime.now().isoformat(),
-            "approved": [str(p) for p in self.approved],
-            "rejected": [str(p) for p in self.rejected],
+            "paths": [self._session_name(self._paths[i]) for i in decided],
+            "approved": [local_ids[i] for i in self._approved],
+            "rejected": [local_ids[i] for i in self._rejected],
             "current_index": self.current_index,
             "stats": self.get_stats()
         }
         
         with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
+            json.dump(session_data, f, ensure_ascii=False, separators=(',', ':'))
     
     def load_session(self, session_file: Path) -> bool:
         """Load curation session from JSON. Returns True if successful."""
@@ -274,10 +646,29 @@ class PhotoCurator:
             with open(session_file, 'r', encoding='utf-8') as f:
                 session_data = json.load(f)
             
-            self.approved = [Path(p) for p in session_data.get("approved", [])]
-            self.rejected = [Path(p) for p in session_data.get("rejected", [])]
+            if session_data.get("version", 1) >= 2:
+                paths = [self._session_path(name) for name in session_data["paths"]]
+                approved = [paths[i] for i in session_data.get("approved", [])]
+                rejected = [paths[i] for i in session_data.get("rejected", [])]
+            else:
+                # Ancien format : listes de chemins complets
+                approved = [Path(p) for p in session_data.get("approved", [])]
+                rejected = [Path(p) for p in session_data.get("rejected", [])]
+            
+            self._reset_decisions()
+            for path in approved:
+                self._set_decision(self._image_id(path), APPROVED)
+            for path in rejected:
+                self._set_decision(self._image_id(path), REJECTED)
             self.current_index = session_data.get("current_index", 0)
             
+            if self.journal is not None:
+                self.journal.replace(
+                    {self._session_name(self._paths[i]): self.decisions[i]
+                     for i in list(self._approved) + list(self._rejected)},
+                    self.current_index
+                )
+            
             return True
         except Exception as e:
             return False
@@ -0,0 +1,135 @@
+"""
+Preview Prefetcher - Renders upcoming curation previews in the background
+While the user looks at image N, a small thread pool hashes and renders the
+previews of N+1..N+ahead (and N-1 for undo) through the thumbnail cache, so
+the next swipe only reads an already-rendered file.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+from core.config import Config
+from core.thumbnails import ThumbnailCache, get_thumbnail_cache, PREVIEW, STATIC_URL
+
+
+class PreviewPrefetcher:
+    """Bounded LRU of preview renditions fed by a thread pool"""
+
+    def __init__(self,
+                 thumbnails: ThumbnailCache = None,
+                 ahead: int = None,
+                 max_workers: int = None,
+                 capacity: int = None):
+        """
+        Args:
+            ahead: Images prepared after the current one
+            max_workers: Rendering threads (I/O bound on network folders)
+            capacity: Renditions remembered (futures kept in the LRU)
+        """
+        settings = Config.PREFETCH
+        self.thumbnails = thumbnails or get_thumbnail_cache()
+        self.ahead = ahead or settings["ahead"]
+        self.capacity = capacity or settings["capacity"]
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or settings["workers"],
+                                        thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Future]" = OrderedDict()
+
+    @staticmethod
+    def _key(path: str, size: int) -> tuple:
+        """Entry key: a source edited in place (new mtime) gets a new rendition"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        return (path, mtime_ns, size)
+
+    def _submit(self, path: str, size: int, key: tuple = None) -> Future:
+        """Future of one rendition (shared if already scheduled)"""
+        key = key or self._key(path, size)
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None and future.done() and not future.cancelled() and (
+                    future.exception() is not None or future.result() is None):
+                future = None  # Rendu en échec : retenté au lieu de rester en cache
+            if future is None:
+                future = self._pool.submit(self.thumbnails.get, path, size)
+                self._entries[key] = future
+            self._entries.move_to_end(key)
+
+            # Les plus anciens sont oubliés (le fichier rendu reste dans le cache disque)
+            while len(self._entries) > self.capacity:
+                _, old = self._entries.popitem(last=False)
+                old.cancel()
+        return future
+
+    def prefetch(self, queue: Sequence[Union[str, Path]], index: int, size: int = PREVIEW):
+        """Schedule the previews around the current position (next `ahead`, then the previous one)"""
+        wanted = list(range(index + 1, min(index + 1 + self.ahead, len(queue))))
+        if index > 0:
+            wanted.append(index - 1)
+        for i in wanted:
+            self._submit(str(queue[i]), size)
+
+    def _drop(self, key: tuple, future: Future):
+        """Forget an entry (only if it still holds this future)"""
+        with self._lock:
+            if self._entries.get(key) is future:
+                del self._entries[key]
+
+    def get(self, path: Union[str, Path], size: int = PREVIEW) -> Optional[Path]:
+        """Rendition of an image (waits for an in-flight prefetch instead of rendering twice)"""
+        path = str(path)
+        key = self._key(path, size)
+        for _ in range(2):
+            future = self._submit(path, size, key)
+            try:
+                target = future.result()
+            except Exception as e:
+                print(f"⚠️ Prefetch failed for {Path(path).name}: {e}")
+                target = None
+            if target is not None and target.exists():
+                return target
+            # Échec (réessayé au prochain appel) ou rendu évincé du cache disque : re-rendu une fois
+            self._drop(key, future)
+            if target is None:
+                return None
+        return None
+
+    def url(self, path: Union[str, Path], size: int = PREVIEW) -> Optional[str]:
+        target = self.get(path, size)
+        if target is None:
+            return None
+        return f"{STATIC_URL}/{target.relative_to(Config.STATIC_DIR).as_posix()}"
+
+    def ready_urls(self, queue: Sequence[Union[str, Path]], index: int, size: int = PREVIEW) -> List[str]:
+        """URLs of the upcoming previews already rendered (for <link rel=prefetch> hints)"""
+        urls = []
+        for i in range(index + 1, min(index + 1 + self.ahead, len(queue))):
+            with self._lock:
+                future = self._entries.get(self._key(str(queue[i]), size))
+            if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+                continue
+            target = future.result()
+            if target is not None and target.exists():
+                urls.append(f"{STATIC_URL}/{target.relative_to(Config.STATIC_DIR).as_posix()}")
+        return urls
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher: Optional[PreviewPrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_preview_prefetcher() -> PreviewPrefetcher:
+    """Get the process-wide preview prefetcher"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = PreviewPrefetcher()
+        return _prefetcher
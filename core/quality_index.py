@@ -0,0 +1,199 @@
+"""
+Quality Index - Persistent quality scores per dataset folder
+SQLite sidecar (.quality_index.sqlite3) storing blur, faces, resolution,
+overall score and perceptual hashes. Entries are keyed by file name + size + mtime, with the
+content hash as fallback (touched or renamed files are not re-scored).
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILENAME = ".quality_index.sqlite3"
+PERCEPTUAL_HASHES = ("ahash", "dhash", "phash")
+
+
+def file_hash(path: Path) -> str:
+    """sha256 of a file's content"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class QualityIndex:
+    """On-disk quality score index of one dataset folder"""
+
+    def __init__(self, dataset_path: Path, index_file: Path = None):
+        self.dataset_path = dataset_path
+        self.index_file = index_file or dataset_path / INDEX_FILENAME
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.index_file), timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT,
+                blur_score REAL NOT NULL,
+                face_count INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                resolution_score REAL NOT NULL,
+                overall_score REAL NOT NULL,
+                ahash TEXT,
+                dhash TEXT,
+                phash TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS scores_hash ON scores (content_hash)")
+        
+        # Index créé avant les hashes perceptuels : ajout des colonnes
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(scores)")}
+        for column in PERCEPTUAL_HASHES:
+            if column not in columns:
+                conn.execute(f"ALTER TABLE scores ADD COLUMN {column} TEXT")
+
+    @staticmethod
+    def _quality(row: sqlite3.Row) -> Dict:
+        """Row -> quality dict (same shape as QualityAnalyzer.calculate_quality_score)"""
+        quality = {
+            "blur_score": row["blur_score"],
+            "face_count": row["face_count"],
+            "resolution": (row["width"], row["height"]),
+            "resolution_score": row["resolution_score"],
+            "overall_score": row["overall_score"],
+            "content_hash": row["content_hash"]
+        }
+        for column in PERCEPTUAL_HASHES:
+            if row[column] is not None:
+                quality[column] = int(row[column], 16)  # Stocké en hex : SQLite n'a pas d'entier 64 bits non signé
+        return quality
+    
+    @staticmethod
+    def _is_complete(row: sqlite3.Row) -> bool:
+        """Entries written before perceptual hashing are re-analysed once (undecodable files excepted)"""
+        return row["phash"] is not None or row["width"] == 0
+
+    def lookup_many(self, image_paths: Iterable[Path]) -> Tuple[Dict[str, Dict], List[Path]]:
+        """
+        Find indexed scores for a list of images
+
+        Returns:
+            Tuple (hits {path str: quality}, misses to score)
+        """
+        conn = self._connect()
+        rows = {row["name"]: row for row in conn.execute("SELECT * FROM scores")}
+        hits: Dict[str, Dict] = {}
+        misses: List[Path] = []
+        unchecked: List[Tuple[Path, Optional[sqlite3.Row]]] = []
+
+        for path in image_paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            row = rows.pop(path.name, None)
+            if row is not None and not self._is_complete(row):
+                misses.append(path)
+            elif row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                hits[str(path)] = self._quality(row)
+            else:
+                unchecked.append((path, row))
+
+        # Hash uniquement s'il existe des entrées orphelines (fichier renommé)
+        # ou si le fichier a changé de mtime (peut-être sans changer de contenu)
+        orphans = {row["content_hash"]: row for row in rows.values() if row["content_hash"] and self._is_complete(row)}
+        recovered = []
+        for path, known in unchecked:
+            if not orphans and (known is None or not known["content_hash"]):
+                misses.append(path)
+                continue
+            digest = file_hash(path)
+            if known is not None and known["content_hash"] == digest:
+                match = known
+            else:
+                match = orphans.get(digest)
+            if match is None:
+                misses.append(path)
+                continue
+            hits[str(path)] = self._quality(match)
+            recovered.append((path, hits[str(path)]))
+
+        if recovered:
+            self.store_many(recovered)
+        return hits, misses
+
+    def store_many(self, items: Iterable[Tuple[Path, Dict]]):
+        """Insert or replace scores in one transaction"""
+        now = time.time()
+        rows = []
+        for path, quality in items:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            width, height = quality["resolution"]
+            hashes = [f"{quality[c]:016x}" if quality.get(c) is not None else None for c in PERCEPTUAL_HASHES]
+            rows.append((
+                path.name, stat.st_size, stat.st_mtime_ns, quality.get("content_hash"),
+                quality["blur_score"], quality["face_count"], width, height,
+                quality["resolution_score"], quality["overall_score"], *hashes, now
+            ))
+        if not rows:
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """INSERT OR REPLACE INTO scores
+                   (name, size, mtime_ns, content_hash, blur_score, face_count, width, height,
+                    resolution_score, overall_score, ahash, dhash, phash, updated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, existing_names: Iterable[str]) -> int:
+        """Remove entries of files that no longer exist. Returns the number removed."""
+        existing = set(existing_names)
+        conn = self._connect()
+        stale = [row["name"] for row in conn.execute("SELECT name FROM scores") if row["name"] not in existing]
+        conn.executemany("DELETE FROM scores WHERE name = ?", [(name,) for name in stale])
+        return len(stale)
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+
+def open_quality_index(dataset_path: Path) -> Optional[QualityIndex]:
+    """Quality index of a dataset folder (None if the folder is missing or read-only)"""
+    try:
+        if not dataset_path.is_dir():
+            return None
+        return QualityIndex(dataset_path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Quality index unavailable for {dataset_path.name}: {e}")
+        return None
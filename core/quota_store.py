@@ -0,0 +1,211 @@
+"""
+Quota Store - Process-safe request counters
+SQLite (WAL mode) backend shared by every Streamlit session and worker process
+"""
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+DEFAULT_QUOTA_DB = Path(__file__).parent.parent / "data" / "quota.sqlite3"
+
+DAILY_REQUESTS = "requests_day"
+
+
+def day_window(now: datetime = None) -> str:
+    """Window key of the daily counter"""
+    return (now or datetime.now()).date().isoformat()
+
+
+def seconds_until_tomorrow(now: datetime = None) -> float:
+    """Seconds before the daily counter rolls over"""
+    now = now or datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds()
+
+
+class QuotaStore:
+    """Atomic, globally shared quota counters"""
+
+    def __init__(self, db_file: Path = None):
+        self.db_file = db_file or DEFAULT_QUOTA_DB
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (Streamlit sessions run in threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT NOT NULL,
+                window TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (name, window)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+
+    def _get(self, conn: sqlite3.Connection, name: str, window: str) -> int:
+        row = conn.execute(
+            "SELECT count FROM counters WHERE name = ? AND window = ?", (name, window)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _add(self, conn: sqlite3.Connection, name: str, window: str, amount: int):
+        conn.execute(
+            """INSERT INTO counters (name, window, count) VALUES (?, ?, ?)
+               ON CONFLICT(name, window) DO UPDATE SET count = MAX(0, count + excluded.count)""",
+            (name, window, amount)
+        )
+
+    @staticmethod
+    def _refill(row, capacity: float, rate: float, now: float) -> float:
+        """Token level of a bucket after refilling since its last update"""
+        if row is None:
+            return capacity
+        tokens, updated = row
+        return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+    def acquire(self,
+                daily_limit: Optional[int],
+                buckets: Dict[str, Tuple[float, float, float]],
+                count: int = 1,
+                consume: bool = True) -> float:
+        """
+        Atomically check the daily counter and token buckets, then consume
+
+        Args:
+            daily_limit: Max requests per calendar day (None = unchecked, still counted)
+            buckets: {name: (capacity, refill per second, amount)}
+            count: Number of requests to count on the daily counter
+            consume: False to only estimate the wait
+
+        Returns:
+            float: 0.0 if granted, otherwise the estimated wait in seconds
+        """
+        now_dt = datetime.now()
+        now = time.time()
+        day = day_window(now_dt)
+        conn = self._connect()
+
+        # BEGIN IMMEDIATE prend le verrou d'écriture : lecture + consommation atomiques
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if daily_limit is not None and self._get(conn, DAILY_REQUESTS, day) + count > daily_limit:
+                conn.execute("ROLLBACK")
+                return seconds_until_tomorrow(now_dt)
+
+            levels = {}
+            wait = 0.0
+            for name, (capacity, rate, amount) in buckets.items():
+                row = conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                levels[name] = self._refill(row, capacity, rate, now)
+                if levels[name] < amount:
+                    wait = max(wait, (amount - levels[name]) / rate)
+
+            if wait > 0 or not consume:
+                conn.execute("ROLLBACK")
+                return wait
+
+            for name, (capacity, rate, amount) in buckets.items():
+                conn.execute(
+                    """INSERT INTO buckets (name, tokens, updated) VALUES (?, ?, ?)
+                       ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated""",
+                    (name, levels[name] - amount, now)
+                )
+            # Compteur du jour toujours tenu : seule source des requêtes journalières, même illimitées
+            self._add(conn, DAILY_REQUESTS, day, count)
+            conn.execute("COMMIT")
+            return 0.0
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def refund(self,
+               daily: bool,
+               buckets: Dict[str, Tuple[float, float, float]],
+               count: int = 1):
+        """
+        Give back capacity taken by acquire() for a request that never reached the API
+
+        Args:
+            daily: Also decrement today's counter
+            buckets: Same specs as acquire() {name: (capacity, refill per second, amount)}
+            count: Number of requests to remove from the daily counter
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name, (capacity, rate, amount) in buckets.items():
+                row = conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+                ).fetchone()
+                level = min(capacity, self._refill(row, capacity, rate, now) + amount)
+                conn.execute(
+                    """INSERT INTO buckets (name, tokens, updated) VALUES (?, ?, ?)
+                       ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated""",
+                    (name, level, now)
+                )
+            if daily:
+                self._add(conn, DAILY_REQUESTS, day_window(), -count)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def bucket_level(self, name: str, capacity: float, rate: float) -> float:
+        """Tokens currently available in a bucket"""
+        row = self._connect().execute(
+            "SELECT tokens, updated FROM buckets WHERE name = ?", (name,)
+        ).fetchone()
+        return self._refill(row, capacity, rate, time.time())
+
+    def get_count(self, name: str, window: str) -> int:
+        """Read a counter"""
+        return self._get(self._connect(), name, window)
+
+    def get_daily_requests(self) -> int:
+        """Requests counted today"""
+        return self.get_count(DAILY_REQUESTS, day_window())
+
+    def set_daily_requests(self, value: int):
+        """Overwrite today's counter (manual sync with Google AI Studio)"""
+        self._connect().execute(
+            """INSERT INTO counters (name, window, count) VALUES (?, ?, ?)
+               ON CONFLICT(name, window) DO UPDATE SET count = excluded.count""",
+            (DAILY_REQUESTS, day_window(), value)
+        )
+
+
+_store: Optional[QuotaStore] = None
+_store_lock = threading.Lock()
+
+
+def get_quota_store() -> QuotaStore:
+    """Get the process-wide quota store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = QuotaStore()
+        return _store
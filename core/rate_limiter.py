@@ -0,0 +1,90 @@
+"""
+Rate Limiter - Token buckets for the Gemini quota
+RPM and TPM are smooth token buckets, RPD is the calendar-day counter.
+State lives in the QuotaStore so the limits are global across processes.
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from core.quota_store import QuotaStore, get_quota_store
+
+
+class RateLimiter:
+    """Token-bucket limiter configured from RPM / RPD / TPM limits"""
+
+    POLL_MAX = 5.0  # Max sleep between two attempts (other sessions may release capacity)
+
+    def __init__(self,
+                 rpm: int,
+                 rpd: Optional[int] = None,
+                 tpm: Optional[int] = None,
+                 store: QuotaStore = None,
+                 name: str = "gemini"):
+        # 0 = illimité (.env) : le seau / compteur correspondant n'est pas vérifié
+        self.rpm = rpm or None
+        self.rpd = rpd or None
+        self.tpm = tpm or None
+        self.store = store or get_quota_store()
+        self.name = name
+
+    def _buckets(self, tokens: int) -> Dict[str, Tuple[float, float, float]]:
+        """Bucket specs: capacity = limit per minute, refill = limit / 60s"""
+        buckets = {}
+        if self.rpm:
+            buckets[f"{self.name}:rpm"] = (self.rpm, self.rpm / 60.0, 1)
+        if self.tpm and tokens:
+            # Une requête plus grosse que la capacité attendrait à l'infini
+            buckets[f"{self.name}:tpm"] = (self.tpm, self.tpm / 60.0, min(tokens, self.tpm))
+        return buckets
+
+    def estimate_wait(self, tokens: int = 0) -> float:
+        """Seconds before a request of `tokens` tokens would be granted (0 = now)"""
+        return self.store.acquire(self.rpd, self._buckets(tokens), consume=False)
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """Take capacity for one request without waiting"""
+        return self.store.acquire(self.rpd, self._buckets(tokens)) == 0.0
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        Block until capacity is available
+
+        Args:
+            tokens: Estimated tokens of the request (TPM bucket)
+            timeout: Max seconds to wait (None = wait as long as needed)
+
+        Returns:
+            bool: True if acquired, False if the timeout would be exceeded
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.store.acquire(self.rpd, self._buckets(tokens))
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(wait, self.POLL_MAX))
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """Async version of acquire() (does not block the event loop)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Transaction SQLite (jusqu'au busy timeout) hors de la boucle d'événements
+            wait = await asyncio.to_thread(self.store.acquire, self.rpd, self._buckets(tokens))
+            if wait == 0.0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(min(wait, self.POLL_MAX))
+
+    def refund(self, tokens: int = 0):
+        """Return the capacity of a request that was never sent to the API"""
+        self.store.refund(True, self._buckets(tokens))
+
+    def get_minute_usage(self) -> int:
+        """Requests consumed from the RPM bucket (not yet refilled)"""
+        if not self.rpm:
+            return 0
+        level = self.store.bucket_level(f"{self.name}:rpm", self.rpm, self.rpm / 60.0)
+        return max(0, int(round(self.rpm - level)))
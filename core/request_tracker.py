@@ -2,108 +2,98 @@
 Request Tracker for Google Gemini API Limits
 Tracks daily and per-minute request limits
 """
-import json
-import os
-from pathlib import Path
-from datetime import datetime, date
+import asyncio
+from datetime import date
 from typing import Dict, Optional
 
+from core.config import Config
+from core.quota_store import QuotaStore, get_quota_store
+from core.rate_limiter import RateLimiter
+from core.usage_ledger import UsageLedger, get_usage_ledger
+
 class RequestTracker:
     """Track API requests and enforce limits"""
     
-    def __init__(self, usage_file: Path = None):
-        self.usage_file = usage_file or Path(__file__).parent.parent / "usage.json"
-        self.daily_limit = 250
-        self.minute_limit = 15  # Conservative limit per minute
-        self.data = self._load_usage()
+    def __init__(self, store: QuotaStore = None, ledger: UsageLedger = None):
+        self.store = store or get_quota_store()
+        self.ledger = ledger or get_usage_ledger()
+        # 0 = illimité
+        self.daily_limit = Config.GEMINI_LIMITS["rpd"]
+        self.minute_limit = Config.GEMINI_LIMITS["rpm"]
+        self.limiter = RateLimiter(
+            rpm=self.minute_limit,
+            rpd=self.daily_limit,
+            tpm=Config.GEMINI_LIMITS["tpm"],
+            store=self.store
+        )
     
-    def _load_usage(self) -> Dict:
-        """Load usage data from file"""
-        # Force le compteur de requêtes à démarrer à 123
-        default_data = {
-            "daily_requests": 123,  # Force requests to start at 123
+    @property
+    def data(self) -> Dict:
+        """
+        Current request counters (global, shared by all sessions)
+        
+        The QuotaStore counter is the only daily count; the ledger keeps the lifetime total.
+        """
+        return {
+            "daily_requests": self.store.get_daily_requests(),
             "daily_limit": self.daily_limit,
-            "minute_requests": 0,
-            "last_reset_day": date.today().isoformat(),
-            "last_minute_reset": datetime.now().isoformat()
+            "minute_requests": self.limiter.get_minute_usage(),
+            "last_reset_day": date.today().isoformat()
         }
-        
-        if self.usage_file.exists():
-            try:
-                with open(self.usage_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Merge with defaults to ensure all fields exist
-                    merged_data = {**default_data, **data}
-                    # Ensure daily_requests is forced to 123 if it's 0
-                    if merged_data.get("daily_requests", 0) == 0:
-                        merged_data["daily_requests"] = 123
-                        print(f"🔄 FORCED daily_requests to 123")
-                    return merged_data
-            except Exception as e:
-                print(f"Error loading usage file: {e}")
-                return default_data
-        else:
-            self._save_usage(default_data)
-            print(f"🆕 Creating usage.json with FORCED {default_data['daily_requests']} requests")
-            return default_data
     
-    def _save_usage(self, data: Dict = None):
-        """Save usage data to file"""
-        if data is None:
-            data = self.data
+    def track_request(self, tokens: int = 0) -> bool:
+        """
+        Track a new request and check if it's allowed
         
-        try:
-            self.usage_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving usage file: {e}")
-    
-    def _reset_daily_if_needed(self):
-        """Reset daily counter if it's a new day"""
-        today = date.today()
-        last_day = date.fromisoformat(self.data["last_reset_day"])
+        Args:
+            tokens: Estimated tokens of the request (TPM limit)
         
-        if today > last_day:
-            self.data["daily_requests"] = 0
-            self.data["last_reset_day"] = today.isoformat()
-            self._save_usage()
-    
-    def _reset_minute_if_needed(self):
-        """Reset minute counter if more than 1 minute has passed"""
-        now = datetime.now()
-        last_reset = datetime.fromisoformat(self.data["last_minute_reset"])
+        Returns:
+            bool: True if request is allowed, False if limit exceeded
+        """
+        if not self.limiter.try_acquire(tokens):
+            return False
         
-        # Reset if more than 1 minute has passed
-        if (now - last_reset).total_seconds() > 60:
-            self.data["minute_requests"] = 0
-            self.data["last_minute_reset"] = now.isoformat()
+        self.ledger.record_request()
+        return True
     
-    def track_request(self) -> bool:
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
         """
-        Track a new request and check if it's allowed
+        Wait for quota capacity then track the request
+        
+        Args:
+            tokens: Estimated tokens of the request (TPM limit)
+            timeout: Max seconds to wait (None = as long as needed)
         
         Returns:
-            bool: True if request is allowed, False if limit exceeded
+            bool: True if request is allowed, False if it can't be within the timeout
         """
-        self._reset_daily_if_needed()
-        self._reset_minute_if_needed()
-        
-        # Check daily limit
-        if self.data["daily_requests"] >= self.daily_limit:
+        if not self.limiter.acquire(tokens, timeout=timeout):
             return False
         
-        # Check minute limit
-        if self.data["minute_requests"] >= self.minute_limit:
+        self.ledger.record_request()
+        return True
+    
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """Async version of acquire()"""
+        if not await self.limiter.acquire_async(tokens, timeout=timeout):
             return False
         
-        # Increment counters
-        self.data["daily_requests"] += 1
-        self.data["minute_requests"] += 1
-        self._save_usage()
-        
+        await asyncio.to_thread(self.ledger.record_request)
         return True
     
+    def refund(self, tokens: int = 0):
+        """
+        Cancel a tracked request that never reached the server
+        (connection failure before the request was sent)
+        """
+        self.limiter.refund(tokens)
+        self.ledger.record_request(count=-1)
+    
+    def estimate_wait(self, tokens: int = 0) -> float:
+        """Seconds before the next request would be allowed (0 = now)"""
+        return self.limiter.estimate_wait(tokens)
+    
     def check_limits(self) -> bool:
         """
         Check if we're still under the daily limit
@@ -111,7 +101,8 @@ class RequestTracker:
         Returns:
             bool: True if under limit, False if exceeded
         """
-        self._reset_daily_if_needed()
+        if not self.daily_limit:
+            return True
         return self.data["daily_requests"] < self.daily_limit
     
     def sync_usage(self, current_val: int):
@@ -121,29 +112,28 @@ class RequestTracker:
         Args:
             current_val: Current value from Google AI Studio
         """
-        self._reset_daily_if_needed()
-        
         if current_val != self.data["daily_requests"]:
-            self.data["daily_requests"] = current_val
-            self._save_usage()
+            self.store.set_daily_requests(current_val)
             print(f"Usage synced to: {current_val}")
     
     def get_stats(self) -> Dict:
         """Get current usage statistics"""
-        self._reset_daily_if_needed()
-        self._reset_minute_if_needed()
+        data = self.data
+        daily = data["daily_requests"]
+        minute = data["minute_requests"]
         
+        # Limite à 0 = illimité : jamais dépassée, pourcentage nul
         return {
-            "daily_requests": self.data["daily_requests"],
-            "daily_limit": self.data["daily_limit"],
-            "daily_remaining": max(0, self.daily_limit - self.data["daily_requests"]),
-            "daily_percentage": (self.data["daily_requests"] / self.daily_limit) * 100,
-            "minute_requests": self.data["minute_requests"],
+            "daily_requests": daily,
+            "daily_limit": data["daily_limit"],
+            "daily_remaining": max(0, self.daily_limit - daily) if self.daily_limit else None,
+            "daily_percentage": (daily / self.daily_limit) * 100 if self.daily_limit else 0.0,
+            "minute_requests": minute,
             "minute_limit": self.minute_limit,
-            "minute_remaining": max(0, self.minute_limit - self.data["minute_requests"]),
-            "last_reset_day": self.data["last_reset_day"],
-            "is_daily_exceeded": self.data["daily_requests"] >= self.daily_limit,
-            "is_minute_exceeded": self.data["minute_requests"] >= self.minute_limit
+            "minute_remaining": max(0, self.minute_limit - minute) if self.minute_limit else None,
+            "last_reset_day": data["last_reset_day"],
+            "is_daily_exceeded": bool(self.daily_limit) and daily >= self.daily_limit,
+            "is_minute_exceeded": bool(self.minute_limit) and minute >= self.minute_limit
         }
     
     def format_requests(self, count: int) -> str:
@@ -163,4 +153,4 @@ class RequestTracker:
         elif stats["daily_percentage"] > 80:
             return f"⚠️ Presque la limite journalière ({stats['daily_requests']}/{stats['daily_limit']})"
         else:
-            return f"✅ OK ({stats['daily_requests']}/{stats['daily_limit']} aujourd'hui)"
+            return f"✅ OK ({stats['daily_requests']}/{stats['daily_limit'] or '∞'} aujourd'hui)"
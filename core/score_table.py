@@ -0,0 +1,88 @@
+"""
+Score Table - Columnar quality scores
+NumPy arrays (one per metric) so threshold filters are vectorized masks
+and slider counts come from precomputed sorted columns / histograms.
+"""
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class ScoreTable:
+    """Quality scores of a dataset, one NumPy column per metric"""
+
+    BLUR_BINS = 20  # Histogramme de netteté affiché sous le slider (pas de 5)
+
+    def __init__(self,
+                 paths: Sequence[Path],
+                 width: np.ndarray,
+                 height: np.ndarray,
+                 blur: np.ndarray,
+                 faces: np.ndarray,
+                 overall: np.ndarray,
+                 scored: np.ndarray = None):
+        self.paths = list(paths)
+        self.width = width
+        self.height = height
+        self.blur = blur
+        self.faces = faces
+        self.overall = overall
+        # Images non scorées (décodage impossible...) : gardées comme lignes toujours masquées
+        self.scored = scored if scored is not None else np.ones(len(self.paths), dtype=bool)
+        self.min_side = np.minimum(width, height)
+
+        # Précalculé une fois : comptes "≥ seuil" en O(log n) par recherche binaire
+        self._sorted_blur = np.sort(blur[self.scored])
+        self._sorted_min_side = np.sort(self.min_side[self.scored])
+        self.blur_histogram, self.blur_edges = np.histogram(blur[self.scored], bins=self.BLUR_BINS, range=(0, 100))
+        self.single_face_count = int(np.count_nonzero((faces == 1) & self.scored))
+        self.scored_count = int(np.count_nonzero(self.scored))
+
+    @classmethod
+    def from_qualities(cls, paths: Sequence[Path], qualities: Dict[str, Dict]) -> "ScoreTable":
+        """Build the table from quality dicts keyed by path string (one row per path, scored or not)"""
+        n = len(paths)
+        width = np.zeros(n, dtype=np.int32)
+        height = np.zeros(n, dtype=np.int32)
+        blur = np.zeros(n, dtype=np.float64)
+        faces = np.zeros(n, dtype=np.int16)
+        overall = np.zeros(n, dtype=np.float64)
+        scored = np.zeros(n, dtype=bool)
+        for i, path in enumerate(paths):
+            quality = qualities.get(str(path))
+            if quality is None:
+                continue
+            width[i], height[i] = quality["resolution"]
+            blur[i] = quality["blur_score"]
+            faces[i] = quality["face_count"]
+            overall[i] = quality["overall_score"]
+            scored[i] = True
+        return cls(paths, width, height, blur, faces, overall, scored)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def mask(self,
+             min_resolution: Tuple[int, int] = (512, 512),
+             max_blur_threshold: float = 30.0,
+             require_face: bool = False) -> np.ndarray:
+        """Boolean mask of the images passing all thresholds (never the unscored ones)"""
+        keep = self.scored & (self.width >= min_resolution[0]) & (self.height >= min_resolution[1])
+        keep &= self.blur >= max_blur_threshold
+        if require_face:
+            keep &= self.faces == 1
+        return keep
+
+    def filter(self,
+               min_resolution: Tuple[int, int] = (512, 512),
+               max_blur_threshold: float = 30.0,
+               require_face: bool = False) -> List[Path]:
+        """Paths passing all thresholds, in table order"""
+        return [self.paths[i] for i in np.flatnonzero(self.mask(min_resolution, max_blur_threshold, require_face))]
+
+    def count_blur_at_least(self, threshold: float) -> int:
+        return len(self._sorted_blur) - int(np.searchsorted(self._sorted_blur, threshold, side="left"))
+
+    def count_min_side_at_least(self, side: int) -> int:
+        return len(self._sorted_min_side) - int(np.searchsorted(self._sorted_min_side, side, side="left"))
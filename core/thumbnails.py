@@ -0,0 +1,180 @@
+"""
+Thumbnail Pyramid - Downscaled JPEG renditions served as static files
+Each image is decoded once and rendered at every pyramid size (256px grid
+thumbnails, 1024px previews), keyed by content hash. Renditions live in
+static/previews/ (Streamlit static serving), size-bounded with LRU eviction.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from PIL import Image, ImageOps
+
+from core.config import Config
+
+STATIC_URL = "app/static"  # Préfixe des fichiers de static/ quand enableStaticServing est actif
+
+THUMB = 256     # Grilles et galeries
+PREVIEW = 1024  # Vue swipe, aperçus plein cadre
+
+
+class ThumbnailCache:
+    """On-disk LRU cache of thumbnail renditions, keyed by content hash"""
+
+    HASH_MEMO_SIZE = 4096  # (chemin, taille, mtime) -> hash gardés en mémoire
+    RENDER_VERSION = 2     # À incrémenter quand le rendu change (v2 : orientation EXIF)
+
+    def __init__(self, cache_dir: Path = None, quality: int = None, max_bytes: int = None):
+        settings = Config.THUMBNAILS
+        self.cache_dir = cache_dir or Config.PREVIEW_DIR
+        self.sizes = tuple(sorted(settings["sizes"], reverse=True))
+        self.quality = quality or settings["quality"]
+        self.max_bytes = max_bytes if max_bytes is not None else settings["max_mb"] * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._hashes: "OrderedDict[tuple, str]" = OrderedDict()
+        self._size_bytes: Optional[int] = None  # Calculé au premier besoin
+
+    def _content_hash(self, path: Path) -> str:
+        """sha256 of a file, memoized by (path, size, mtime): a modified file gets new renditions"""
+        stat = path.stat()
+        stat_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(stat_key)
+            if digest is not None:
+                self._hashes.move_to_end(stat_key)
+                return digest
+
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+
+        with self._lock:
+            self._hashes[stat_key] = digest
+            while len(self._hashes) > self.HASH_MEMO_SIZE:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def _path(self, digest: str, size: int) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}_{size}_v{self.RENDER_VERSION}.jpg"
+
+    def _entries(self):
+        return [p for p in self.cache_dir.glob("*/*.jpg") if p.is_file()]
+
+    def _render(self, source: Path, digest: str):
+        """Decode once, write every pyramid size (largest first, each from the previous one)"""
+        written = 0
+        with Image.open(source) as img:
+            if img.format == "JPEG":
+                # Décodage réduit dans le domaine DCT : pas besoin de l'image pleine taille
+                img.draft("RGB", (self.sizes[0], self.sizes[0]))
+            # Orientation EXIF appliquée avant réduction (photos de téléphone)
+            img = ImageOps.exif_transpose(img).convert("RGB")
+
+            for size in self.sizes:
+                img.thumbnail((size, size), Image.Resampling.LANCZOS)
+                target = self._path(digest, size)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = target.with_suffix(f".{threading.get_ident()}.tmp")
+                img.save(tmp_file, format="JPEG", quality=self.quality, optimize=True)
+                os.replace(tmp_file, target)
+                written += target.stat().st_size
+
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(p.stat().st_size for p in self._entries())
+            else:
+                self._size_bytes += written
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove oldest renditions until the cache fits in max_bytes (lock held)"""
+        entries = []
+        for p in self._entries():
+            try:
+                stat = p.stat()
+                entries.append((stat.st_mtime, stat.st_size, p))
+            except OSError:
+                continue
+        entries.sort()
+
+        self._size_bytes = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if self._size_bytes <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                self._size_bytes -= size
+            except OSError:
+                pass
+
+    def get(self, path: Union[str, Path], size: int = PREVIEW) -> Optional[Path]:
+        """Rendition of an image at a pyramid size (rendered on first request). None if undecodable."""
+        path = Path(path)
+        if size not in self.sizes:
+            raise ValueError(f"Thumbnail size {size} not in pyramid {self.sizes}")
+        try:
+            digest = self._content_hash(path)
+            target = self._path(digest, size)
+            try:
+                os.utime(target)  # Rendu le plus récemment utilisé
+                with self._lock:
+                    self.hits += 1
+                return target
+            except OSError:
+                pass
+
+            # Absent ou évincé : toute la pyramide est régénérée en un décodage
+            with self._lock:
+                self.misses += 1
+            self._render(path, digest)
+            return target
+        except Exception as e:
+            print(f"⚠️ Thumbnail failed for {path.name}: {e}")
+            return None
+
+    def path_for(self, path: Union[str, Path], size: int = THUMB) -> str:
+        """Rendition path for st.image (falls back to the original file)"""
+        target = self.get(path, size)
+        return str(target if target is not None else path)
+
+    def url(self, path: Union[str, Path], size: int = PREVIEW) -> Optional[str]:
+        """URL of the rendition under Streamlit's static route"""
+        target = self.get(path, size)
+        if target is None:
+            return None
+        return f"{STATIC_URL}/{target.relative_to(Config.STATIC_DIR).as_posix()}"
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and disk usage"""
+        with self._lock:
+            if self._size_bytes is None and self.cache_dir.exists():
+                self._size_bytes = sum(p.stat().st_size for p in self._entries())
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) * 100 if lookups else 0.0,
+                "size_bytes": self._size_bytes or 0,
+                "max_bytes": self.max_bytes
+            }
+
+
+_thumbnail_cache: Optional[ThumbnailCache] = None
+_thumbnail_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Get the process-wide thumbnail cache"""
+    global _thumbnail_cache
+    with _thumbnail_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
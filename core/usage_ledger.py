@@ -0,0 +1,395 @@
+"""
+Usage Ledger - Append-only API usage journal
+Records token, image, request and cache events, batches writes and compacts
+them periodically into a snapshot. Events live in SQLite (WAL mode) so the
+Streamlit process and the job worker append to, and read from, the same
+journal: sequence numbers are assigned by the database, never by a process.
+"""
+import atexit
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DEFAULT_LEDGER_DIR = Path(__file__).parent.parent / "data"
+# Compteurs des anciennes versions, importés si aucun ledger n'existe encore
+LEGACY_MONITOR_FILE = DEFAULT_LEDGER_DIR / "api_usage.json"
+LEGACY_USAGE_FILE = Path(__file__).parent.parent / "usage.json"
+
+
+class UsageLedger:
+    """Single source of truth for persistent API usage counters"""
+
+    FLUSH_EVERY = 20        # Events buffered before an append to disk
+    FLUSH_INTERVAL = 5.0    # Max seconds an event may stay buffered
+    REFRESH_INTERVAL = 0.5  # Min seconds between two reads of other processes' events
+    COMPACT_EVERY = 500     # Journal rows before compaction into the snapshot
+    LATENCY_HISTORY = 50    # Request latencies kept for ETA estimates
+
+    def __init__(self,
+                 ledger_dir: Path = None,
+                 legacy_monitor_file: Path = None,
+                 legacy_usage_file: Path = None):
+        """
+        Args:
+            ledger_dir: Directory of the ledger files (default: data/)
+            legacy_monitor_file: Old api_usage.json to migrate (default: next to the ledger)
+            legacy_usage_file: Old usage.json to migrate (default: repo root for the
+                default ledger, the ledger directory otherwise)
+        """
+        self.ledger_dir = ledger_dir or DEFAULT_LEDGER_DIR
+        # Un ledger hors de data/ (tests, autre espace) ne touche pas aux fichiers du dépôt
+        custom_dir = ledger_dir is not None and Path(ledger_dir) != DEFAULT_LEDGER_DIR
+        self.legacy_monitor_file = legacy_monitor_file or (
+            self.ledger_dir / "api_usage.json" if custom_dir else LEGACY_MONITOR_FILE)
+        self.legacy_usage_file = legacy_usage_file or (
+            self.ledger_dir / "usage.json" if custom_dir else LEGACY_USAGE_FILE)
+        self.db_file = self.ledger_dir / "usage_ledger.sqlite3"
+        # Journal JSONL + snapshot JSON de la version mono-processus, importés une fois
+        self.ledger_file = self.ledger_dir / "usage_ledger.jsonl"
+        self.snapshot_file = self.ledger_dir / "usage_snapshot.json"
+
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._pending: List[Dict] = []
+        self._last_flush = time.monotonic()
+        self._last_refresh = 0.0
+        self.totals: Optional[Dict] = None  # Agrégat des événements déjà écrits en base
+
+        self.ledger_dir.mkdir(parents=True, exist_ok=True)
+        self._create_schema()
+        self._refresh(force=True)
+        atexit.register(self.flush)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (Streamlit sessions run in threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_file), timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                event TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshot (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                seq INTEGER NOT NULL,
+                totals TEXT NOT NULL
+            )
+        """)
+
+        # Premier démarrage : un seul processus importe les anciens compteurs
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM snapshot WHERE id = 1").fetchone() is None:
+                totals = self._import_files()
+                totals["seq"] = 0
+                conn.execute("INSERT INTO snapshot (id, seq, totals) VALUES (1, 0, ?)",
+                             (json.dumps(totals, ensure_ascii=False),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _default_totals() -> Dict:
+        """Default aggregate (starting values forced by the user)"""
+        now = datetime.now().isoformat()
+        return {
+            "seq": 0,
+            "quota_total": 100000,
+            "tokens_used": 47310,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "images_generated": 0,
+            "requests_total": 0,
+            "latencies": [],
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "last_reset": now,
+            "last_updated": now
+        }
+
+    def _import_files(self) -> Dict:
+        """Aggregate of the previous JSONL ledger, else of the legacy counter files"""
+        totals = self._default_totals()
+
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    totals.update(json.load(f))
+            except Exception as e:
+                print(f"❌ Error loading usage snapshot: {e}")
+        elif not self.ledger_file.exists():
+            totals.update(self._load_legacy())
+
+        if self.ledger_file.exists():
+            with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # Ligne tronquée (crash pendant un append) : ignorée
+                        continue
+                    if event.get("seq", 0) > totals["seq"]:
+                        self._apply(totals, event)
+            print(f"📦 Imported {self.ledger_file.name} into {self.db_file.name}")
+
+        return totals
+
+    def _load_legacy(self) -> Dict:
+        """Import counters from the old api_usage.json / usage.json files"""
+        migrated = {}
+        if self.legacy_monitor_file.exists():
+            try:
+                with open(self.legacy_monitor_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for key in ("quota_total", "tokens_used", "images_generated", "last_reset"):
+                    if key in data:
+                        migrated[key] = data[key]
+            except Exception as e:
+                print(f"⚠️ Could not migrate {self.legacy_monitor_file.name}: {e}")
+
+        if self.legacy_usage_file.exists():
+            try:
+                with open(self.legacy_usage_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for key in ("input_tokens", "output_tokens"):
+                    if key in data:
+                        migrated[key] = data[key]
+            except Exception as e:
+                print(f"⚠️ Could not migrate {self.legacy_usage_file.name}: {e}")
+
+        if migrated:
+            print(f"📦 Migrated legacy usage counters: {sorted(migrated)}")
+        return migrated
+
+    def _read_snapshot(self, conn: sqlite3.Connection):
+        """(seq, totals) of the snapshot row"""
+        seq, data = conn.execute("SELECT seq, totals FROM snapshot WHERE id = 1").fetchone()
+        totals = self._default_totals()
+        totals.update(json.loads(data))
+        # Compteur journalier des anciennes versions : tenu par le QuotaStore désormais
+        totals.pop("daily_requests", None)
+        totals.pop("requests_day", None)
+        totals["seq"] = seq
+        return seq, totals
+
+    def _replay(self, conn: sqlite3.Connection, totals: Dict):
+        """Fold the journal events written after totals["seq"]"""
+        rows = conn.execute(
+            "SELECT seq, event FROM events WHERE seq > ? ORDER BY seq", (totals["seq"],)
+        ).fetchall()
+        for seq, data in rows:
+            event = json.loads(data)
+            event["seq"] = seq
+            self._apply(totals, event)
+
+    def _refresh(self, force: bool = False):
+        """Catch up with the events appended by every process since the last read"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < self.REFRESH_INTERVAL:
+                return
+            conn = self._connect()
+            try:
+                # Transaction de lecture : snapshot et journal vus au même instant
+                conn.execute("BEGIN")
+                try:
+                    snapshot_seq = conn.execute("SELECT seq FROM snapshot WHERE id = 1").fetchone()[0]
+                    if self.totals is None or snapshot_seq > self.totals["seq"]:
+                        # Compacté par un autre processus au-delà de notre vue : on repart du snapshot
+                        _, totals = self._read_snapshot(conn)
+                    else:
+                        totals = self.totals
+                    self._replay(conn, totals)
+                finally:
+                    conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"❌ Error reading usage ledger: {e}")
+                if self.totals is None:
+                    self.totals = self._default_totals()
+                return
+            self.totals = totals
+            self._last_refresh = now
+
+    # ------------------------------------------------------------------
+    # Event handling
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _apply(totals: Dict, event: Dict):
+        """Fold one event into the aggregate"""
+        kind = event.get("type")
+
+        if kind == "tokens":
+            totals["tokens_used"] += event.get("total", 0)
+            totals["input_tokens"] += event.get("input", 0)
+            totals["output_tokens"] += event.get("output", 0)
+        elif kind == "image":
+            totals["images_generated"] += event.get("count", 1)
+        elif kind == "request":
+            # Total cumulé uniquement : le compteur du jour est celui du QuotaStore
+            # (count < 0 : remboursement d'une requête jamais envoyée)
+            totals["requests_total"] += event.get("count", 1)
+        elif kind == "latency":
+            totals["latencies"] = (totals["latencies"] + [event["seconds"]])[-UsageLedger.LATENCY_HISTORY:]
+        elif kind == "cache":
+            totals["cache_hits"] += event.get("hits", 0)
+            totals["cache_misses"] += event.get("misses", 0)
+        elif kind == "set":
+            totals.update(event.get("values", {}))
+
+        totals["seq"] = max(totals["seq"], event.get("seq", 0))
+        totals["last_updated"] = event.get("ts", totals["last_updated"])
+
+    def _record(self, event: Dict, flush: bool = False):
+        """Buffer an event for the next append (visible to this process immediately)"""
+        with self._lock:
+            event["ts"] = datetime.now().isoformat()
+            self._pending.append(event)
+
+            overdue = time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL
+            if flush or overdue or len(self._pending) >= self.FLUSH_EVERY:
+                self.flush()
+
+    def record_tokens(self, total: int = 0, input_tokens: int = 0, output_tokens: int = 0):
+        """
+        Record token usage
+
+        Args:
+            total: Tokens counted against the quota
+            input_tokens: Input tokens (cost breakdown only)
+            output_tokens: Output tokens (cost breakdown only)
+        """
+        self._record({"type": "tokens", "total": total, "input": input_tokens, "output": output_tokens})
+
+    def record_image(self, count: int = 1):
+        """Record generated images"""
+        self._record({"type": "image", "count": count})
+
+    def record_request(self, count: int = 1):
+        """Record API requests (lifetime total; the daily count lives in the QuotaStore)"""
+        self._record({"type": "request", "count": count})
+
+    def record_latency(self, seconds: float):
+        """Record the duration of one API request"""
+        self._record({"type": "latency", "seconds": round(seconds, 3)})
+
+    def record_cache(self, hit: bool):
+        """Record one generation cache lookup"""
+        self._record({"type": "cache", "hits": int(hit), "misses": int(not hit)})
+
+    def set_values(self, **values):
+        """Overwrite aggregate fields (recalibration, manual reset)"""
+        self._record({"type": "set", "values": values}, flush=True)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Append buffered events to the journal in a single transaction"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # seq attribué par SQLite (AUTOINCREMENT) : aucune collision entre processus
+                    conn.executemany(
+                        "INSERT INTO events (event) VALUES (?)",
+                        [(json.dumps(event, ensure_ascii=False),) for event in self._pending]
+                    )
+                    rows = conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            except Exception as e:
+                print(f"❌ Error appending usage ledger: {e}")
+                return
+            self._pending = []
+            self._refresh(force=True)
+
+            if rows >= self.COMPACT_EVERY:
+                self.compact()
+
+    def compact(self):
+        """Fold the journal into the snapshot and delete the folded events"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                # Verrou d'écriture : aucun autre processus n'ajoute pendant le repli
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    _, totals = self._read_snapshot(conn)
+                    self._replay(conn, totals)
+                    conn.execute("UPDATE snapshot SET seq = ?, totals = ? WHERE id = 1",
+                                 (totals["seq"], json.dumps(totals, ensure_ascii=False)))
+                    conn.execute("DELETE FROM events WHERE seq <= ?", (totals["seq"],))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            except Exception as e:
+                print(f"❌ Error compacting usage ledger: {e}")
+                return
+            self.totals = totals
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_totals(self) -> Dict:
+        """Get the aggregate of all processes, plus this process's unflushed events"""
+        self._refresh()
+        with self._lock:
+            totals = dict(self.totals)
+            totals["latencies"] = list(self.totals["latencies"])
+            for event in self._pending:
+                self._apply(totals, event)
+        return totals
+
+
+    def get_expected_latency(self, default: float = 30.0) -> float:
+        """Median of recent request latencies (ETA of the next request)"""
+        latencies = sorted(self.get_totals()["latencies"])
+        if not latencies:
+            return default
+        return latencies[len(latencies) // 2]
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Get the process-wide ledger shared by all sessions"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger()
+        return _ledger
@@ -2,12 +2,11 @@
 Token Usage & Cost Tracker for Google Gemini API
 Tracks input/output tokens and calculates costs per session
 """
-import json
-import os
-from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict
 from datetime import datetime
 
+from core.usage_ledger import UsageLedger, get_usage_ledger
+
 class UsageTracker:
     """Track API usage and costs for Gemini"""
     
@@ -16,10 +15,9 @@ class UsageTracker:
     COST_OUTPUT_PER_1M = 3.75  # $ per 1M output tokens
     COST_IMAGE_GEN = 0.03  # $ per image generation
     
-    def __init__(self):
-        self.usage_file = Path(__file__).parent.parent / "usage.json"
+    def __init__(self, ledger: UsageLedger = None):
+        self.ledger = ledger or get_usage_ledger()
         self.reset()
-        self._load_usage()
     
     def reset(self):
         """Reset all counters"""
@@ -28,47 +26,6 @@ class UsageTracker:
         self.images_generated = 0
         self.session_start = datetime.now()
     
-    def _load_usage(self):
-        """Load usage data from file"""
-        default_data = {
-            "total_tokens": 47310,  # Valeur de départ de l'utilisateur
-            "input_tokens": 0,
-            "output_tokens": 0,
-            "images_generated": 0,
-            "last_updated": datetime.now().isoformat()
-        }
-        
-        if self.usage_file.exists():
-            try:
-                with open(self.usage_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Ensure all fields exist
-                    return {**default_data, **data}
-            except Exception as e:
-                print(f"Error loading usage file: {e}")
-                return default_data
-        else:
-            self._save_usage(default_data)
-            return default_data
-    
-    def _save_usage(self, data: Dict = None):
-        """Save usage data to file"""
-        if data is None:
-            data = {
-                "total_tokens": self.get_total_tokens(),
-                "input_tokens": self.input_tokens,
-                "output_tokens": self.output_tokens,
-                "images_generated": self.images_generated,
-                "last_updated": datetime.now().isoformat()
-            }
-        
-        try:
-            self.usage_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving usage file: {e}")
-    
     def add_tokens(self, input_tokens: int = 0, output_tokens: int = 0):
         """
         Add tokens to the counter
@@ -79,7 +36,7 @@ class UsageTracker:
         """
         self.input_tokens += input_tokens
         self.output_tokens += output_tokens
-        self._save_usage()
+        self.ledger.record_tokens(input_tokens=input_tokens, output_tokens=output_tokens)
     
     def update_usage(self, tokens_used: int):
         """
@@ -88,8 +45,7 @@ class UsageTracker:
         Args:
             tokens_used: Total tokens used in the API call
         """
-        self.total_tokens = tokens_used
-        self._save_usage()
+        self.ledger.set_values(tokens_used=tokens_used)
     
     def add_image(self):
         """Increment image generation counter"""
@@ -112,16 +68,8 @@ class UsageTracker:
         return self.get_input_cost() + self.get_output_cost() + self.get_image_cost()
     
     def get_total_tokens(self) -> int:
-        """Get total tokens (input + output)"""
-        # Load from persistent storage to get current value
-        try:
-            if self.usage_file.exists():
-                with open(self.usage_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get('total_tokens', self.input_tokens + self.output_tokens)
-        except:
-            pass
-        return self.input_tokens + self.output_tokens
+        """Get total tokens counted against the quota"""
+        return self.ledger.get_totals()["tokens_used"]
     
     def get_stats(self) -> Dict:
         """
@@ -5,6 +5,7 @@ Main Entry Point & Router
 """
 import streamlit as st
 from pathlib import Path
+import importlib
 import os
 import sys
 
@@ -27,12 +28,12 @@ st.set_page_config(
 # IMPORTS SÉCURISÉS
 # ============================================================================
 
+# Les pages (cv2, google-genai, instaloader...) sont importées à la première visite : voir load_page()
 try:
-    from ui import home_linear, casting_linear, scraper, factory, curation
-    from core.persistent_monitor import PersistentMonitor
     from core.usage_tracker import UsageTracker
-    from core.request_tracker import RequestTracker
+    from core.generation_cache import get_generation_cache
     from core.config import Config
+    from ui import resources
 except ImportError as e:
     st.error(f"❌ Erreur critique d'importation : {e}")
     st.stop()
@@ -62,14 +63,15 @@ def init_session_state():
         st.session_state.active_page = "home"
     
     # --- Core Logic ---
+    # Moniteur et tracker partagés par toutes les sessions (ui/resources.py)
     if 'persistent_monitor' not in st.session_state:
-        st.session_state.persistent_monitor = PersistentMonitor()
+        st.session_state.persistent_monitor = resources.get_persistent_monitor()
     
     if 'usage_tracker' not in st.session_state:
         st.session_state.usage_tracker = UsageTracker()
     
     if 'request_tracker' not in st.session_state:
-        st.session_state.request_tracker = RequestTracker()
+        st.session_state.request_tracker = resources.get_request_tracker()
     
     # Force Sync des Quotas (Action unique au démarrage)
     if st.session_state.persistent_monitor.data['tokens_used'] < 47310:
@@ -170,8 +172,8 @@ def render_sidebar():
         try:
             req_stats = st.session_state.request_tracker.get_stats()
             requests_today = req_stats['daily_requests']
-            requests_limit = req_stats['daily_limit']
-            requests_pct = requests_today / requests_limit
+            requests_limit = req_stats['daily_limit'] or "∞"
+            requests_pct = min(1.0, req_stats['daily_percentage'] / 100)
             
             st.sidebar.progress(requests_pct)
             st.caption(f"Requêtes : {requests_today} / {requests_limit}")
@@ -203,32 +205,33 @@ def render_sidebar():
         except:
             st.caption("Tokens indisponibles")
         
+        # Cache de génération (hits = requêtes économisées)
+        if Config.GENERATION_CACHE_ENABLED:
+            cache_stats = get_generation_cache().get_stats()
+            st.caption(
+                f"♻️ Cache : {cache_stats['hits']} hits / {cache_stats['misses']} miss "
+                f"({cache_stats['hit_rate']:.0f}%) · {cache_stats['size_bytes'] / (1024**2):.0f} MB"
+            )
+        
         st.markdown("---")
         
         # Hardware Monitor (RTX 3070)
         st.markdown("### 🎮 Hardware")
         
-        try:
-            # FIX: Import pynvml instead of nvidia_ml_py
-            import pynvml as nvml
-            nvml.nvmlInit()
-            handle = nvml.nvmlDeviceGetHandleByIndex(0)
-            info = nvml.nvmlDeviceGetMemoryInfo(handle)
-            gpu_name = nvml.nvmlDeviceGetName(handle)
-            
-            # Gestion encodage nom GPU (bytes vs str)
-            if isinstance(gpu_name, bytes):
-                gpu_name = gpu_name.decode('utf-8')
-                
-            vram_used = info.used / (1024**3)
-            vram_total = info.total / (1024**3)
-            vram_pct = (info.used / info.total) * 100
+        # Dernier échantillon du thread de mesure : aucun appel NVML pendant le rerun
+        monitor = resources.get_hardware_monitor()
+        sample = monitor.latest()
+        
+        if sample is not None and sample.vram_total:
+            vram_used = sample.vram_used / (1024**3)
+            vram_total = sample.vram_total / (1024**3)
+            vram_pct = sample.vram_percent
             
             vram_color = "#3fb950" if vram_pct < 70 else "#d29922" if vram_pct < 85 else "#f85149"
             
             st.markdown(f"""
             <div class="metric-container">
-                <div class="metric-label">VRAM ({gpu_name})</div>
+                <div class="metric-label">VRAM ({monitor.gpu_name})</div>
                 <div class="metric-value" style="color: {vram_color}; font-size: 1rem;">
                     {vram_used:.1f} GB / {vram_total:.1f} GB
                 </div>
@@ -240,11 +243,12 @@ def render_sidebar():
                 <div class="quota-fill" style="width: {vram_pct}%; background: {vram_color};"></div>
             </div>
             """, unsafe_allow_html=True)
-            
-            nvml.nvmlShutdown()
-        except Exception as e:
-            # Fallback silencieux si pas de GPU NVIDIA ou librairie manquante
-            st.caption(f"GPU Monitor: Off")
+        else:
+            # Pas de GPU NVIDIA, librairie manquante ou premier échantillon pas encore pris
+            st.caption("GPU Monitor: Off")
+        
+        if sample is not None:
+            st.caption(f"CPU {sample.cpu_percent:.0f}% · RAM {sample.ram_percent:.0f}%")
         
         st.markdown("---")
         
@@ -254,7 +258,7 @@ def render_sidebar():
             try:
                 req_stats = st.session_state.request_tracker.get_stats()
                 current_requests = req_stats['daily_requests']
-                requests_limit = req_stats['daily_limit']
+                requests_limit = req_stats['daily_limit'] or None  # 0 = illimité
             except:
                 current_requests = 123
                 requests_limit = 250
@@ -280,10 +284,50 @@ render_sidebar()
 # NAVIGATION
 # ============================================================================
 
-def render_navigation():
-    """Render horizontal navigation tabs"""
-    tabs = st.tabs(["🏠 Home", "🧬 Casting", "📸 Scraper", "📂 Curation", "🏭 Factory"])
-    return tabs
+PAGES = {
+    "home": ("🏠 Home", "ui.home_linear"),
+    "casting": ("🧬 Casting", "ui.casting_linear"),
+    "scraper": ("📸 Scraper", "ui.scraper"),
+    "curation": ("📂 Curation", "ui.curation"),
+    "factory": ("🏭 Factory", "ui.factory"),
+}
+
+
+@st.cache_resource(show_spinner="Chargement de la page...")
+def load_page(module_name: str):
+    """Import a page module once per process (only the visited pages are loaded)"""
+    return importlib.import_module(module_name)
+
+
+@st.cache_resource(show_spinner=False)
+def prepare_directories() -> bool:
+    """Create the data folders once per process"""
+    Config.ensure_directories()
+    return True
+
+
+def _on_navigate():
+    st.session_state.active_page = st.session_state.nav_page
+
+
+def render_navigation() -> str:
+    """Render horizontal navigation (only the active page is imported and rendered)"""
+    if st.session_state.active_page not in PAGES:
+        st.session_state.active_page = "home"
+    # Synchronisé avant la création du widget : les boutons des pages peuvent changer active_page
+    if st.session_state.get("nav_page") != st.session_state.active_page:
+        st.session_state.nav_page = st.session_state.active_page
+    
+    st.radio(
+        "Navigation",
+        options=list(PAGES),
+        format_func=lambda key: PAGES[key][0],
+        key="nav_page",
+        horizontal=True,
+        label_visibility="collapsed",
+        on_change=_on_navigate
+    )
+    return st.session_state.active_page
 
 # ============================================================================
 # MAIN ROUTER
@@ -292,9 +336,8 @@ def render_navigation():
 def main():
     """Main application router"""
     
-    # --- CRITICAL: Crée les dossiers dès le lancement ---
-    from core.config import Config
-    Config.check_directories()
+    # --- CRITICAL: Crée les dossiers dès le lancement (une fois par processus) ---
+    prepare_directories()
     
     # --- PITCH BLACK CSS ---
     st.markdown("""
@@ -455,27 +498,8 @@ def main():
     
     init_session_state()  # <--- CRITIQUE : Appeler l'initialisation ici
     
-    tabs = render_navigation()
-    
-    with tabs[0]:  # Home
-        st.session_state.active_page = "home"
-        home_linear.render()
-    
-    with tabs[1]:  # Casting
-        st.session_state.active_page = "casting"
-        casting_linear.render()
-    
-    with tabs[2]:  # Scraper
-        st.session_state.active_page = "scraper"
-        scraper.render()
-    
-    with tabs[3]:  # Curation
-        st.session_state.active_page = "curation"
-        curation.render()
-    
-    with tabs[4]:  # Factory
-        st.session_state.active_page = "factory"
-        factory.render()
+    page = render_navigation()
+    load_page(PAGES[page][1]).render()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Reference preprocessing: palette / 1-bit images go through reduce()
+"""
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from core.image_preprocess import ReferencePreprocessor
+
+
+def _palette_png(size=(1600, 1200)) -> bytes:
+    img = Image.new("RGB", size, (200, 40, 40)).convert("P", palette=Image.Palette.ADAPTIVE)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "WEBP", "PNG"])
+def test_palette_png_is_downscaled(image_format):
+    preprocessor = ReferencePreprocessor(max_size=768, image_format=image_format, quality=85)
+
+    encoded = preprocessor._encode(_palette_png())
+
+    with Image.open(io.BytesIO(encoded)) as img:
+        assert img.format == image_format
+        assert max(img.size) == 768
+        assert img.mode in ("RGB", "RGBA", "L")
+
+
+def test_one_bit_image_is_downscaled():
+    buffer = io.BytesIO()
+    Image.new("1", (2000, 1000), 1).save(buffer, format="PNG")
+    preprocessor = ReferencePreprocessor(max_size=768, image_format="JPEG", quality=85)
+
+    with Image.open(io.BytesIO(preprocessor._encode(buffer.getvalue()))) as img:
+        assert img.size == (768, 384)
@@ -14,6 +14,7 @@ from core.gemini_engine import GeminiEngine, PromptBuilder
 from core.dataset_scraper import DatasetScraper
 from core.dataset_curator import DatasetCurator
 from core.batch_face_swap import BatchFaceSwap
+from core.file_index import get_file_index
 
 class DatasetFactory:
     def __init__(self):
@@ -74,25 +75,23 @@ class DatasetFactory:
                 print_success(f"\n✓ Source face selected: {result_path.name}")
                 return True
             else:
-                print_error("Failed to generate source face")
+                print_error(f"Failed to generate source face: {engine.last_error or 'unknown error'}")
                 return False
         
         elif choice == "B":
             generated_dir = Config.OUTPUT_DIR
-            image_files = []
-            for ext in ['.png', '.jpg', '.jpeg']:
-                image_files.extend(generated_dir.glob(f"*{ext}"))
+            entries = get_file_index().entries(generated_dir, extensions=(".png", ".jpg", ".jpeg"),
+                                               sort="mtime", reverse=True)
+            image_files = [e.path for e in entries]
             
             if not image_files:
                 print_error("No images found in IMAGES/GENERATED")
                 return False
             
-            image_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-            
             print(f"\n{Colors.CYAN}AVAILABLE IMAGES (Most recent first):{Colors.RESET}")
-            for idx, img in enumerate(image_files[:20], 1):
-                size_kb = img.stat().st_size / 1024
-                print(f"[{idx:2d}] {img.name} ({size_kb:.1f} KB)")
+            for idx, entry in enumerate(entries[:20], 1):
+                size_kb = entry.size / 1024
+                print(f"[{idx:2d}] {entry.name} ({size_kb:.1f} KB)")
             
             if len(image_files) > 20:
                 print(f"... and {len(image_files) - 20} more")
@@ -166,16 +165,13 @@ class DatasetFactory:
             print_error(f"Raw directory not found: {raw_user_dir}")
             return False
         
-        image_files = []
-        for ext in ['.jpg', '.jpeg', '.png']:
-            image_files.extend(raw_user_dir.glob(f"*{ext}"))
+        image_files = get_file_index().files(raw_user_dir, extensions=(".jpg", ".jpeg", ".png"),
+                                             sort="mtime", reverse=True)
         
         if not image_files:
             print_error("No images found to curate")
             return False
         
-        image_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
-        
         print(f"{Colors.GREEN}Source Face: {self.source_face.name}{Colors.RESET}")
         print(f"Images to Review: {len(image_files)}\n")
         
@@ -191,10 +187,7 @@ class DatasetFactory:
         success = curator.review_images(image_files)
         
         if success and curator.stats['approved'] > 0:
-            approved_files = list(self.approved_dir.glob("dataset_*.png")) + \
-                           list(self.approved_dir.glob("dataset_*.jpg")) + \
-                           list(self.approved_dir.glob("dataset_*.jpeg"))
-            self.approved_images = approved_files
+            self.approved_images = self._approved_files()
             
             print_success(f"\n✓ {len(self.approved_images)} images approved and ready")
             print_info("Ready for Module 4: Batch Face Swap")
@@ -202,15 +195,17 @@ class DatasetFactory:
         
         return False
     
+    def _approved_files(self) -> list:
+        """dataset_* images of the APPROVED folder"""
+        return get_file_index().files(self.approved_dir, extensions=(".png", ".jpg", ".jpeg"), pattern="dataset_*")
+    
     def module_4_batch_face_swap(self):
         if not self.source_face:
             print_error("No source face selected. Run Module 1 first.")
             return False
         
         if not self.approved_images:
-            approved_files = list(self.approved_dir.glob("dataset_*.png")) + \
-                           list(self.approved_dir.glob("dataset_*.jpg")) + \
-                           list(self.approved_dir.glob("dataset_*.jpeg"))
+            approved_files = self._approved_files()
             
             if not approved_files:
                 print_error("No approved images found. Run Module 3 first.")
@@ -314,6 +309,7 @@ class DatasetFactory:
             clear_screen()
 
 def main():
+    Config.ensure_directories()
     try:
         factory = DatasetFactory()
         factory.run()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Import Report - Cold import cost of the app entry modules and pages
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each module and prints its total import time and heaviest dependencies.
+Usage: python -m tools.import_report [--top 10] [module ...]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).parent.parent
+
+# Modules chargés à chaque démarrage, puis les pages (chargées à la première visite)
+DEFAULT_MODULES = [
+    "core.config",
+    "core.persistent_monitor",
+    "core.request_tracker",
+    "core.generation_cache",
+    "ui.home_linear",
+    "ui.casting_linear",
+    "ui.scraper",
+    "ui.curation",
+    "ui.factory",
+]
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[float, str]], str]:
+    """
+    Import one module in a fresh interpreter
+
+    Returns:
+        Tuple (total ms, [(cumulative ms, name)] of its direct imports, error message or "")
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT), capture_output=True, text=True
+    )
+    rows = []  # (profondeur, self ms, cumulé ms, nom)
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | <2 espaces par niveau>imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(self_us) / 1000, int(cumulative_us) / 1000, name.strip()))
+
+    error = ""
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+
+    # Les imports d'un module sont listés avant lui, un niveau plus bas
+    position = max((i for i, r in enumerate(rows) if r[0] == 0 and r[3] == module), default=None)
+    if position is None:
+        return sum(r[1] for r in rows), [], error
+    children = []
+    for depth, _, cumulative_ms, name in reversed(rows[:position]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative_ms, name))
+    return rows[position][2], children, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFM Studio import-time report")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to measure")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest dependencies shown per module")
+    args = parser.parse_args()
+
+    print(f"{'Module':<28} {'Import (ms)':>12}")
+    print("-" * 42)
+    for module in args.modules:
+        total, children, error = measure(module)
+        print(f"{module:<28} {total:>12.1f}" + (f"   ❌ {error}" if error else ""))
+
+        # Dépendances directes les plus lourdes (temps cumulé)
+        for cumulative_ms, name in sorted(children, reverse=True)[:args.top]:
+            print(f"    {name:<32} {cumulative_ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
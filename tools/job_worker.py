@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Job Worker - Background executor of the durable job queue
+Usage: python -m tools.job_worker [--concurrency 3] [--kinds generate,face_swap] [--idle-exit 300]
+"""
+import argparse
+import logging
+
+from core.config import Config
+from core.job_store import get_job_store
+from core.job_worker import JobWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFM Studio job worker")
+    parser.add_argument("--concurrency", type=int, default=Config.JOB_WORKER["concurrency"],
+                        help="Max generation jobs in flight")
+    parser.add_argument("--kinds", default=None,
+                        help="Comma-separated job kinds (default: all)")
+    parser.add_argument("--idle-exit", type=float, default=None,
+                        help="Exit after this many idle seconds (default: run forever)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    Config.ensure_directories()
+
+    store = get_job_store()
+    print(f"📋 {store.pending_count()} job(s) en attente")
+
+    worker = JobWorker(
+        store=store,
+        concurrency=args.concurrency,
+        kinds=args.kinds.split(",") if args.kinds else None,
+        idle_exit=args.idle_exit
+    )
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+        print("\n⏹️ Worker arrêté")
+
+
+if __name__ == "__main__":
+    main()
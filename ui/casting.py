@@ -3,7 +3,7 @@ Casting Page - 3-Phase Character Generation System
 """
 import streamlit as st
 from pathlib import Path
-from core.gemini_engine import GeminiEngine
+from ui.resources import get_engine
 from ui.components import info_box, image_preview, copy_button, phase_button
 import time
 
@@ -159,7 +159,7 @@ def render():
                           completed=st.session_state.phase1_image is not None):
                 with st.spinner("🎨 Génération Phase 1 en cours... (~30 secondes)"):
                     try:
-                        engine = GeminiEngine()
+                        engine = get_engine()
                         engine.update_config(image_size=resolution, aspect_ratio=aspect_ratio)
                         
                         prompt = st.session_state.character.build_prompt("1")
@@ -199,7 +199,7 @@ def render():
                             st.balloons()
                             st.rerun()
                         else:
-                            info_box("Échec de la génération", "error")
+                            info_box(f"Échec de la génération: {engine.last_error or 'erreur inconnue'}", "error")
                     
                     except Exception as e:
                         info_box(f"Erreur: {str(e)}", "error")
@@ -239,7 +239,7 @@ def render():
                 if phase_button(2, enabled=True, completed=st.session_state.phase2_image is not None):
                     with st.spinner("🎨 Génération Phase 2 en cours... (~30 secondes)"):
                         try:
-                            engine = GeminiEngine()
+                            engine = get_engine()
                             prompt = st.session_state.character.build_prompt("2")
                             
                             progress_bar = st.progress(0)
@@ -261,7 +261,7 @@ def render():
                                 st.balloons()
                                 st.rerun()
                             else:
-                                info_box("Échec de la génération", "error")
+                                info_box(f"Échec de la génération: {engine.last_error or 'erreur inconnue'}", "error")
                         
                         except Exception as e:
                             info_box(f"Erreur: {str(e)}", "error")
@@ -301,7 +301,7 @@ def render():
                 if phase_button(3, enabled=True, completed=st.session_state.phase3_image is not None):
                     with st.spinner("🎨 Génération Phase 3 en cours... (~30 secondes)"):
                         try:
-                            engine = GeminiEngine()
+                            engine = get_engine()
                             prompt = st.session_state.character.build_prompt("3")
                             
                             progress_bar = st.progress(0)
@@ -323,7 +323,7 @@ def render():
                                 st.balloons()
                                 st.rerun()
                             else:
-                                info_box("Échec de la génération", "error")
+                                info_box(f"Échec de la génération: {engine.last_error or 'erreur inconnue'}", "error")
                         
                         except Exception as e:
                             info_box(f"Erreur: {str(e)}", "error")
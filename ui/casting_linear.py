@@ -16,7 +16,23 @@ from core.dna_mixer import (
     DNA_SIGNES,
     DNA_STYLE
 )
-from core.gemini_engine import GeminiEngine
+from core.gemini_engine import (
+    STAGE_QUEUED,
+    STAGE_RATE_LIMITED,
+    STAGE_IN_FLIGHT,
+    STAGE_DECODING,
+    STAGE_SAVED
+)
+from core.job_store import (
+    KIND_GENERATE,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_CANCELLED,
+    FINISHED_STATES
+)
+from core.job_worker import ensure_worker, WorkerWatchdog
+from ui.components import render_worker_failure
+from ui.resources import get_job_store
 from core.config import Config
 import time
 
@@ -88,6 +104,133 @@ def randomize_model():
     
     return random_name
 
+STAGE_LABELS = {
+    STAGE_QUEUED: "🕒 En file d'attente",
+    STAGE_RATE_LIMITED: "⏳ En attente du quota API",
+    STAGE_IN_FLIGHT: "📡 Requête en cours chez Gemini",
+    STAGE_DECODING: "🧩 Décodage de l'image",
+    STAGE_SAVED: "✅ Image enregistrée",
+    JOB_FAILED: "❌ Échec",
+    JOB_CANCELLED: "⏹️ Annulée"
+}
+
+def job_stage(job) -> str:
+    """Étape affichée d'un job de la file persistante"""
+    if job["status"] == JOB_DONE:
+        return STAGE_SAVED
+    if job["status"] in (JOB_FAILED, JOB_CANCELLED):
+        return job["status"]
+    return job["stage"] or STAGE_QUEUED
+
+def job_elapsed(job) -> float:
+    return (job["finished"] or time.time()) - job["created"]
+
+def job_in_flight_elapsed(job) -> float:
+    if not job["sent"]:
+        return 0.0
+    return (job["finished"] or time.time()) - job["sent"]
+
+def job_progress(job, eta: float) -> float:
+    """Progression réelle : l'étape du job, et pendant la requête le temps écoulé / ETA"""
+    stage = job_stage(job)
+    if stage == STAGE_SAVED:
+        return 1.0
+    if stage == STAGE_DECODING:
+        return 0.95
+    if stage == STAGE_IN_FLIGHT:
+        return 0.05 + 0.85 * min(1.0, job_in_flight_elapsed(job) / eta)
+    return 0.02
+
+def render_job_status(slot, job, eta: float):
+    """Étape, temps écoulé et ETA d'un job en cours"""
+    stage = job_stage(job)
+    with slot.container():
+        st.progress(job_progress(job, eta))
+        remaining = max(0.0, eta - job_in_flight_elapsed(job)) if stage == STAGE_IN_FLIGHT else eta
+        st.caption(
+            f"{STAGE_LABELS.get(stage, stage)} · {job_elapsed(job):.0f}s écoulées · "
+            f"~{remaining:.0f}s restantes"
+        )
+
+def account_finished_jobs(jobs):
+    """Met à jour le suivi de coût de la session une seule fois par job terminé"""
+    accounted = st.session_state.setdefault('accounted_jobs', set())
+    for job in jobs:
+        if job["job_id"] in accounted or job["status"] != JOB_DONE:
+            continue
+        accounted.add(job["job_id"])
+        if not job["result"].get("cache_hit"):
+            st.session_state.usage_tracker.add_tokens(input_tokens=len(job["payload"]["prompt"]) // 4)
+            st.session_state.usage_tracker.add_image()
+
+def render_generation_jobs(batch_id: str):
+    """Affiche la progression réelle des jobs (file persistante) puis les résultats"""
+    store = get_job_store()
+    jobs = store.get_batch(batch_id)
+    if not jobs:
+        st.session_state.phase1_batch = None
+        return
+    
+    pending = [job for job in jobs if job["status"] not in FINISHED_STATES]
+    if pending and st.button("⏹️ Annuler", use_container_width=True, key="cancel_generation"):
+        store.cancel_batch(batch_id)
+    
+    eta = st.session_state.persistent_monitor.get_expected_latency()
+    cols = st.columns(2) if len(jobs) > 1 else [st.container()]
+    slots = {job["job_id"]: cols[i % len(cols)].empty() for i, job in enumerate(jobs)}
+    
+    # Rafraîchissement de l'état réel tant qu'un job n'est pas terminé
+    # (les jobs continuent dans le worker même si l'onglet est fermé)
+    watchdog = WorkerWatchdog(store)
+    while any(job["status"] not in FINISHED_STATES for job in jobs):
+        for job in jobs:
+            render_job_status(slots[job["job_id"]], job, eta)
+        failure = watchdog.poll([(job["status"], job["stage"]) for job in jobs])
+        if failure:
+            # Worker mort au démarrage : on arrête d'attendre et on montre pourquoi
+            render_worker_failure(failure, "resume_generation_worker")
+            return
+        time.sleep(0.5)
+        jobs = store.get_batch(batch_id)
+    
+    account_finished_jobs(jobs)
+    
+    # Une seule génération réussie : sélection automatique
+    if len(jobs) == 1 and jobs[0]["status"] == JOB_DONE:
+        job = jobs[0]
+        result_path = Path(job["result"]["path"])
+        st.session_state.phase1_image = str(result_path)
+        st.session_state.last_gen_path = str(result_path)  # Store for persistent validation
+        st.session_state.phase1_batch = None
+        st.session_state.phase1_message = (
+            f"♻️ Phase 1 servie depuis le cache: {result_path.name} ({job_elapsed(job):.1f}s)" if job["result"].get("cache_hit")
+            else f"✅ Phase 1 générée: {result_path.name} ({job_elapsed(job):.1f}s)"
+        )
+        st.rerun()
+    
+    for job in jobs:
+        slot = slots[job["job_id"]].container()
+        result_path = Path(job["result"]["path"]) if job["status"] == JOB_DONE else None
+        if result_path and result_path.exists():
+            slot.image(str(result_path), use_container_width=True)
+            slot.caption(f"{'♻️ cache' if job['result'].get('cache_hit') else '✅'} · {job_elapsed(job):.1f}s")
+            if slot.button("✅ Choisir", key=f"pick_variant_{job['job_id']}", use_container_width=True):
+                st.session_state.phase1_image = str(result_path)
+                st.session_state.last_gen_path = str(result_path)
+                st.session_state.phase1_batch = None
+                st.rerun()
+        else:
+            stage = job_stage(job)
+            slot.error(f"{STAGE_LABELS.get(stage, stage)} (variante {job['position'] + 1})")
+            if job["error"]:
+                slot.caption(f"{job['error_type']}: {job['error']}")
+    
+    if any(job["status"] in (JOB_FAILED, JOB_CANCELLED) for job in jobs):
+        if st.button("🔁 Relancer les variantes en échec", use_container_width=True, key="resume_generation"):
+            store.resume_batch(batch_id)
+            ensure_worker(store)
+            st.rerun()
+
 def render():
     """Render casting page with DNA Mixer Pro"""
     
@@ -257,6 +400,22 @@ def render():
             key="phase1_ratio"
         )
         
+        variants = st.number_input(
+            "Variantes",
+            min_value=1,
+            max_value=4,
+            value=1,
+            key="phase1_variants",
+            help="Nombre de candidats générés en parallèle"
+        )
+        
+        force_regenerate = st.checkbox(
+            "🔁 Forcer la régénération",
+            value=False,
+            key="phase1_force",
+            help="Ignore le cache et appelle l'API même si ce prompt a déjà été généré"
+        )
+        
         st.markdown("---")
         
         # Check quota before generation
@@ -273,61 +432,38 @@ def render():
             st.info(f"✅ Prêt | Quota restant: {st.session_state.persistent_monitor.format_tokens(quota_remaining)}")
             generate_enabled = True
         
-        if st.button(
+        generate_clicked = st.button(
             "🎨 GÉNÉRER PHASE 1",
             disabled=not generate_enabled,
             use_container_width=True,
             key="generate_phase1"
-        ):
-            with st.spinner("🎨 Génération en cours... (~30 secondes)"):
-                try:
-                    engine = GeminiEngine()
-                    engine.update_config(image_size=resolution, aspect_ratio=aspect_ratio)
-                    
-                    prompt = mixer.build_master_prompt()
-                    
-                    # Progress bar
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    for i in range(100):
-                        time.sleep(0.3)
-                        progress_bar.progress(i + 1)
-                        if i < 30:
-                            status_text.text("🔄 Initialisation...")
-                        elif i < 70:
-                            status_text.text("🎨 Génération en cours...")
-                        else:
-                            status_text.text("✨ Finalisation...")
-                    
-                    result_path = engine.generate_image(
-                        prompt=prompt,
-                        reference_image_path=None,
-                        phase="1",
-                        character_name=f"char_{age}",
-                        usage_tracker=st.session_state.usage_tracker
-                    )
-                    
-                    if result_path and result_path.exists():
-                        st.session_state.phase1_image = str(result_path)
-                        st.session_state.last_gen_path = str(result_path)  # Store for persistent validation
-                        
-                        # Update persistent monitor
-                        estimated_tokens = len(prompt) // 4
-                        st.session_state.persistent_monitor.add_tokens(estimated_tokens)
-                        st.session_state.persistent_monitor.add_image()
-                        
-                        st.success(f"✅ Phase 1 générée: {result_path.name}")
-                    else:
-                        st.error("❌ Échec de la génération")
-                
-                except Exception as e:
-                    st.error(f"❌ Erreur: {str(e)}")
+        )
+        
+        if generate_clicked:
+            # File persistante : le worker exécute les jobs, la page ne fait que suivre leur état
+            prompt = mixer.build_master_prompt()
+            config = {"image_size": resolution, "aspect_ratio": aspect_ratio}
+            # Index de variante dans la config (donc dans la clé de cache) : N variantes = N images distinctes
+            payloads = [{
+                "prompt": prompt,
+                "phase": "1",
+                "character_name": f"char_{age}",
+                "force_regenerate": force_regenerate,
+                "config": {**config, "variant": i} if variants > 1 else config
+            } for i in range(variants)]
+            store = get_job_store()
+            st.session_state.phase1_batch = store.enqueue_batch(KIND_GENERATE, payloads)
+            ensure_worker(store)
     
     with col_result:
         st.markdown("### 🖼️ Résultat")
         
-        if 'phase1_image' in st.session_state and st.session_state.phase1_image:
+        if st.session_state.get('phase1_message'):
+            st.success(st.session_state.pop('phase1_message'))
+        
+        if st.session_state.get('phase1_batch'):
+            render_generation_jobs(st.session_state.phase1_batch)
+        elif 'phase1_image' in st.session_state and st.session_state.phase1_image:
             img_path = Path(st.session_state.phase1_image)
             if img_path.exists():
                 st.image(str(img_path), use_container_width=True)
@@ -5,13 +5,10 @@ Professional SaaS Dashboard Components
 import streamlit as st
 from pathlib import Path
 from typing import Optional, List
-import psutil
 
-try:
-    import pynvml
-    NVML_AVAILABLE = True
-except ImportError:
-    NVML_AVAILABLE = False
+from core.hardware_monitor import get_hardware_monitor, NVML_AVAILABLE
+from core.job_worker import ensure_worker, worker_log_tail
+from core.thumbnails import get_thumbnail_cache, PREVIEW, THUMB
 
 def stat_card(label: str, value: str, icon: str = "📊", progress: Optional[float] = None, target: Optional[int] = None):
     """
@@ -57,78 +54,87 @@ def led_indicator(status: bool, label: str, color_on: str = "green", color_off:
     </div>
     """, unsafe_allow_html=True)
 
-def system_monitor():
+def system_monitor(sparklines: bool = True):
     """
-    Real-time system monitoring (RAM, VRAM)
+    Real-time system monitoring (RAM, CPU, VRAM)
+    Reads the background sampler: no device init or blocking query per rerun.
     """
     st.markdown("### 🖥️ System Monitor")
     
+    monitor = get_hardware_monitor()
+    sample = monitor.latest()
+    if sample is None:
+        st.caption("⏳ Collecting metrics...")
+        return
+    
     # RAM Usage
-    ram = psutil.virtual_memory()
-    ram_percent = ram.percent
-    ram_used = ram.used / (1024**3)  # GB
-    ram_total = ram.total / (1024**3)  # GB
+    ram_percent = sample.ram_percent
+    ram_used = sample.ram_used / (1024**3)  # GB
+    ram_total = sample.ram_total / (1024**3)  # GB
     
     # Color based on usage
     ram_color = "#00ff88" if ram_percent < 70 else "#ffa502" if ram_percent < 85 else "#ff4757"
     
     st.markdown(f"""
     <div class="monitor-card">
-        <div class="monitor-label">💾 RAM Usage</div>
+        <div class="monitor-label">💾 RAM Usage · CPU {sample.cpu_percent:.0f}%</div>
         <div class="monitor-value" style="color: {ram_color};">{ram_used:.1f} GB / {ram_total:.1f} GB ({ram_percent:.0f}%)</div>
     </div>
     """, unsafe_allow_html=True)
     st.progress(ram_percent / 100)
     
+    # Historique du buffer circulaire (%)
+    series = monitor.series() if sparklines else {}
+    if len(series.get("cpu", [])) > 1:
+        st.line_chart({"CPU %": series["cpu"], "RAM %": series["ram"]}, height=80)
+    
     # VRAM Usage (RTX 3070) - Linear style with 2px gauge
-    if NVML_AVAILABLE:
-        try:
-            pynvml.nvmlInit()
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-            gpu_name = pynvml.nvmlDeviceGetName(handle)
-            vram_used = info.used / (1024**3)  # GB
-            vram_total = info.total / (1024**3)  # GB
-            vram_percent = (info.used / info.total) * 100
-            
-            # Color based on usage
-            vram_color = "#10b981" if vram_percent < 70 else "#fbbf24" if vram_percent < 85 else "#ef4444"
-            
-            st.markdown(f"""
-            <div class="monitor-card">
-                <div class="monitor-label">🎮 VRAM ({gpu_name})</div>
-                <div class="monitor-value" style="color: {vram_color};">{vram_used:.1f} GB / {vram_total:.1f} GB ({vram_percent:.0f}%)</div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Linear-style 2px gauge
-            st.markdown(f"""
+    if sample.vram_total:
+        gpu_name = monitor.gpu_name
+        vram_used = sample.vram_used / (1024**3)  # GB
+        vram_total = sample.vram_total / (1024**3)  # GB
+        vram_percent = sample.vram_percent
+        
+        # Color based on usage
+        vram_color = "#10b981" if vram_percent < 70 else "#fbbf24" if vram_percent < 85 else "#ef4444"
+        
+        st.markdown(f"""
+        <div class="monitor-card">
+            <div class="monitor-label">🎮 VRAM ({gpu_name})</div>
+            <div class="monitor-value" style="color: {vram_color};">{vram_used:.1f} GB / {vram_total:.1f} GB ({vram_percent:.0f}%)</div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        # Linear-style 2px gauge
+        st.markdown(f"""
+        <div style="
+            width: 100%;
+            height: 2px;
+            background: #1f2937;
+            border-radius: 1px;
+            overflow: hidden;
+            margin-top: 8px;
+        ">
             <div style="
-                width: 100%;
-                height: 2px;
-                background: #1f2937;
-                border-radius: 1px;
-                overflow: hidden;
-                margin-top: 8px;
-            ">
-                <div style="
-                    width: {vram_percent}%;
-                    height: 100%;
-                    background: {vram_color};
-                    transition: width 0.3s ease;
-                "></div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            pynvml.nvmlShutdown()
-        except Exception as e:
-            st.markdown(f"""
-            <div class="monitor-card">
-                <div class="monitor-label">🎮 GPU Status</div>
-                <div class="monitor-value" style="color: #6b7280;">Not Available</div>
-            </div>
-            """, unsafe_allow_html=True)
-            st.caption(f"⚠️ {str(e)[:50]}")
+                width: {vram_percent}%;
+                height: 100%;
+                background: {vram_color};
+                transition: width 0.3s ease;
+            "></div>
+        </div>
+        """, unsafe_allow_html=True)
+        
+        if len(series.get("vram", [])) > 1:
+            st.line_chart({"VRAM %": series["vram"]}, height=80)
+    elif NVML_AVAILABLE:
+        st.markdown(f"""
+        <div class="monitor-card">
+            <div class="monitor-label">🎮 GPU Status</div>
+            <div class="monitor-value" style="color: #6b7280;">Not Available</div>
+        </div>
+        """, unsafe_allow_html=True)
+        if monitor.gpu_error:
+            st.caption(f"⚠️ {monitor.gpu_error[:50]}")
     else:
         st.markdown(f"""
         <div class="monitor-card">
@@ -218,7 +224,7 @@ def image_preview(image_path: Path, caption: str = "", zoom: bool = True):
     if image_path.exists():
         css_class = "image-preview" if zoom else ""
         st.markdown(f'<div class="{css_class}">', unsafe_allow_html=True)
-        st.image(str(image_path), caption=caption, use_container_width=True)
+        st.image(get_thumbnail_cache().path_for(image_path, PREVIEW), caption=caption, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.error(f"Image not found: {image_path}")
@@ -271,7 +277,7 @@ def tinder_card(image_path: Path, current_idx: int, total: int):
     
     if image_path.exists():
         try:
-            st.image(str(image_path), use_container_width=True)
+            st.image(get_thumbnail_cache().path_for(image_path, PREVIEW), use_container_width=True)
         except Exception as e:
             st.error(f"Error loading image: {e}")
             st.code(f"Path: {image_path}")
@@ -334,7 +340,7 @@ def gallery_grid(image_paths: List[Path], columns: int = 4, max_display: int = 2
         with cols[idx % columns]:
             if img_path.exists():
                 st.markdown('<div class="gallery-item">', unsafe_allow_html=True)
-                st.image(str(img_path), use_container_width=True, caption=img_path.name[:15])
+                st.image(get_thumbnail_cache().path_for(img_path, THUMB), use_container_width=True, caption=img_path.name[:15])
                 st.markdown('</div>', unsafe_allow_html=True)
     
     if len(image_paths) > max_display:
@@ -358,3 +364,15 @@ def phase_button(phase: int, enabled: bool = True, completed: bool = False):
         return st.button(f"{status_icon} PHASE {phase}: {status_text}", use_container_width=True, type="primary")
     
     return False
+
+def render_worker_failure(message: str, key: str):
+    """
+    Job worker failure: error, tail of the worker log and a manual restart
+    """
+    st.error(f"❌ {message}")
+    log_tail = worker_log_tail()
+    if log_tail:
+        st.code(log_tail, language="text")
+    if st.button("🔁 Relancer le worker", use_container_width=True, key=key):
+        ensure_worker()
+        st.rerun()
@@ -1,44 +1,173 @@
 import streamlit as st
 import os
-import base64
-import shutil
 from pathlib import Path
 from core.config import Config
-
-def get_image_base64(path):
-    """Convert image to base64 for HTML display"""
-    with open(path, 'rb') as f:
-        return base64.b64encode(f.read()).decode()
+from core.photo_curator import PhotoCurator
+from core.thumbnails import get_thumbnail_cache, PREVIEW, THUMB
+from core.prefetch import get_preview_prefetcher
+from core.export_engine import ExportEngine
+from core.file_index import get_file_index
+from ui.resources import get_quality_analyzer
 
 def load_dataset(dataset_name):
-    """Scan le dossier et remplit la file d'attente"""
+    """Scan le dossier et remplit la file d'attente (reprend la session journalisée s'il y en a une)"""
     dataset_path = Path(Config.RAW_DIR) / dataset_name
     if not dataset_path.exists():
         st.error(f"Dossier non trouvé : {dataset_path}")
         return
 
-    extensions = ('.jpg', '.jpeg', '.png', '.webp')
-    images = [str(f) for f in dataset_path.iterdir() if f.suffix.lower() in extensions]
+    st.session_state.current_dataset_name = dataset_name
+    curator = PhotoCurator(dataset_path, quality_analyzer=get_quality_analyzer())
+    st.session_state.photo_curator = curator
+    st.session_state.pop('duplicate_groups', None)
+    
+    restored = curator.restore_session()
+    if restored and restored["queue"]:
+        st.session_state.curation_queue = [str(p) for p in restored["queue"]]
+        st.session_state.curation_index = restored["cursor"]
+        curator.images = list(restored["queue"])
+        st.success(
+            f"♻️ Session reprise : {restored['cursor']}/{len(restored['queue'])} images vues, "
+            f"{restored['decisions']} décisions"
+        )
+        return
+
+    images = [str(f) for f in get_file_index().files(dataset_path)]
     
     if images:
         st.session_state.curation_queue = images
         st.session_state.curation_index = 0
-        st.session_state.approved_list = []
-        st.session_state.rejected_list = []
+        curator.images = [Path(p) for p in images]
+        curator.record_queue(curator.images)
         st.success(f"🔥 {len(images)} images chargées !")
     else:
         st.warning("⚠️ Aucune image trouvée.")
 
 
+def get_photo_curator() -> PhotoCurator:
+    """Curator du dataset courant (décisions journalisées + scores qualité entre les reruns)"""
+    dataset_name = st.session_state.get('current_dataset_name')
+    curator = st.session_state.get('photo_curator')
+    if curator is None or curator.dataset_path.name != dataset_name:
+        curator = PhotoCurator(Path(Config.RAW_DIR) / dataset_name, quality_analyzer=get_quality_analyzer())
+        curator.restore_session()
+        curator.images = [Path(p) for p in st.session_state.curation_queue]
+        st.session_state.photo_curator = curator
+    return curator
+
+
+def export_approved_to(curator: PhotoCurator, folder: Path) -> dict:
+    """Exporte les images approuvées (liens / clones / copies en parallèle) avec une barre de progression"""
+    pairs = [(src, folder / src.name) for src in curator.approved if src.exists()]
+    progress = st.progress(0.0)
+    
+    def on_progress(done: int, total: int):
+        progress.progress(done / total, text=f"💾 {done}/{total}")
+    
+    result = ExportEngine().export(pairs, on_progress)
+    progress.empty()
+    for error in result["errors"]:
+        st.error(f"❌ {error}")
+    return result
+
+
+def set_curation_index(index: int):
+    """Avance dans la file (position journalisée pour reprendre après un reload)"""
+    st.session_state.curation_index = index
+    get_photo_curator().record_cursor(index)
+
+
+def set_curation_queue(queue):
+    """Remplace la file de tri (filtre qualité, doublons) et la journalise"""
+    st.session_state.curation_queue = [str(p) for p in queue]
+    st.session_state.curation_index = 0
+    get_photo_curator().record_queue([Path(p) for p in queue])
+
+def render_quality_panel():
+    """Filtre qualité (netteté, résolution, visage) : analyse parallèle puis seuils vectorisés"""
+    with st.expander("🔬 Filtres qualité", expanded=False):
+        curator = get_photo_curator()
+        table = curator.score_table
+        
+        col_res, col_blur, col_face = st.columns(3)
+        with col_res:
+            min_side = st.slider("Résolution min (px)", 256, 2048, 512, step=64, key="qf_min_res")
+            if table is not None:
+                st.caption(f"{table.count_min_side_at_least(min_side)} images ≥ {min_side}px")
+        with col_blur:
+            min_blur = st.slider("Netteté min", 0.0, 100.0, 30.0, step=1.0, key="qf_min_blur")
+            if table is not None:
+                st.caption(f"{table.count_blur_at_least(min_blur)} images ≥ {min_blur:.0f}")
+        with col_face:
+            require_face = st.checkbox("Exactement 1 visage", value=False, key="qf_require_face")
+            if table is not None:
+                st.caption(f"{table.single_face_count} images avec 1 visage")
+        
+        if st.button("🔍 Analyser la file", use_container_width=True, key="qf_analyze"):
+            curator.images = [Path(p) for p in st.session_state.curation_queue]
+            total = len(curator.images)
+            progress = st.progress(0.0)
+            live = st.empty()
+            kept = 0
+            
+            # Les scores arrivent au fil des workers : affichage incrémental
+            for done, (_, _, passed) in enumerate(curator.iter_quality_filtered(
+                min_resolution=(min_side, min_side),
+                max_blur_threshold=min_blur,
+                require_face=require_face
+            ), 1):
+                kept += passed
+                if done % 8 == 0 or done == total:
+                    progress.progress(done / total)
+                    live.caption(f"⚙️ {done}/{total} analysées · ✅ {kept} passent les seuils actuels")
+            
+            table = curator.build_score_table()
+        
+        if table is None:
+            st.caption("Lancez l'analyse pour voir combien d'images passent chaque seuil.")
+            return
+        
+        # Masque vectorisé : recalculé à chaque mouvement de slider
+        mask = table.mask((min_side, min_side), min_blur, require_face)
+        st.markdown(f"**✅ {int(mask.sum())} / {len(table)} images passent tous les seuils**")
+        if table.scored_count < len(table):
+            st.caption(f"⚠️ {len(table) - table.scored_count} images non analysables (exclues)")
+        st.caption("Répartition de la netteté (tranches de 5 points)")
+        st.bar_chart({"images": table.blur_histogram}, height=140)
+        
+        if st.button("✅ Appliquer à la file", use_container_width=True, key="qf_apply"):
+            set_curation_queue(table.filter((min_side, min_side), min_blur, require_face))
+            st.success(f"🔬 {len(st.session_state.curation_queue)} images conservées sur {len(table)}")
+        
+        # Quasi-doublons : un seul représentant (meilleur score) par groupe à trier
+        st.markdown("---")
+        col_dist, col_dedup = st.columns([2, 1])
+        with col_dist:
+            max_distance = st.slider(
+                "Distance max entre quasi-doublons", 0, 16, 6, key="qf_dup_distance",
+                help="Distance de Hamming entre pHash (0 = identiques)"
+            )
+        with col_dedup:
+            if st.button("🧬 Regrouper les doublons", use_container_width=True, key="qf_dedup"):
+                curator.images = [Path(p) for p in st.session_state.curation_queue]
+                collapsed, groups = curator.collapse_duplicates(max_distance)
+                set_curation_queue(collapsed)
+                st.session_state.duplicate_groups = {
+                    str(rep): [str(p) for p in dups] for rep, dups in groups.items()
+                }
+                hidden = sum(len(dups) for dups in groups.values())
+                st.success(f"🧬 {len(groups)} groupes · {hidden} quasi-doublons masqués")
+
 def render_swipe_mode():
     st.subheader("🔥 Swipe Interface")
+    curator = get_photo_curator()
     queue = st.session_state.curation_queue
     idx = st.session_state.curation_index
 
     if idx >= len(queue):
         st.success("✅ Curation terminée !")
         if st.button("🔄 Recommencer la curation"):
-            st.session_state.curation_index = 0
+            set_curation_index(0)
             st.rerun()
         return
 
@@ -51,29 +180,45 @@ def render_swipe_mode():
     
     with col_img:
         img_path = queue[idx]
-        # Convert image to base64 for HTML display
-        img_base64 = get_image_base64(img_path)
+        # Aperçu réduit servi par URL (static/) : mis en cache par le navigateur.
+        # Les suivants (et le précédent) sont préparés en arrière-plan pendant le tri.
+        prefetcher = get_preview_prefetcher()
+        preview_url = prefetcher.url(img_path, PREVIEW)
+        prefetcher.prefetch(queue, idx, PREVIEW)
         
-        # Cadre d'image pour affichage complet sans déformation
-        st.markdown(f"""
-        <div style='display: flex; justify-content: center; align-items: center; width: 100%; background-color: #0E1117; border-radius: 12px; padding: 10px;'>
-            <img src='data:image/jpeg;base64,{img_base64}' style='
-                max-width: 100%;
-                max-height: 75vh;
-                width: auto;
-                height: auto;
-                object-fit: contain;
-                border-radius: 8px;
-            '>
-        </div>
-        """, unsafe_allow_html=True)
+        if preview_url is None:
+            st.image(img_path, use_container_width=True)
+        else:
+            # Cadre d'image pour affichage complet sans déformation
+            st.markdown(f"""
+            <div style='display: flex; justify-content: center; align-items: center; width: 100%; background-color: #0E1117; border-radius: 12px; padding: 10px;'>
+                <img src='{preview_url}' style='
+                    max-width: 100%;
+                    max-height: 75vh;
+                    width: auto;
+                    height: auto;
+                    object-fit: contain;
+                    border-radius: 8px;
+                '>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if Config.PREFETCH["browser_hints"]:
+                # Le navigateur télécharge aussi les aperçus déjà prêts
+                hints = "".join(f"<link rel='prefetch' href='{url}'>" for url in prefetcher.ready_urls(queue, idx, PREVIEW))
+                if hints:
+                    st.markdown(hints, unsafe_allow_html=True)
+        
+        duplicates = st.session_state.get('duplicate_groups', {}).get(img_path)
+        if duplicates:
+            st.caption(f"🧬 {len(duplicates)} quasi-doublon(s) masqué(s) derrière cette image")
     
     with col_controls:
         st.markdown("### Décision")
         
         # Stats compactes
-        approved = len(st.session_state.approved_list)
-        rejected = len(st.session_state.rejected_list)
+        approved = curator.approved_count
+        rejected = curator.rejected_count
         remaining = len(queue) - idx
         
         st.metric("✅ Approuvées", approved)
@@ -106,7 +251,7 @@ def render_swipe_mode():
             if st.button("🗑️ POUBELLE", use_container_width=True, key="btn_trash", help="Supprimer du disque"):
                 try:
                     os.remove(img_path)
-                    st.session_state.curation_index += 1
+                    set_curation_index(idx + 1)
                     st.success("🗑️ Effacé du disque")
                     st.rerun()
                 except Exception as e:
@@ -131,7 +276,7 @@ def render_swipe_mode():
             </style>
             """, unsafe_allow_html=True)
             if st.button("⏭️ PASSER", use_container_width=True, key="btn_skip", help="Passer cette image"):
-                st.session_state.curation_index += 1
+                set_curation_index(idx + 1)
                 st.rerun()
         
         with col_keep:
@@ -153,50 +298,45 @@ def render_swipe_mode():
             </style>
             """, unsafe_allow_html=True)
             if st.button("✅ GARDER", use_container_width=True, key="btn_keep", help="Approuver cette image"):
-                st.session_state.approved_list.append(img_path)
-                st.session_state.curation_index += 1
+                # Décision écrite dans le journal du dataset immédiatement
+                curator.manual_approve(Path(img_path))
+                set_curation_index(idx + 1)
                 st.rerun()
         
         # Messages de feedback visuel
-        if img_path in st.session_state.rejected_list:
+        if curator.is_rejected(Path(img_path)):
             st.error("⛔ Image REJETÉE !")
-        elif img_path in st.session_state.approved_list:
+        elif curator.is_approved(Path(img_path)):
             st.success("🎉 Image APPROUVÉE !")
 
 def render_grid_mode():
     st.subheader("🖼️ Sélection en Grille")
     queue = st.session_state.curation_queue
+    curator = get_photo_curator()
     
-    st.info(f"Cochez les images à garder. ({len(st.session_state.approved_list)} déjà validées)")
+    st.info(f"Cochez les images à garder. ({curator.approved_count} déjà validées)")
     
     # Configuration de la grille (4 colonnes)
     cols = st.columns(4)
     for i, img_path in enumerate(queue):
         with cols[i % 4]:
-            st.image(img_path, use_container_width=True)
+            st.image(get_thumbnail_cache().path_for(img_path, THUMB), use_container_width=True)
             # On utilise le chemin comme clé unique
-            is_checked = st.checkbox("Garder", key=f"grid_{img_path}", value=(img_path in st.session_state.approved_list))
-            if is_checked and img_path not in st.session_state.approved_list:
-                st.session_state.approved_list.append(img_path)
-            elif not is_checked and img_path in st.session_state.approved_list:
-                st.session_state.approved_list.remove(img_path)
+            was_approved = curator.is_approved(Path(img_path))
+            is_checked = st.checkbox("Garder", key=f"grid_{img_path}", value=was_approved)
+            if is_checked and not was_approved:
+                curator.manual_approve(Path(img_path))
+            elif not is_checked and was_approved:
+                curator.reset_decision(Path(img_path))
 
     if st.button("💾 Finaliser la sélection", use_container_width=True):
-        import shutil
-        from core.config import Config
-        
         # Create curated dataset folder
         dataset_name = st.session_state.get('current_dataset_name', 'dataset')
         curated_folder = Config.CURATED_DIR / dataset_name
         curated_folder.mkdir(parents=True, exist_ok=True)
         
-        # Copy approved images to curated folder
-        for img_path in st.session_state.approved_list:
-            src = Path(img_path)
-            dst = curated_folder / src.name
-            shutil.copy2(src, dst)
-        
-        st.success(f"Fait ! {len(st.session_state.approved_list)} images sauvegardées dans {curated_folder} !")
+        export_approved_to(curator, curated_folder)
+        st.success(f"Fait ! {curator.approved_count} images sauvegardées dans {curated_folder} !")
 
 def render():
     st.markdown("# 🧬 Curation & Sélection")
@@ -207,18 +347,18 @@ def render():
             st.error("Dossier RAW_DIR manquant.")
             return
             
-        datasets = [d.name for d in Config.RAW_DIR.iterdir() if d.is_dir()]
+        datasets = get_file_index().subdirs(Config.RAW_DIR)
         selected = st.selectbox("Choisir un dossier :", ["---"] + datasets)
         
         if st.button("🚀 Charger pour Curation") and selected != "---":
             load_dataset(selected)
-            # Store current dataset name for saving
-            st.session_state.current_dataset_name = selected
 
     if not st.session_state.curation_queue:
         st.info("💡 Chargez un dataset ci-dessus pour commencer le tri.")
         return
 
+    render_quality_panel()
+
     # --- 2. NAVIGATION ---
     st.markdown("---")
     mode = st.radio("Mode de tri :", ["👉 Swipe Mode", "🖼️ Grid View"], horizontal=True)
@@ -229,15 +369,16 @@ def render():
         render_grid_mode()
 
     # --- 3. SAUVEGARDE FINALE ---
-    if st.session_state.approved_list:
+    curator = get_photo_curator()
+    if curator.approved_count:
         st.markdown("---")
         st.markdown("### 💾 Sauvegarder le Dataset Trié")
         
         col1, col2 = st.columns([1, 1])
         with col1:
-            st.metric("✅ Images approuvées", len(st.session_state.approved_list))
+            st.metric("✅ Images approuvées", curator.approved_count)
         with col2:
-            st.metric("❌ Images rejetées", len(st.session_state.rejected_list))
+            st.metric("❌ Images rejetées", curator.rejected_count)
         
         if st.button("💾 Enregistrer ce Dataset Trié", use_container_width=True, type="primary"):
             if 'current_dataset_name' in st.session_state:
@@ -245,14 +386,10 @@ def render():
                 curated_path = Config.CURATED_DIR / dataset_name
                 curated_path.mkdir(parents=True, exist_ok=True)
                 
-                # Copier toutes les images approuvées (même si le tri n'est pas terminé)
-                copied_count = 0
-                for img_path in st.session_state.approved_list:
-                    src_path = Path(img_path)
-                    if src_path.exists():  # Vérifier que le fichier existe toujours
-                        dst_path = curated_path / src_path.name
-                        shutil.copy2(src_path, dst_path)
-                        copied_count += 1
+                # Exporter toutes les images approuvées (même si le tri n'est pas terminé).
+                # Les fichiers déjà identiques à destination sont sautés : ré-enregistrer est instantané.
+                result = export_approved_to(curator, curated_path)
+                copied_count = result["exported"] + result["skipped"]
                 
                 # Afficher les statistiques
                 total_processed = st.session_state.curation_index
@@ -260,6 +397,8 @@ def render():
                 
                 st.success(f"🎉 Dataset sauvegardé partiellement !")
                 st.info(f"📍 {copied_count} images sauvegardées dans: {curated_path}")
+                if result["skipped"]:
+                    st.caption(f"♻️ {result['skipped']} déjà présentes, non recopiées")
                 st.info(f"📊 Progression: {total_processed}/{total_images} images traitées")
                 
                 # Option de continuer ou terminer
@@ -272,8 +411,8 @@ def render():
                         # Vider la file d'attente
                         st.session_state.curation_queue = []
                         st.session_state.curation_index = 0
-                        st.session_state.approved_list = []
-                        st.session_state.rejected_list = []
+                        curator.clear_decisions()
+                        curator.record_queue([])
                         st.success("🎉 Dataset prêt pour la Factory !")
                         st.balloons()
                         st.rerun()
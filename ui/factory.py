@@ -4,8 +4,61 @@ Factory Page - Dataset Production (Models + Curated Datasets + Face Swap)
 import streamlit as st
 from pathlib import Path
 from core.config import Config
-from core.batch_face_swap import BatchFaceSwap
+from core.job_store import KIND_FACE_SWAP, JOB_DONE, JOB_FAILED, JOB_CANCELLED, FINISHED_STATES
+from core.job_worker import ensure_worker, WorkerWatchdog
+from ui.resources import get_job_store
+from ui.components import render_worker_failure
+from core.thumbnails import get_thumbnail_cache, PREVIEW, THUMB
+from core.file_index import get_file_index
 import shutil
+import time
+
+def render_swap_batch(batch_id: str):
+    """Suivi d'un batch de face swap exécuté par le worker (survit aux reruns)"""
+    store = get_job_store()
+    progress = st.progress(0.0)
+    status = st.empty()
+    
+    if st.button("⏹️ Annuler le batch", use_container_width=True, key="cancel_swap_batch"):
+        store.cancel_batch(batch_id)
+    
+    watchdog = WorkerWatchdog(store)
+    while True:
+        summary = store.batch_summary(batch_id)
+        total = summary.get("total", 0)
+        finished = sum(summary.get(state, 0) for state in FINISHED_STATES)
+        progress.progress(finished / total if total else 1.0)
+        status.caption(
+            f"✅ {summary.get(JOB_DONE, 0)} · ❌ {summary.get(JOB_FAILED, 0)} · "
+            f"⏹️ {summary.get(JOB_CANCELLED, 0)} · {finished}/{total} traitées"
+        )
+        if finished >= total:
+            break
+        failure = watchdog.poll(sorted(summary.items()))
+        if failure:
+            render_worker_failure(failure, "resume_swap_worker")
+            return
+        time.sleep(1.0)
+    
+    jobs = store.get_batch(batch_id)
+    results = [Path(job["result"]["path"]) for job in jobs if job["status"] == JOB_DONE]
+    output_dir = Path(jobs[0]["payload"]["output_dir"]) if jobs else None
+    
+    if results:
+        st.success(f"🎉 Production terminée! {len(results)} images générées.")
+        st.info(f"📍 Résultats dans: {output_dir}")
+    else:
+        st.error("❌ Aucune image générée.")
+    
+    col_resume, col_close = st.columns(2)
+    if summary.get(JOB_FAILED, 0) or summary.get(JOB_CANCELLED, 0):
+        if col_resume.button("🔁 Reprendre les images en échec", use_container_width=True, key="resume_swap_batch"):
+            store.resume_batch(batch_id)
+            ensure_worker(store)
+            st.rerun()
+    if col_close.button("✔️ Fermer", use_container_width=True, key="close_swap_batch"):
+        st.session_state.swap_batch = None
+        st.rerun()
 
 def render():
     """Render factory page with new production workflow"""
@@ -35,11 +88,11 @@ def render():
             models_dir.mkdir(parents=True, exist_ok=True)
             st.warning(f"📁 Dossier créé : {models_dir}. Ajoute des images dedans !")
 
-        model_files = list(Config.MODELS_DIR.glob("*.png")) + list(Config.MODELS_DIR.glob("*.jpg"))  # Only images
+        # Only images, plus récents d'abord
+        model_files = get_file_index().files(Config.MODELS_DIR, extensions=(".png", ".jpg"), sort="mtime", reverse=True)
         if not model_files:
             st.error("❌ Aucun modèle trouvé dans data/dataset/processed/models. Va dans l'onglet 'Casting' pour en créer un !")
         else:
-            model_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
             selected_model = st.selectbox(
                 "Source Face:",
                 options=[str(f) for f in model_files],
@@ -50,7 +103,7 @@ def render():
             # Aperçu: Dès qu'un modèle est sélectionné, afficher sa miniature
             model_path = Path(selected_model)
             if model_path.exists():
-                st.image(str(model_path), use_container_width=True, caption=f"📸 {model_path.name}")
+                st.image(get_thumbnail_cache().path_for(model_path, PREVIEW), use_container_width=True, caption=f"📸 {model_path.name}")
                 st.info(f"✅ Modèle sélectionné: {model_path.name}")
                 
                 if st.button("✅ Utiliser ce modèle", use_container_width=True, key="use_model_btn"):
@@ -68,7 +121,7 @@ def render():
         # Lister les datasets dans CURATED_DIR
         curated_dir = Config.CURATED_DIR
         if curated_dir.exists():
-            curated_datasets = [d.name for d in curated_dir.iterdir() if d.is_dir()]
+            curated_datasets = get_file_index().subdirs(curated_dir)
             
             if curated_datasets:
                 selected_dataset = st.selectbox(
@@ -83,17 +136,17 @@ def render():
                     st.markdown(f"**📁 {selected_dataset}**")
                     
                     # Lister les images du dataset
-                    image_files = list(dataset_path.glob("*.png")) + list(dataset_path.glob("*.jpg"))
-                    image_files = image_files[:6]  # Limiter à 6 images pour le preview
+                    image_count = get_file_index().count(dataset_path, extensions=(".png", ".jpg"))
+                    image_files = get_file_index().files(dataset_path, extensions=(".png", ".jpg"), limit=6)  # Limiter à 6 images pour le preview
                     
                     if image_files:
                         # Afficher en grille 2x3
                         cols = st.columns(3)
                         for i, img_path in enumerate(image_files):
                             with cols[i % 3]:
-                                st.image(str(img_path), use_container_width=True, caption=img_path.name)
+                                st.image(get_thumbnail_cache().path_for(img_path, THUMB), use_container_width=True, caption=img_path.name)
                         
-                        st.info(f"📊 {len(list(dataset_path.glob('*.png')) + list(dataset_path.glob('*.jpg')))} images au total")
+                        st.info(f"📊 {image_count} images au total")
                         
                         if st.button("✅ Utiliser ce dataset", use_container_width=True, key="use_dataset_btn"):
                             st.session_state.selected_dataset = selected_dataset
@@ -132,47 +185,48 @@ def render():
             
             # Compter les images dans le dataset
             dataset_path = Config.CURATED_DIR / dataset_name
-            image_count = len(list(dataset_path.glob("*.png")) + list(dataset_path.glob("*.jpg")))
+            image_count = get_file_index().count(dataset_path, extensions=(".png", ".jpg"))
             st.metric("📸 Images à traiter", image_count)
         
         with col_action:
             st.markdown("#### ⚡ Lancement")
             
-            if st.button("🚀 START BATCH SWAP", use_container_width=True, type="primary"):
-                with st.spinner("🔄 Production en cours..."):
-                    try:
-                        # Chemins
-                        source_path = Path(st.session_state.source_face)
-                        
-                        # Sécurité: vérifier que le fichier existe
-                        if not source_path.exists():
-                            st.error(f"❌ Fichier source introuvable: {source_path}")
-                            return
-                        
-                        target_dir = Config.CURATED_DIR / dataset_name
-                        output_dir = Config.FACE_SWAP_OUTPUT / f"{model_name}_{dataset_name}_swapped"  # Uses SWAPPED_DIR
-                        output_dir.mkdir(parents=True, exist_ok=True)
-                        
-                        # Initialiser le batch face swap avec le bon chemin
-                        swap_engine = BatchFaceSwap(source_path, output_dir)
-                        
-                        # Lancer le traitement avec nommage automatisé
-                        results = swap_engine.process_batch(
-                            target_directory=target_dir,
-                            output_directory=output_dir,
-                            naming_pattern=f"{model_name}_{dataset_name}_{{original}}.jpg"
-                        )
-                        
-                        if results:
-                            st.success(f"🎉 Production terminée! {len(results)} images générées.")
-                            st.info(f"📍 Résultats dans: {output_dir}")
-                            st.info(f"📝 Format: {model_name}_{dataset_name}_[original].jpg")
-                            st.balloons()
-                        else:
-                            st.error("❌ Aucune image générée.")
-                            
-                    except Exception as e:
-                        st.error(f"❌ Erreur lors de la production: {str(e)}")
+            if st.session_state.get('swap_batch'):
+                render_swap_batch(st.session_state.swap_batch)
+            elif st.button("🚀 START BATCH SWAP", use_container_width=True, type="primary"):
+                # Chemins
+                source_path = Path(st.session_state.source_face)
+                
+                # Sécurité: vérifier que le fichier existe
+                if not source_path.exists():
+                    st.error(f"❌ Fichier source introuvable: {source_path}")
+                    return
+                
+                target_dir = Config.CURATED_DIR / dataset_name
+                output_dir = Config.FACE_SWAP_OUTPUT / f"{model_name}_{dataset_name}_swapped"  # Uses SWAPPED_DIR
+                naming_pattern = f"{model_name}_{dataset_name}_{{original}}.jpg"
+                
+                image_files = get_file_index().files(target_dir)
+                
+                # Un job par image : un batch interrompu reprend là où il s'était arrêté
+                payloads = [
+                    {
+                        "source": str(source_path),
+                        "target": str(image_path),
+                        "output_dir": str(output_dir),
+                        "naming_pattern": naming_pattern,
+                        "engine": "local",
+                        "index": idx
+                    }
+                    for idx, image_path in enumerate(sorted(image_files), 1)
+                ]
+                if not payloads:
+                    st.error("❌ Aucune image à traiter.")
+                else:
+                    store = get_job_store()
+                    st.session_state.swap_batch = store.enqueue_batch(KIND_FACE_SWAP, payloads)
+                    ensure_worker(store)
+                    st.rerun()
     else:
         st.warning("⚠️ Veuillez compléter les Étapes 1 et 2 avant de lancer la production.")
         
@@ -5,6 +5,8 @@ import streamlit as st
 from pathlib import Path
 from core.config import Config
 from ui.components import stat_card, info_box
+from core.thumbnails import get_thumbnail_cache, THUMB
+from core.file_index import get_file_index
 
 def render():
     """Render home page"""
@@ -19,18 +21,18 @@ def render():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        generated_count = len(list(Config.OUTPUT_DIR.glob("*.png"))) if Config.OUTPUT_DIR.exists() else 0
+        generated_count = get_file_index().count(Config.OUTPUT_DIR, extensions=(".png",))
         stat_card("Images Générées", str(generated_count), "🎨")
     
     with col2:
         dataset_dir = Config.BASE_DIR / "DATASET" / "FINAL_LORA"
-        dataset_count = len(list(dataset_dir.glob("*.png"))) if dataset_dir.exists() else 0
+        dataset_count = get_file_index().count(dataset_dir, extensions=(".png",))
         target = 100
         stat_card("Dataset LoRa", str(dataset_count), "🏭", progress=dataset_count, target=target)
     
     with col3:
         approved_dir = Config.BASE_DIR / "DATASET" / "APPROVED"
-        approved_count = len(list(approved_dir.glob("*.*"))) if approved_dir.exists() else 0
+        approved_count = get_file_index().count(approved_dir, extensions=None, pattern="*.*")
         stat_card("Images Approuvées", str(approved_count), "✅")
     
     with col4:
@@ -70,14 +72,14 @@ def render():
     st.markdown("### 📸 Dernières Générations")
     
     if Config.OUTPUT_DIR.exists():
-        recent_images = sorted(Config.OUTPUT_DIR.glob("*.png"), key=lambda x: x.stat().st_mtime, reverse=True)[:6]
+        recent_images = get_file_index().files(Config.OUTPUT_DIR, extensions=(".png",), sort="mtime", reverse=True, limit=6)
         
         if recent_images:
             cols = st.columns(3)
             for idx, img_path in enumerate(recent_images):
                 with cols[idx % 3]:
                     st.markdown('<div class="image-preview">', unsafe_allow_html=True)
-                    st.image(str(img_path), use_container_width=True, caption=img_path.name[:20])
+                    st.image(get_thumbnail_cache().path_for(img_path, THUMB), use_container_width=True, caption=img_path.name[:20])
                     st.markdown('</div>', unsafe_allow_html=True)
         else:
             st.info("Aucune image générée pour le moment")
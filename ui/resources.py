@@ -0,0 +1,68 @@
+"""
+Shared Resources - Long-lived objects cached once per Streamlit process
+GenAI client (warm HTTP/TLS pool), quota store, trackers, job store and
+detectors are created on first use with st.cache_resource and shared by all
+sessions. Per-call state (progress callback, last error) stays in the
+lightweight GeminiEngine built by get_engine().
+"""
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False)
+def get_genai_client():
+    from core.gemini_engine import get_genai_client as _get_client
+    return _get_client()
+
+
+@st.cache_resource(show_spinner=False)
+def get_quota_store():
+    from core.quota_store import get_quota_store as _get_store
+    return _get_store()
+
+
+@st.cache_resource(show_spinner=False)
+def get_request_tracker():
+    from core.request_tracker import RequestTracker
+    return RequestTracker(store=get_quota_store())
+
+
+@st.cache_resource(show_spinner=False)
+def get_persistent_monitor():
+    from core.persistent_monitor import PersistentMonitor
+    return PersistentMonitor()
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_store():
+    from core.job_store import get_job_store as _get_store
+    return _get_store()
+
+
+@st.cache_resource(show_spinner=False)
+def get_quality_analyzer():
+    """Haar face detector loaded once (detection is serialized inside the analyzer)"""
+    from core.photo_curator import QualityAnalyzer
+    return QualityAnalyzer()
+
+
+def get_engine(progress_callback=None, open_results: bool = True):
+    """
+    GeminiEngine on the shared client and trackers (cheap: nothing is reloaded)
+
+    Not cached itself: last_error and the progress callback belong to one call.
+    """
+    from core.gemini_engine import GeminiEngine
+    return GeminiEngine(
+        usage_sink=get_persistent_monitor(),
+        tracker=get_request_tracker(),
+        progress_callback=progress_callback,
+        open_results=open_results,
+        client=get_genai_client()
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_hardware_monitor():
+    """Background RAM / CPU / VRAM sampler (NVML initialised once per process)"""
+    from core.hardware_monitor import get_hardware_monitor as _get_monitor
+    return _get_monitor()